@@ -0,0 +1,644 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+UI/UX Pro Max Benchmark - load, fit, query latency and memory of the search engine
+Usage: python benchmark.py [--sizes 1k,10k,100k,1m] [--shapes styles,ux] [--output bench.json]
+       python benchmark.py --quick --baseline bench.json [--tolerance 0.25]
+
+Cases:
+  synthetic    Generated corpora with the header and vocabulary of styles.csv / ux-guidelines.csv
+  bundled      Every bundled data file, queried through core.search / core.search_stack
+  design       generate_design_system end to end: first call in a new process, then warm,
+               then served from the output cache
+  relevance    Labelled queries (relevance.jsonl) per domain, scored with nDCG@k and MRR
+               for every engine, fuzzy expansion and the SQLite backend, with their latency
+
+Synthetic and bundled cases also time fuzzy expansion of single-edit typos of indexed
+terms (fuzzy.expand.*), report how often the intended term was found (fuzzy.recall),
+and compile their CSV into an FTS5 database to time the SQLite backend (sqlite.*).
+
+Each case runs in a fresh process so its peak RSS is its own. Indexes are built in a
+temporary cache directory and the result cache is disabled, so every query is scored.
+
+Regression check:
+  --baseline   Compare against an earlier JSON report; exits with status 1 when a
+               *_ms or *_mb metric is slower than baseline * (1 + tolerance), or a
+               quality.* metric (nDCG, MRR) is lower than the baseline's
+Engines must also rank the labelled queries exactly as well as the exhaustive reference,
+so a faster engine is only accepted when its quality is unchanged. A relevance variant
+that fails is listed under "errors" in the report and also exits with status 1.
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import math
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+import core
+from core import BM25, CSV_CONFIG, DATA_DIR, ENGINES, MAX_RESULTS, VECTOR_ENGINE_AVAILABLE
+
+
+# ============ CONFIGURATION ============
+SIZES = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+QUICK_SIZES = ["1k", "10k"]
+SHAPES = {
+    "styles": "style",
+    "ux": "ux",
+}
+QUERIES_PER_CASE = 200
+EXHAUSTIVE_MAX_ROWS = 100_000  # "exhaustive" sorts every document per query; skip it above this
+DEFAULT_TOLERANCE = 0.25
+MIN_DELTA = {"_ms": 0.5, "_mb": 2.0}  # ignore absolute changes within timer / allocator noise
+DESIGN_QUERIES = [
+    "beauty spa wellness service elegant",
+    "fintech crypto dashboard dark",
+    "saas analytics b2b professional",
+    "ecommerce fashion luxury minimal",
+    "healthcare telemedicine accessible",
+    "gaming esports neon playful",
+    "education kids colorful",
+    "portfolio photographer creative",
+]
+RELEVANCE_FILE = Path(__file__).parent / "relevance.jsonl"
+RELEVANCE_K = 5  # cutoff of nDCG@k and MRR@k
+RELEVANCE_ROUNDS = 20  # the labelled set is small; repeat it for stable latency percentiles
+RELEVANCE_KEY_COLS = {"ux": "Issue", "react": "Issue", "web": "Issue"}  # default: first output column
+REFERENCE_ENGINE = "exhaustive"  # scores every document; other engines must match its quality
+QUALITY_TOLERANCE = 1e-4  # rounding noise of quality.* metrics
+
+
+# ============ SYNTHETIC CORPORA ============
+def _column_samples(filepath):
+    """Header and per-column list of cell values of a bundled CSV"""
+    with open(filepath, 'r', encoding='utf-8', newline='') as f:
+        rows = list(csv.reader(f))
+    header, rows = rows[0], [row for row in rows[1:] if row]
+    columns = [[row[i] for row in rows if i < len(row) and row[i]] for i in range(len(header))]
+    return header, columns
+
+
+def generate_corpus(shape, rows, path, seed=42):
+    """Write a CSV with the header and search-column vocabulary of a bundled file.
+
+    Search columns reuse real cell values with a share of their words swapped for
+    Zipf-distributed synthetic terms, so the vocabulary keeps growing with the corpus
+    the way real data does. Other columns get a couple of real words to keep files small.
+    """
+    config = CSV_CONFIG[SHAPES[shape]]
+    header, columns = _column_samples(DATA_DIR / config["file"])
+    search = {header.index(col) for col in config["search_cols"] if col in header}
+    rng = random.Random(seed)
+    vocab_size = max(rows // 4, 100)
+    weights = [1.0 / (rank + 1) for rank in range(vocab_size)]
+    cum = []
+    total = 0.0
+    for w in weights:
+        total += w
+        cum.append(total)
+
+    def synthetic_words(n):
+        return [f"term{i}" for i in rng.choices(range(vocab_size), cum_weights=cum, k=n)]
+
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        for n in range(rows):
+            row = []
+            for i, values in enumerate(columns):
+                if i == 0 and header[0] == "No":
+                    row.append(str(n + 1))
+                    continue
+                words = rng.choice(values).split() if values else []
+                if i in search:
+                    for word in synthetic_words(max(1, len(words) // 3)):
+                        if words:
+                            words[rng.randrange(len(words))] = word
+                        else:
+                            words.append(word)
+                    row.append(" ".join(words))
+                else:
+                    row.append(" ".join(words[:2]))
+            writer.writerow(row)
+    return path
+
+
+def sample_queries(filepath, search_cols, count, seed=42):
+    """Build 1-4 word queries from words of random rows, plus a few misses"""
+    rng = random.Random(seed)
+    bm25 = BM25()
+    with open(filepath, 'r', encoding='utf-8') as f:
+        rows = [row for row in csv.DictReader(f)]
+    queries = []
+    for _ in range(count):
+        row = rng.choice(rows)
+        words = bm25.tokenize(" ".join(str(row.get(col, "")) for col in search_cols))
+        if not words or rng.random() < 0.05:
+            queries.append("zzyzx qwxv")  # matches nothing
+            continue
+        queries.append(" ".join(rng.sample(words, min(len(words), rng.randint(1, 4)))))
+    return queries
+
+
+# ============ MEASUREMENT ============
+def percentiles(samples_ms):
+    """p50/p95/p99/mean of a list of latencies (nearest-rank)"""
+    if not samples_ms:
+        return {}
+    ordered = sorted(samples_ms)
+
+    def rank(p):
+        return ordered[min(len(ordered) - 1, max(0, int(round(p / 100.0 * len(ordered))) - 1))]
+
+    return {
+        "p50_ms": round(rank(50), 4),
+        "p95_ms": round(rank(95), 4),
+        "p99_ms": round(rank(99), 4),
+        "mean_ms": round(sum(ordered) / len(ordered), 4),
+    }
+
+
+def _elapsed_ms(start):
+    return (time.perf_counter() - start) * 1000
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, None where unsupported"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _tokenize_throughput(texts, start, corpus, prefix="tokenize"):
+    """Documents, tokens and megabytes analysed per second since start"""
+    seconds = max(time.perf_counter() - start, 1e-9)
+    return {
+        f"{prefix}.docs_per_s": round(len(texts) / seconds),
+        f"{prefix}.tokens_per_s": round(sum(len(tokens) for tokens in corpus) / seconds),
+        f"{prefix}.mb_per_s": round(sum(len(text) for text in texts) / seconds / 1e6, 2),
+    }
+
+
+def _measure_build(filepath, search_cols, output_cols, filter_cols=()):
+    """Time parse, tokenize, fit, full cold build and cache reload of one CSV"""
+    metrics = {}
+    start = time.perf_counter()
+    texts = []
+    with open(filepath, 'rb') as f:
+        records = core._read_records(f, hashlib.sha256())
+        _, header = next(records)
+        position = {col: i for i, col in enumerate(header or [])}
+        search_positions = [position.get(col) for col in search_cols]
+        for _, row in records:
+            if row:
+                texts.append(core._row_text(row, search_positions))
+    metrics["load_ms"] = round(_elapsed_ms(start), 3)
+
+    bm25 = BM25()
+    start = time.perf_counter()
+    corpus = [bm25.tokenize(text) for text in texts]
+    metrics["tokenize_ms"] = round(_elapsed_ms(start), 3)
+    metrics.update(_tokenize_throughput(texts, start, corpus))
+    for stemmer in core.STEMMERS:
+        analyzer = core.Analyzer(stemmer=stemmer)
+        start = time.perf_counter()
+        tokens = [analyzer.analyze(text) for text in texts]
+        metrics.update(_tokenize_throughput(texts, start, tokens, f"tokenize.{stemmer}"))
+    del texts
+
+    start = time.perf_counter()
+    bm25.fit_tokens(corpus)
+    metrics["fit_ms"] = round(_elapsed_ms(start), 3)
+    del corpus, bm25
+
+    start = time.perf_counter()
+    core.load_index(filepath, search_cols, output_cols, filter_cols)
+    metrics["build_ms"] = round(_elapsed_ms(start), 3)
+
+    core._RESIDENT_INDEXES.clear()  # keep the artifact on disk, drop the in-memory copy
+    start = time.perf_counter()
+    entry = core.load_index(filepath, search_cols, output_cols, filter_cols)
+    metrics["cache_load_ms"] = round(_elapsed_ms(start), 3)
+    return entry, metrics
+
+
+def _measure_engines(entry, queries, engines):
+    """Per-query latency of each engine: scoring plus materialising the winning rows"""
+    metrics = {}
+    bm25 = entry["bm25"]
+    for engine in engines:
+        if engine == "exhaustive" and bm25.N > EXHAUSTIVE_MAX_ROWS:
+            continue
+        bm25.top_k(queries[0], MAX_RESULTS, engine)  # untimed: lazy imports and derived structures
+        samples = []
+        for query in queries:
+            start = time.perf_counter()
+            for idx, score in bm25.top_k(query, MAX_RESULTS, engine):
+                if score > 0:
+                    core.row_dict(entry, idx)
+            samples.append(_elapsed_ms(start))
+        for name, value in percentiles(samples).items():
+            metrics[f"query.{engine}.{name}"] = value
+    # Mean-latency speedup over the default posting-list walk (not a regression metric)
+    baseline = metrics.get("query.inverted.mean_ms")
+    for engine in engines:
+        mean = metrics.get(f"query.{engine}.mean_ms")
+        if baseline and mean and engine != "inverted":
+            metrics[f"query.{engine}.speedup"] = round(baseline / mean, 2)
+    return metrics
+
+
+def make_typo(word, rng):
+    """Apply one random edit (delete, insert, substitute or swap adjacent letters) to a word"""
+    i = rng.randrange(len(word))
+    letter = rng.choice("abcdefghijklmnopqrstuvwxyz")
+    edit = rng.randrange(4)
+    if edit == 0:
+        return word[:i] + word[i + 1:]
+    if edit == 1:
+        return word[:i] + letter + word[i:]
+    if edit == 2:
+        return word[:i] + letter + word[i + 1:]
+    i = min(i, len(word) - 2)
+    return word[:i] + word[i + 1] + word[i] + word[i + 2:]
+
+
+def _measure_fuzzy(entry, count, seed=42):
+    """Cost of the n-gram indexes and of expanding misspelled terms, and how often the intended term is found"""
+    bm25 = entry["bm25"]
+    rng = random.Random(seed)
+    min_length = min(length for length, _ in core.FUZZY_EDITS)
+    words = sorted(word for word, term in bm25.vocab.items() if len(word) > min_length and bm25.doc_freqs[term])
+    if not words:
+        return {}
+    typos = []
+    for word in rng.choices(words, k=count):
+        typo = make_typo(word, rng)
+        if typo not in bm25.vocab:
+            typos.append((word, typo))
+
+    metrics = {}
+    bm25._trigrams = bm25._bigrams = None
+    start = time.perf_counter()
+    bm25._trigram_index()
+    metrics["fuzzy.trigram_build_ms"] = round(_elapsed_ms(start), 3)
+    start = time.perf_counter()
+    bm25._bigram_index()
+    metrics["fuzzy.bigram_build_ms"] = round(_elapsed_ms(start), 3)
+
+    samples, found = [], 0
+    for word, typo in typos:
+        bm25._expansions.pop(typo, None)
+        start = time.perf_counter()
+        expansions = bm25.expand(typo)
+        samples.append(_elapsed_ms(start))
+        found += bm25.vocab[word] in expansions
+    metrics.update({f"fuzzy.expand.{k}": v for k, v in percentiles(samples).items()})
+    # Share of single-edit typos whose intended term is among the expansions
+    metrics["fuzzy.recall"] = round(found / len(typos), 4) if typos else None
+    return metrics
+
+
+def _measure_sqlite(filepath, search_cols, output_cols, filter_cols, queries, workdir):
+    """Compile one CSV into its own FTS5 database, then time opening it and querying it"""
+    import fts
+    database = Path(workdir) / f"{Path(filepath).stem}.db"
+    start = time.perf_counter()
+    fts.compile_data(database, [("bench", Path(filepath), search_cols, output_cols, filter_cols)])
+    metrics = {"sqlite.compile_ms": round(_elapsed_ms(start), 3),
+               "sqlite.db_mb": round(database.stat().st_size / (1024 * 1024), 2)}
+    start = time.perf_counter()
+    fts.search_compiled("bench", queries[0], MAX_RESULTS, path=database)
+    metrics["sqlite.first_query_ms"] = round(_elapsed_ms(start), 3)  # includes opening the file
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        fts.search_compiled("bench", query, MAX_RESULTS, path=database)
+        samples.append(_elapsed_ms(start))
+    metrics.update({f"sqlite.query.{k}": v for k, v in percentiles(samples).items()})
+    return metrics
+
+
+def load_labels(path=RELEVANCE_FILE):
+    """Labelled queries, one JSON object per line: {"domain", "query", "relevant": {key: grade}}"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def ndcg(ranked, relevant, k=RELEVANCE_K):
+    """Normalised discounted cumulative gain of the first k ranked keys (graded relevance)"""
+    def dcg(grades):
+        return sum((2 ** grade - 1) / math.log2(rank + 2) for rank, grade in enumerate(grades))
+
+    ideal = dcg(sorted(relevant.values(), reverse=True)[:k])
+    return dcg([relevant.get(key, 0) for key in ranked[:k]]) / ideal if ideal else 0.0
+
+
+def reciprocal_rank(ranked, relevant, k=RELEVANCE_K):
+    """1 / rank of the first relevant key within the first k, 0 when there is none"""
+    return next((1.0 / (rank + 1) for rank, key in enumerate(ranked[:k]) if relevant.get(key, 0) > 0), 0.0)
+
+
+def _measure_relevance(domain, labels, variants, rounds):
+    """nDCG@k, MRR@k and latency of core.search for each engine variant on one domain's labelled queries.
+
+    Returns (metrics, errors); errors maps a variant that failed to its error message.
+    """
+    key_col = RELEVANCE_KEY_COLS.get(domain, CSV_CONFIG[domain]["output_cols"][0])
+    metrics, errors = {}, {}
+    for variant, options in variants.items():
+        try:
+            core.search(labels[0]["query"], domain, RELEVANCE_K, **options)  # untimed: lazy loads and imports
+            gains, ranks, samples = [], [], []
+            for label in labels:
+                result = core.search(label["query"], domain, RELEVANCE_K, **options)
+                if "error" in result:
+                    raise ValueError(result["error"])
+                # A key repeated across rows (e.g. two "Font Loading" issues) counts once
+                ranked = list(dict.fromkeys(row.get(key_col) for row in result["results"]))
+                gains.append(ndcg(ranked, label["relevant"]))
+                ranks.append(reciprocal_rank(ranked, label["relevant"]))
+            for _ in range(rounds):
+                for label in labels:
+                    start = time.perf_counter()
+                    core.search(label["query"], domain, RELEVANCE_K, **options)
+                    samples.append(_elapsed_ms(start))
+        except Exception as e:
+            errors[variant] = f"{type(e).__name__}: {e}"
+            continue
+        metrics[f"quality.{variant}.ndcg"] = round(sum(gains) / len(gains), 4)
+        metrics[f"quality.{variant}.mrr"] = round(sum(ranks) / len(ranks), 4)
+        metrics.update({f"query.{variant}.{k}": v for k, v in percentiles(samples).items()})
+    return metrics, errors
+
+
+def _isolate_caches(cache_dir):
+    """Build indexes in a scratch directory and score every query"""
+    core.CACHE_DIR = Path(cache_dir)
+    core._RESULT_CACHE = core.ResultCache(0)
+
+
+def run_case(case):
+    """Run one benchmark case; meant to be called in a fresh process"""
+    _isolate_caches(case["cache_dir"])
+    start = time.perf_counter()
+    metrics, errors = {}, {}
+
+    if case["kind"] in ("synthetic", "bundled"):
+        filepath = Path(case["file"])
+        entry, metrics = _measure_build(filepath, case["search_cols"], case["output_cols"], case["filter_cols"])
+        queries = sample_queries(filepath, case["search_cols"], case["queries"], case["seed"])
+        metrics.update(_measure_engines(entry, queries, case["engines"]))
+        metrics.update(_measure_fuzzy(entry, case["queries"], case["seed"]))
+        metrics.update(_measure_sqlite(filepath, case["search_cols"], case["output_cols"], case["filter_cols"],
+                                       queries, case["cache_dir"]))
+        if case["kind"] == "bundled":
+            # Public entry point, including domain routing and result formatting
+            samples = []
+            for query in queries:
+                t = time.perf_counter()
+                if case["stack"]:
+                    core.search_stack(query, case["stack"])
+                else:
+                    core.search(query, case["domain"])
+                samples.append(_elapsed_ms(t))
+            metrics.update({f"search.{k}": v for k, v in percentiles(samples).items()})
+        usage = entry["bm25"].memory_usage()
+        info = {"rows": entry["bm25"].N, "file_bytes": filepath.stat().st_size,
+                "vocabulary": len(entry["bm25"].vocab), "index_bytes": sum(v for k, v in usage.items() if k.endswith("_bytes"))}
+
+    elif case["kind"] == "relevance":
+        import fts
+        variants = {engine: {"engine": engine} for engine in case["engines"]}
+        variants["fuzzy"] = {"fuzzy": True}
+        # The SQLite backend reads the database named by the environment; point it into the scratch directory
+        os.environ[fts.DATABASE_ENV] = str(Path(case["cache_dir"]) / fts.DATABASE_NAME)
+        fts.compile_data(specs=[spec for spec in core.index_specs() if spec[0] == case["domain"]])
+        variants["sqlite"] = {"backend": "sqlite"}
+        quality, errors = _measure_relevance(case["domain"], case["labels"], variants, case["rounds"])
+        metrics.update(quality)
+        info = {"queries": len(case["labels"]), "k": RELEVANCE_K, "rounds": case["rounds"]}
+
+    elif case["kind"] == "design":
+        from design_system import generate_design_system
+        t = time.perf_counter()
+        generate_design_system(case["queries"][0], "Benchmark", cache=False)
+        metrics["first_call_ms"] = round(_elapsed_ms(t), 3)
+        samples = []
+        for _ in range(case["rounds"]):
+            for query in case["queries"]:
+                t = time.perf_counter()
+                generate_design_system(query, "Benchmark", cache=False)
+                samples.append(_elapsed_ms(t))
+        metrics.update({f"warm.{k}": v for k, v in percentiles(samples).items()})
+        # Output cache (in the scratch cache directory): one miss per query, then hits
+        for query in case["queries"]:
+            generate_design_system(query, "Benchmark", cache=True)
+        samples = []
+        for _ in range(case["rounds"]):
+            for query in case["queries"]:
+                t = time.perf_counter()
+                generate_design_system(query, "Benchmark", cache=True)
+                samples.append(_elapsed_ms(t))
+        metrics.update({f"cached.{k}": v for k, v in percentiles(samples).items()})
+        info = {"queries": len(case["queries"]), "rounds": case["rounds"]}
+
+    else:
+        raise ValueError(f"Unknown benchmark case: {case['kind']}")
+
+    metrics["peak_rss_mb"] = peak_rss_mb()
+    info["wall_s"] = round(time.perf_counter() - start, 2)
+    result = {"id": case["id"], "kind": case["kind"], "info": info, "metrics": metrics}
+    if errors:
+        result["errors"] = errors
+    return result
+
+
+def run_isolated(case):
+    """Run a case in a freshly spawned interpreter so peak RSS is not shared"""
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+        return pool.submit(run_case, case).result()
+
+
+# ============ CASE PLANNING ============
+def plan_cases(args, workdir):
+    """List the cases to run; synthetic corpora are generated here, outside the measured process"""
+    cache_dir = str(workdir / "cache")
+    engines = [e for e in args.engines.split(",") if e]
+    if "numpy" in engines and not VECTOR_ENGINE_AVAILABLE:
+        engines.remove("numpy")
+    common = {"cache_dir": cache_dir, "engines": engines, "queries": args.queries, "seed": args.seed}
+    cases = []
+
+    if not args.no_synthetic:
+        sizes = QUICK_SIZES if args.quick else [s for s in args.sizes.split(",") if s]
+        for shape in [s for s in args.shapes.split(",") if s]:
+            config = CSV_CONFIG[SHAPES[shape]]
+            for size in sizes:
+                path = workdir / f"{shape}-{size}.csv"
+                print(f"Generating {path.name} ...", file=sys.stderr)
+                generate_corpus(shape, SIZES[size], path, args.seed)
+                cases.append(dict(common, id=f"synthetic/{shape}/{size}", kind="synthetic", file=str(path),
+                                  search_cols=config["search_cols"], output_cols=config["output_cols"],
+                                  filter_cols=config.get("filter_cols", [])))
+
+    if not args.no_bundled:
+        for name, filepath, search_cols, output_cols, filter_cols in core.index_specs():
+            if not filepath.exists():
+                continue
+            stack = name.split(":", 1)[1] if name.startswith("stack:") else None
+            cases.append(dict(common, id=f"bundled/{name}", kind="bundled", file=str(filepath),
+                              search_cols=search_cols, output_cols=output_cols, filter_cols=filter_cols,
+                              domain=None if stack else name, stack=stack))
+        cases.append({"id": "design/generate_design_system", "kind": "design", "cache_dir": cache_dir,
+                      "queries": DESIGN_QUERIES, "rounds": 5})
+        labels = {}
+        for label in load_labels(args.labels):
+            labels.setdefault(label["domain"], []).append(label)
+        for domain, domain_labels in labels.items():
+            if domain not in CSV_CONFIG:
+                raise ValueError(f"Unknown domain in {args.labels}: {domain}")
+            cases.append(dict(common, id=f"relevance/{domain}", kind="relevance", domain=domain,
+                              labels=domain_labels, rounds=RELEVANCE_ROUNDS))
+    return cases
+
+
+# ============ REGRESSION CHECK ============
+def compare(report, baseline, tolerance=DEFAULT_TOLERANCE):
+    """List metrics that got slower (or bigger) than the baseline allows"""
+    previous = {case["id"]: case["metrics"] for case in baseline.get("cases", [])}
+    regressions = []
+    for case in report["cases"]:
+        old_metrics = previous.get(case["id"], {})
+        for metric, new in case["metrics"].items():
+            old = old_metrics.get(metric)
+            if metric.startswith("quality.") and new is not None and old is not None:
+                if new < old - QUALITY_TOLERANCE:
+                    regressions.append({"case": case["id"], "metric": metric, "baseline": old, "current": new,
+                                        "ratio": round(new / old, 3) if old else None})
+                continue
+            suffix = next((s for s in MIN_DELTA if metric.endswith(s)), None)
+            if suffix is None or new is None or old is None:
+                continue
+            if new > old * (1 + tolerance) and new - old > MIN_DELTA[suffix]:
+                regressions.append({
+                    "case": case["id"], "metric": metric, "baseline": old, "current": new,
+                    "ratio": round(new / old, 3) if old else None
+                })
+    return regressions
+
+
+def check_quality(report):
+    """List engines whose labelled-query quality differs from the exhaustive reference in the same run"""
+    mismatches = []
+    for case in report["cases"]:
+        metrics = case["metrics"]
+        for measure in ("ndcg", "mrr"):
+            reference = metrics.get(f"quality.{REFERENCE_ENGINE}.{measure}")
+            if reference is None:
+                continue
+            for engine in ENGINES:
+                value = metrics.get(f"quality.{engine}.{measure}")
+                if value is not None and abs(value - reference) > QUALITY_TOLERANCE:
+                    mismatches.append({"case": case["id"], "metric": f"quality.{engine}.{measure}",
+                                       "baseline": reference, "current": value,
+                                       "ratio": round(value / reference, 3) if reference else None})
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="UI Pro Max search benchmark")
+    parser.add_argument("--sizes", default=",".join(SIZES), help=f"Synthetic corpus sizes ({', '.join(SIZES)})")
+    parser.add_argument("--shapes", default=",".join(SHAPES), help=f"Synthetic corpus shapes ({', '.join(SHAPES)})")
+    parser.add_argument("--quick", action="store_true", help=f"Only synthetic sizes {', '.join(QUICK_SIZES)}")
+    parser.add_argument("--engines", default=",".join(ENGINES), help="Engines to time (comma separated)")
+    parser.add_argument("--queries", type=int, default=QUERIES_PER_CASE, help="Queries per case")
+    parser.add_argument("--seed", type=int, default=42, help="Seed for corpora and queries")
+    parser.add_argument("--no-synthetic", action="store_true", help="Skip synthetic corpora")
+    parser.add_argument("--no-bundled", action="store_true", help="Skip bundled data and design-system cases")
+    parser.add_argument("--labels", default=str(RELEVANCE_FILE), help="Labelled queries for the relevance cases (JSONL)")
+    parser.add_argument("--output", "-o", help="Write the JSON report to this file instead of stdout")
+    parser.add_argument("--baseline", help="Earlier JSON report to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Allowed slowdown ratio (default 0.25)")
+    args = parser.parse_args()
+
+    for size in args.sizes.split(","):
+        if size and size not in SIZES:
+            parser.error(f"Unknown size: {size} (choose from {', '.join(SIZES)})")
+    for shape in args.shapes.split(","):
+        if shape and shape not in SHAPES:
+            parser.error(f"Unknown shape: {shape} (choose from {', '.join(SHAPES)})")
+
+    with tempfile.TemporaryDirectory(prefix="ui-pro-max-bench-") as tmp:
+        workdir = Path(tmp)
+        results = []
+        for case in plan_cases(args, workdir):
+            print(f"Running {case['id']} ...", file=sys.stderr)
+            results.append(run_isolated(case))
+
+    report = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "index_cache_version": core.INDEX_CACHE_VERSION,
+            "vector_engine": VECTOR_ENGINE_AVAILABLE,
+            "queries_per_case": args.queries,
+            "max_results": MAX_RESULTS,
+            "relevance_k": RELEVANCE_K,
+        },
+        "thresholds": {
+            "tolerance": args.tolerance,
+            "min_delta": MIN_DELTA,
+            "compared": "metrics ending in _ms or _mb; lower is better",
+            "quality": f"quality.* (nDCG@{RELEVANCE_K}, MRR@{RELEVANCE_K}); higher is better, "
+                       f"engines must match {REFERENCE_ENGINE}",
+        },
+        "cases": results,
+    }
+
+    regressions = check_quality(report)
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions += compare(report, json.load(f), args.tolerance)
+    if regressions or args.baseline:
+        report["regressions"] = regressions
+    # Variants that failed have no quality metrics, so they would otherwise pass every check
+    failures = [{"case": case["id"], "variant": variant, "error": error}
+                for case in report["cases"] for variant, error in case.get("errors", {}).items()]
+    if failures:
+        report["errors"] = failures
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    for r in regressions:
+        print(f"REGRESSION {r['case']} {r['metric']}: {r['baseline']} -> {r['current']}", file=sys.stderr)
+    for f in failures:
+        print(f"ERROR {f['case']} {f['variant']}: {f['error']}", file=sys.stderr)
+    sys.exit(1 if regressions or failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,20 +5,50 @@ UI/UX Pro Max Core - BM25 search engine for UI/UX style guides
 """
 
 import csv
+import hashlib
+import heapq
+import importlib.util
+import io
+import os
+import pickle
 import re
+import secrets
+import sys
+import threading
+import time
+import unicodedata
+from array import array
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager, nullcontext
+from functools import lru_cache, wraps
+from itertools import chain
 from pathlib import Path
 from math import log
-from collections import defaultdict
+from collections import Counter, OrderedDict, defaultdict, deque
+from multiprocessing import get_context
 
 # ============ CONFIGURATION ============
 DATA_DIR = Path(__file__).parent.parent / "data"
+CACHE_DIR = Path(__file__).parent.parent / ".cache"
+INDEX_CACHE_VERSION = 12
 MAX_RESULTS = 3
+RESULT_CACHE_SIZE = 1024  # LRU entries of (query, data file, max_results) -> results; 0 disables
+ANALYZER_CACHE_SIZE = 4096  # LRU entries of query string -> analysed tokens
+SESSION_RESULT_SIZE = 512  # LRU entries of (domain, query tokens, max_results) -> rows kept by a SearchSession
+STEMMER_ENV = "UI_PRO_MAX_STEMMER"  # "en" or "es" to stem tokens at index and query time
+FUZZY_EDITS = [(8, 2), (4, 1)]  # (min token length, max edits) for expanding unknown query tokens
+FUZZY_MAX_EXPANSIONS = 3  # vocabulary terms an unknown token may expand to
+WATCH_INTERVAL = 1.0  # seconds between IndexWatcher polls of the data files
+COMPACT_RATIO = 0.5  # update_index() rebuilds once deleted rows exceed this share of doc ids
+WARM_POOL_MIN_BYTES = 4 * 1024 * 1024  # warm_all() fits smaller totals in-process: spawning workers costs more
 
 CSV_CONFIG = {
     "style": {
         "file": "styles.csv",
         "search_cols": ["Style Category", "Keywords", "Best For", "Type", "AI Prompt Keywords"],
-        "output_cols": ["Style Category", "Type", "Keywords", "Primary Colors", "Effects & Animation", "Best For", "Performance", "Accessibility", "Framework Compatibility", "Complexity", "AI Prompt Keywords", "CSS/Technical Keywords", "Implementation Checklist", "Design System Variables"]
+        "output_cols": ["Style Category", "Type", "Keywords", "Primary Colors", "Effects & Animation", "Best For", "Performance", "Accessibility", "Framework Compatibility", "Complexity", "AI Prompt Keywords", "CSS/Technical Keywords", "Implementation Checklist", "Design System Variables"],
+        "filter_cols": ["Type", "Complexity"]
     },
     "color": {
         "file": "colors.csv",
@@ -43,27 +73,32 @@ CSV_CONFIG = {
     "ux": {
         "file": "ux-guidelines.csv",
         "search_cols": ["Category", "Issue", "Description", "Platform"],
-        "output_cols": ["Category", "Issue", "Platform", "Description", "Do", "Don't", "Code Example Good", "Code Example Bad", "Severity"]
+        "output_cols": ["Category", "Issue", "Platform", "Description", "Do", "Don't", "Code Example Good", "Code Example Bad", "Severity"],
+        "filter_cols": ["Category", "Platform", "Severity"]
     },
     "typography": {
         "file": "typography.csv",
         "search_cols": ["Font Pairing Name", "Category", "Mood/Style Keywords", "Best For", "Heading Font", "Body Font"],
-        "output_cols": ["Font Pairing Name", "Category", "Heading Font", "Body Font", "Mood/Style Keywords", "Best For", "Google Fonts URL", "CSS Import", "Tailwind Config", "Notes"]
+        "output_cols": ["Font Pairing Name", "Category", "Heading Font", "Body Font", "Mood/Style Keywords", "Best For", "Google Fonts URL", "CSS Import", "Tailwind Config", "Notes"],
+        "filter_cols": ["Category"]
     },
     "icons": {
         "file": "icons.csv",
         "search_cols": ["Category", "Icon Name", "Keywords", "Best For"],
-        "output_cols": ["Category", "Icon Name", "Keywords", "Library", "Import Code", "Usage", "Best For", "Style"]
+        "output_cols": ["Category", "Icon Name", "Keywords", "Library", "Import Code", "Usage", "Best For", "Style"],
+        "filter_cols": ["Category", "Library", "Style"]
     },
     "react": {
         "file": "react-performance.csv",
         "search_cols": ["Category", "Issue", "Keywords", "Description"],
-        "output_cols": ["Category", "Issue", "Platform", "Description", "Do", "Don't", "Code Example Good", "Code Example Bad", "Severity"]
+        "output_cols": ["Category", "Issue", "Platform", "Description", "Do", "Don't", "Code Example Good", "Code Example Bad", "Severity"],
+        "filter_cols": ["Category", "Platform", "Severity"]
     },
     "web": {
         "file": "web-interface.csv",
         "search_cols": ["Category", "Issue", "Keywords", "Description"],
-        "output_cols": ["Category", "Issue", "Platform", "Description", "Do", "Don't", "Code Example Good", "Code Example Bad", "Severity"]
+        "output_cols": ["Category", "Issue", "Platform", "Description", "Do", "Don't", "Code Example Good", "Code Example Bad", "Severity"],
+        "filter_cols": ["Category", "Platform", "Severity"]
     }
 }
 
@@ -86,153 +121,1721 @@ STACK_CONFIG = {
 # Common columns for all stacks
 _STACK_COLS = {
     "search_cols": ["Category", "Guideline", "Description", "Do", "Don't"],
-    "output_cols": ["Category", "Guideline", "Description", "Do", "Don't", "Code Good", "Code Bad", "Severity", "Docs URL"]
+    "output_cols": ["Category", "Guideline", "Description", "Do", "Don't", "Code Good", "Code Bad", "Severity", "Docs URL"],
+    "filter_cols": ["Category", "Severity"]
 }
 
 AVAILABLE_STACKS = list(STACK_CONFIG.keys())
 
+# Query processors for BM25.top_k: "inverted" walks posting lists, "exhaustive" scores every document,
+# "maxscore" walks posting lists but skips documents that cannot reach the top k,
+# "numpy" multiplies a sparse query batch by a CSR term-document weight matrix (needs numpy + scipy)
+ENGINES = ["inverted", "exhaustive", "maxscore", "numpy"]
+DEFAULT_ENGINE = "inverted"
+# Relative slack on score upper bounds: sums taken in another order may differ in the last bits
+PRUNE_EPSILON = 1e-9
+# numpy/scipy are optional and imported on first use: they would dominate CLI startup time
+VECTOR_ENGINE_AVAILABLE = all(importlib.util.find_spec(name) is not None for name in ("numpy", "scipy"))
+DEFAULT_BATCH_ENGINE = "numpy" if VECTOR_ENGINE_AVAILABLE else DEFAULT_ENGINE
+
+# Storage backends: in-memory BM25 indexes, or the compiled SQLite FTS5 database (see fts.py)
+BACKENDS = ["bm25", "sqlite"]
+BACKEND_ENV = "UI_PRO_MAX_BACKEND"
+DEFAULT_BACKEND = os.environ.get(BACKEND_ENV) or "bm25"
+
+
+def _vector_modules():
+    """Import numpy and scipy.sparse for the vectorised engine"""
+    if not VECTOR_ENGINE_AVAILABLE:
+        raise RuntimeError("The numpy engine requires numpy and scipy (pip install numpy scipy)")
+    import numpy
+    from scipy import sparse
+    return numpy, sparse
+
+
+# ============ TEXT ANALYSIS ============
+# Runs of word characters: the same tokens as replacing punctuation with spaces and splitting
+_WORD = re.compile(r'\w+')
+_COMBINING_MARKS = re.compile('[\u0300-\u036f]')  # diacritics left over after NFD decomposition
+
+
+def fold_accents(text):
+    """Strip diacritics: "barbería" -> "barberia" (ASCII text is returned as is)"""
+    if text.isascii():
+        return text
+    return _COMBINING_MARKS.sub('', unicodedata.normalize("NFD", text))
+
+
+def stem_en(token):
+    """Light English stemmer: plural "-s" forms only (Harman's S-stemmer)"""
+    if len(token) > 3:
+        if token.endswith("ies") and not token.endswith(("eies", "aies")):
+            return token[:-3] + "y"
+        if token.endswith("es") and not token.endswith(("aes", "ees", "oes")):
+            return token[:-1]
+        if token.endswith("s") and not token.endswith(("us", "ss")):
+            return token[:-1]
+    return token
+
+
+def stem_es(token):
+    """Light Spanish stemmer: plural and final gender vowel (reservas -> reserv, citas -> cita)"""
+    if len(token) > 5 and token.endswith("ces"):
+        token = token[:-3] + "z"
+    elif len(token) > 4 and token.endswith("es") and token[-3] not in "aeiou":
+        token = token[:-2]
+    elif len(token) > 3 and token.endswith("s"):
+        token = token[:-1]
+    if len(token) > 4 and token[-1] in "aoe":
+        token = token[:-1]
+    return token
+
+
+STEMMERS = {"en": stem_en, "es": stem_es}
+
+
+class Analyzer:
+    """Text -> tokens pipeline run at both index and query time.
+
+    Lowercase, fold accents, split on anything but word characters, drop tokens
+    shorter than min_length, then stem. stemmer is None, a STEMMERS name or any
+    callable taking and returning one token. Query analysis is memoised (LRU).
+    """
+
+    def __init__(self, fold=True, stemmer=None, min_length=3, cache_size=ANALYZER_CACHE_SIZE):
+        if isinstance(stemmer, str) and stemmer not in STEMMERS:
+            raise ValueError(f"Unknown stemmer: {stemmer}. Available: {', '.join(STEMMERS)}")
+        self.fold = fold
+        self.stemmer = stemmer
+        self.min_length = min_length
+        self.cache_size = cache_size
+        self._setup()
+
+    def _setup(self):
+        self._stem = STEMMERS[self.stemmer] if isinstance(self.stemmer, str) else self.stemmer
+        self.analyze_query = lru_cache(maxsize=self.cache_size)(self._analyze_query)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_stem"], state["analyze_query"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._setup()
+
+    def signature(self):
+        """Settings that change the tokens: indexes built with another signature are stale"""
+        stemmer = self.stemmer if self.stemmer is None or isinstance(self.stemmer, str) else getattr(self.stemmer, "__name__", repr(self.stemmer))
+        return (self.fold, stemmer, self.min_length)
+
+    def analyze(self, text):
+        """Tokens of a document or query"""
+        text = str(text).lower()
+        if self.fold:
+            text = fold_accents(text)
+        min_length = self.min_length
+        tokens = [w for w in _WORD.findall(text) if len(w) >= min_length]
+        if self._stem is not None:
+            stem = self._stem
+            tokens = [stem(w) for w in tokens]
+        return tokens
+
+    def _analyze_query(self, query):
+        return tuple(self.analyze(query))
+
+
+def _env_stemmer():
+    """Stemmer named by $UI_PRO_MAX_STEMMER; an unknown name is reported on stderr and ignored,
+    so a typo there does not break every entry point at import"""
+    stemmer = os.environ.get(STEMMER_ENV) or None
+    if stemmer is not None and stemmer not in STEMMERS:
+        print(f"Ignoring {STEMMER_ENV}={stemmer}: unknown stemmer (available: {', '.join(STEMMERS)})", file=sys.stderr)
+        return None
+    return stemmer
+
+
+ANALYZER = Analyzer(stemmer=_env_stemmer())
+
+
+def set_analyzer(analyzer):
+    """Use another Analyzer for every index from now on; resident indexes and cached results are dropped"""
+    global ANALYZER
+    ANALYZER = analyzer
+    _RESIDENT_INDEXES.clear()
+    _UNIFIED_INDEX.update(key=None, index=None)
+    _RESULT_CACHE.clear()
+
+
+def _trigrams(word):
+    """Distinct trigrams of a word padded with a space on each side ("ui" -> " ui", "ui ")"""
+    padded = f" {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _bigrams(word):
+    """Distinct bigrams of a word padded with a space on each side ("ui" -> " u", "ui", "i ")"""
+    padded = f" {word} "
+    return {padded[i:i + 2] for i in range(len(padded) - 1)}
+
+
+def _edit_distance(a, b, bound):
+    """Edit distance (insert, delete, substitute, swap adjacent) between a and b, or bound + 1 if larger"""
+    if abs(len(a) - len(b)) > bound:
+        return bound + 1
+    before, previous = None, list(range(len(b) + 1))
+    for i, char in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, other in enumerate(b, 1):
+            cost = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char != other))
+            if j > 1 and i > 1 and char == b[j - 2] and a[i - 2] == other:
+                cost = min(cost, before[j - 2] + 1)
+            current[j] = cost
+        if min(current) > bound:
+            return bound + 1
+        before, previous = previous, current
+    return min(previous[-1], bound + 1)
+
+
+# ============ PROFILING ============
+# The profiler of the current thread, if any: a server profiling one request does not see the others
+_PROFILE_STATE = threading.local()
+_NO_STAGE = nullcontext()
+
+
+class Profiler:
+    """Wall time per pipeline stage, keyed by the path of stages open when it ran"""
+
+    def __init__(self):
+        self.stages = {}  # ("search:style", "bm25_score") -> [calls, seconds]
+        self._open = []
+        self.started = time.perf_counter()
+        self.elapsed = None
+
+    @contextmanager
+    def stage(self, name):
+        self._open.append(name)
+        timing = self.stages.setdefault(tuple(self._open), [0, 0.0])
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            timing[0] += 1
+            timing[1] += time.perf_counter() - start
+            self._open.pop()
+
+    def report(self):
+        """Breakdown of the profiled block: stages in the order they first ran, nested by path"""
+        elapsed = self.elapsed if self.elapsed is not None else time.perf_counter() - self.started
+        return {
+            "total_ms": round(elapsed * 1000, 3),
+            "stages": [
+                {
+                    "stage": "/".join(path),
+                    "depth": len(path) - 1,
+                    "calls": calls,
+                    "total_ms": round(seconds * 1000, 3),
+                    "mean_ms": round(seconds * 1000 / calls, 3) if calls else 0.0
+                }
+                for path, (calls, seconds) in self.stages.items()
+            ]
+        }
+
+
+def profile_stage(name):
+    """Time a block as stage `name` when this thread is profiling; a no-op otherwise"""
+    profiler = getattr(_PROFILE_STATE, "profiler", None)
+    return _NO_STAGE if profiler is None else profiler.stage(name)
+
+
+@contextmanager
+def profiling(stats_path=None):
+    """Profile every search and design-system call made by this thread inside the block.
+
+    Yields a Profiler; its report() gives per-stage timings. With stats_path the
+    same block also runs under cProfile and the stats are written there (pstats format).
+
+        with profiling("search.pstats") as profiler:
+            search("glassmorphism dark", "style")
+        print(profiler.report())
+    """
+    profiler = Profiler()
+    previous = getattr(_PROFILE_STATE, "profiler", None)
+    _PROFILE_STATE.profiler = profiler
+    cprofile = None
+    if stats_path:
+        import cProfile
+        cprofile = cProfile.Profile()
+        cprofile.enable()
+    try:
+        yield profiler
+    finally:
+        if cprofile is not None:
+            cprofile.disable()
+            cprofile.dump_stats(str(stats_path))
+        profiler.elapsed = time.perf_counter() - profiler.started
+        _PROFILE_STATE.profiler = previous
+
 
 # ============ BM25 IMPLEMENTATION ============
 class BM25:
-    """BM25 ranking algorithm for text search"""
+    """BM25 ranking algorithm for text search.
+
+    The index is array-backed: terms are interned to integer ids and each term's
+    posting list is a pair of parallel arrays (ascending doc ids, term frequencies),
+    so large corpora cost a few bytes per posting instead of Python objects.
+
+    Documents can be added, updated and deleted after fitting. Deleted ids stay
+    reserved (tombstones), so N counts live documents while `size` is the id range.
+    Ties rank by CSV row position, which `positions` records once updates have
+    moved rows away from their doc ids, so an updated index ranks like a fresh one.
+    """
 
-    def __init__(self, k1=1.5, b=0.75):
+    def __init__(self, k1=1.5, b=0.75, analyzer=None):
         self.k1 = k1
         self.b = b
-        self.corpus = []
-        self.doc_lengths = []
+        self.analyzer = analyzer or ANALYZER
+        self.N = 0                        # live documents
         self.avgdl = 0
-        self.idf = {}
-        self.doc_freqs = defaultdict(int)
-        self.N = 0
+        self.total_length = 0             # sum of live document lengths
+        self.deleted = set()              # tombstoned doc ids
+        self.vocab = {}                   # term -> term id
+        self.doc_freqs = array('I')       # term id -> document frequency
+        self.idf = array('d')             # term id -> idf
+        self.post_docs = []               # term id -> array('I') of doc ids
+        self.post_tfs = []                # term id -> array('I') of term frequencies
+        self.doc_lengths = array('I')     # doc id -> token count
+        self.norms = array('d')           # doc id -> k1 * (1 - b + b * len / avgdl)
+        self.max_weights = array('d')     # term id -> largest weight in its postings, -1 until first used
+        self.positions = None             # doc id -> CSV row position; None while ids follow row order
+        # Vectorised backend: CSR (terms x docs) weights, built on first "numpy" query
+        self._weights = None
+        # Set by incremental changes: idf, norms and bounds are recomputed before the next query
+        self._stale = False
+        # Fuzzy matching: trigram -> term ids, (bigram, term length) -> term ids, term id -> term,
+        # and memoised expansions
+        self._trigrams = None
+        self._bigrams = None
+        self._terms = None
+        self._expansions = {}
+        # Document changes: doc id -> array('I') of its term ids, built on the first change
+        self._doc_terms = None
+
+    def __getstate__(self):
+        """Pickle without the weight matrix (so cached indexes load without numpy/scipy), fuzzy lookups or forward index"""
+        state = self.__dict__.copy()
+        state.update(_weights=None, _trigrams=None, _bigrams=None, _terms=None, _expansions={}, _doc_terms=None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        # Share the process-wide analyzer (and its query cache) when the settings match
+        if self.analyzer.signature() == ANALYZER.signature():
+            self.analyzer = ANALYZER
 
     def tokenize(self, text):
-        """Lowercase, split, remove punctuation, filter short words"""
-        text = re.sub(r'[^\w\s]', ' ', str(text).lower())
-        return [w for w in text.split() if len(w) > 2]
+        """Analyse document text into tokens"""
+        return self.analyzer.analyze(text)
+
+    def tokenize_query(self, query):
+        """Analyse a query into a tuple of tokens, memoised by the analyzer; a tuple is taken as already analysed"""
+        if isinstance(query, tuple):
+            return query
+        return self.analyzer.analyze_query(query)
 
     def fit(self, documents):
         """Build BM25 index from documents"""
-        self.corpus = [self.tokenize(doc) for doc in documents]
-        self.N = len(self.corpus)
-        if self.N == 0:
-            return
-        self.doc_lengths = [len(doc) for doc in self.corpus]
-        self.avgdl = sum(self.doc_lengths) / self.N
+        self.fit_tokens(self.tokenize(doc) for doc in documents)
 
-        for doc in self.corpus:
-            seen = set()
+    def fit_tokens(self, corpus):
+        """Build BM25 index from already tokenized documents"""
+        for idx, doc in enumerate(corpus):
+            term_freqs = {}
             for word in doc:
-                if word not in seen:
-                    self.doc_freqs[word] += 1
-                    seen.add(word)
+                term_freqs[word] = term_freqs.get(word, 0) + 1
+            for word, tf in term_freqs.items():
+                term = self.vocab.get(word)
+                if term is None:
+                    term = self.vocab[word] = len(self.post_docs)
+                    self.post_docs.append(array('I'))
+                    self.post_tfs.append(array('I'))
+                self.post_docs[term].append(idx)
+                self.post_tfs[term].append(tf)
+            self.doc_lengths.append(len(doc))
+        self._finalize()
+
+    @property
+    def size(self):
+        """Number of doc ids in use, tombstones included"""
+        return len(self.doc_lengths)
+
+    def _finalize(self):
+        """Derive N, avgdl, idf and length norms from postings and document lengths"""
+        self.doc_freqs = array('I', (len(docs) for docs in self.post_docs))
+        self.total_length = sum(self.doc_lengths)
+        self.N = self.size - len(self.deleted)
+        self._refresh()
+
+    def _refresh(self):
+        """Recompute avgdl, idf, length norms and term bounds from N, document frequencies and lengths"""
+        self.avgdl = self.total_length / self.N if self.N else 0
+        self.idf = array('d', (log((self.N - freq + 0.5) / (freq + 0.5) + 1) for freq in self.doc_freqs))
+        if self.avgdl:
+            self.norms = array('d', (self.k1 * (1 - self.b + self.b * doc_len / self.avgdl) for doc_len in self.doc_lengths))
+        else:
+            self.norms = array('d', [self.k1 * (1 - self.b)] * self.size)
+        self.max_weights = array('d', [-1.0]) * len(self.post_docs)
+        self._weights = None
+        self._expansions = {}
+        self._stale = False
+
+    def add_document(self, tokens):
+        """Index one more tokenized document and return its doc id"""
+        idx = self.size
+        self._forward_index().append(array('I'))
+        self.doc_lengths.append(0)
+        self.norms.append(0.0)
+        self.N += 1
+        self._insert_postings(idx, tokens)
+        return idx
+
+    def update_document(self, idx, tokens):
+        """Replace the tokens of a document, reviving it if it was deleted"""
+        if idx in self.deleted:
+            self.deleted.discard(idx)
+            self.N += 1
+        else:
+            self._remove_postings(idx)
+        self._insert_postings(idx, tokens)
+
+    def delete_document(self, idx):
+        """Remove a document from the index; its id stays reserved as a tombstone"""
+        if idx in self.deleted:
+            return
+        self._remove_postings(idx)
+        self.deleted.add(idx)
+        self.N -= 1
+
+    def _forward_index(self):
+        """Doc id -> array('I') of its term ids, built on the first document change and kept up to date"""
+        if self._doc_terms is None:
+            doc_terms = [array('I') for _ in range(self.size)]
+            for term, docs in enumerate(self.post_docs):
+                for idx in docs:
+                    doc_terms[idx].append(term)
+            self._doc_terms = doc_terms
+        return self._doc_terms
+
+    def _insert_postings(self, idx, tokens):
+        """Add a document's postings, keeping each posting list in doc id order"""
+        term_freqs = {}
+        for word in tokens:
+            term_freqs[word] = term_freqs.get(word, 0) + 1
+        doc_terms = self._forward_index()[idx]
+        for word, tf in term_freqs.items():
+            term = self.vocab.get(word)
+            if term is None:
+                term = self.vocab[word] = len(self.post_docs)
+                self.post_docs.append(array('I'))
+                self.post_tfs.append(array('I'))
+                self.doc_freqs.append(0)
+                self.idf.append(0.0)
+                self.max_weights.append(-1.0)
+                if self._trigrams is not None:
+                    for gram in _trigrams(word):
+                        self._trigrams.setdefault(gram, array('I')).append(term)
+                if self._bigrams is not None:
+                    for gram in _bigrams(word):
+                        self._bigrams.setdefault((gram, len(word)), array('I')).append(term)
+            docs = self.post_docs[term]
+            position = bisect_left(docs, idx)
+            docs.insert(position, idx)
+            self.post_tfs[term].insert(position, tf)
+            self.doc_freqs[term] += 1
+            doc_terms.append(term)
+        self.doc_lengths[idx] = len(tokens)
+        self.total_length += len(tokens)
+        self._stale = True
+
+    def _remove_postings(self, idx):
+        """Drop a document's postings: only the lists of its own terms, found by binary search"""
+        doc_terms = self._forward_index()
+        for term in doc_terms[idx]:
+            docs = self.post_docs[term]
+            position = bisect_left(docs, idx)
+            del docs[position]
+            del self.post_tfs[term][position]
+            self.doc_freqs[term] -= 1
+        doc_terms[idx] = array('I')
+        self.total_length -= self.doc_lengths[idx]
+        self.doc_lengths[idx] = 0
+        self._stale = True
+
+    def _query_terms(self, query, fuzzy=False):
+        """Term ids of the query tokens found in the vocabulary, in query order.
+
+        With fuzzy, unknown tokens are replaced by their nearest vocabulary terms (see expand()).
+        """
+        if self._stale:
+            self._refresh()
+        vocab = self.vocab
+        if not fuzzy:
+            return [vocab[token] for token in self.tokenize_query(query) if token in vocab]
+        terms = []
+        for token in self.tokenize_query(query):
+            if token in vocab:
+                terms.append(vocab[token])
+            else:
+                terms.extend(self.expand(token))
+        return terms
+
+    def expand(self, token):
+        """Term ids of the vocabulary terms nearest to token within FUZZY_EDITS, most frequent first.
+
+        Candidates come from an n-gram index and must share enough n-grams to be within
+        the edit bound; only those are checked with a bounded edit distance (adjacent
+        transpositions count as one edit), so the vocabulary is never scanned.
+        """
+        expansions = self._expansions.get(token)
+        if expansions is not None:
+            return expansions
+        bound = next((edits for length, edits in FUZZY_EDITS if len(token) >= length), 0)
+        expansions = ()
+        if bound:
+            # An edit breaks at most 4 of the token's trigrams (a transposition; 3 for the others)
+            # and at most 3 of its bigrams, so a term within the bound shares at least one as
+            # long as the token has more of them than the edits can break
+            if len(token) > 4 * bound:
+                grams, per_edit = _trigrams(token), 4
+                trigrams = self._trigram_index()
+                postings = [trigrams.get(gram, ()) for gram in grams]
+            else:
+                # Short tokens ("wtih" shares no trigram with "with"): bigram postings are split
+                # by term length, so only terms of a near length are counted
+                grams, per_edit = _bigrams(token), 3
+                bigrams = self._bigram_index()
+                postings = [bigrams.get((gram, length), ()) for gram in grams
+                            for length in range(len(token) - bound, len(token) + bound + 1)]
+            shared = Counter()
+            shared.update(chain.from_iterable(postings))
+            least = len(grams) - per_edit * bound
+            words = self._words()
+            # best is the distance a term must match or beat; _edit_distance() gives best + 1 beyond it
+            best, matches = bound, []
+            # Most shared n-grams first; once a closer match is found the bar rises
+            candidates = [item for item in shared.items() if item[1] >= least] if least > 1 else shared.items()
+            for term, count in sorted(candidates, key=lambda item: item[1], reverse=True):
+                if count < len(grams) - per_edit * best:
+                    break
+                if not self.doc_freqs[term] or abs(len(words[term]) - len(token)) > best:
+                    continue
+                distance = _edit_distance(token, words[term], best)
+                if distance < best:
+                    best, matches = distance, [term]
+                elif distance == best:
+                    matches.append(term)
+            # Ties by the term itself: term ids depend on the order documents were added
+            matches.sort(key=lambda term: (-self.doc_freqs[term], words[term]))
+            expansions = tuple(matches[:FUZZY_MAX_EXPANSIONS])
+        self._expansions[token] = expansions
+        return expansions
+
+    def _words(self):
+        """Term id -> term, built on first use"""
+        if self._terms is None or len(self._terms) != len(self.vocab):
+            terms = [None] * len(self.vocab)
+            for word, term in self.vocab.items():
+                terms[term] = word
+            self._terms = terms
+        return self._terms
+
+    def _trigram_index(self):
+        """Trigram -> array('I') of the term ids containing it, built on first fuzzy query"""
+        if self._trigrams is None:
+            trigrams = defaultdict(lambda: array('I'))
+            for word, term in self.vocab.items():
+                for gram in _trigrams(word):
+                    trigrams[gram].append(term)
+            self._trigrams = dict(trigrams)
+        return self._trigrams
+
+    def _bigram_index(self):
+        """(bigram, term length) -> array('I') of the term ids, built on the first short fuzzy token"""
+        if self._bigrams is None:
+            bigrams = defaultdict(lambda: array('I'))
+            for word, term in self.vocab.items():
+                for gram in _bigrams(word):
+                    bigrams[gram, len(word)].append(term)
+            self._bigrams = dict(bigrams)
+        return self._bigrams
+
+    def _postings(self, term, mask=None):
+        """(doc id, tf) pairs of a term, restricted to the documents set in a row bitmap"""
+        pairs = zip(self.post_docs[term], self.post_tfs[term])
+        if mask is None:
+            return pairs
+        return ((idx, tf) for idx, tf in pairs if mask[idx >> 3] >> (idx & 7) & 1)
 
-        for word, freq in self.doc_freqs.items():
-            self.idf[word] = log((self.N - freq + 0.5) / (freq + 0.5) + 1)
+    def score(self, query, mask=None, fuzzy=False):
+        """Score all documents against query (documents outside mask score 0)"""
+        scores = [0] * self.size
+        for term in self._query_terms(query, fuzzy):
+            idf = self.idf[term]
+            for idx, tf in self._postings(term, mask):
+                numerator = tf * (self.k1 + 1)
+                denominator = tf + self.norms[idx]
+                scores[idx] += idf * numerator / denominator
 
-    def score(self, query):
-        """Score all documents against query"""
-        query_tokens = self.tokenize(query)
-        scores = []
+        return sorted(enumerate(scores), key=self.rank_key(), reverse=True)
 
-        for idx, doc in enumerate(self.corpus):
+    def score_postings(self, query, mask=None, fuzzy=False):
+        """Score only documents containing a query term (and set in mask), via the inverted index"""
+        terms = self._query_terms(query, fuzzy)
+        scores = {}
+        norms = self.norms
+        k1_plus_1 = self.k1 + 1
+        for term in terms:
+            idf = self.idf[term]
+            for idx, tf in self._postings(term, mask):
+                numerator = tf * k1_plus_1
+                denominator = tf + norms[idx]
+                scores[idx] = scores.get(idx, 0) + idf * numerator / denominator
+        return scores
+
+    def rank_key(self):
+        """Sort key of (doc id, score) pairs, largest first: higher score, then earlier CSV row"""
+        positions = self.positions
+        if positions is None:
+            return lambda item: (item[1], -item[0])
+        return lambda item: (item[1], -positions[item[0]])
+
+    def top_k(self, query, k=None, engine=DEFAULT_ENGINE, mask=None, fuzzy=False):
+        """Return up to k (doc index, score) pairs with score > 0, best first.
+
+        Ties go to the earlier CSV row, so every engine ranks exactly like score().
+        mask is an optional row bitmap (see filter_mask()): other documents are never scored.
+        fuzzy expands query tokens missing from the vocabulary to their nearest terms.
+        """
+        if engine == "exhaustive":
+            ranked = self.score(query, mask, fuzzy)
+            return [(idx, score) for idx, score in (ranked if k is None else ranked[:k]) if score > 0]
+        if engine == "numpy":
+            return self.top_k_many([query], k, engine, mask, fuzzy)[0]
+        if engine == "maxscore" and k is not None:
+            return self._top_k_maxscore(query, k, mask, fuzzy)
+        if engine not in ("inverted", "maxscore"):
+            raise ValueError(f"Unknown engine: {engine}. Available: {', '.join(ENGINES)}")
+
+        scores = self.score_postings(query, mask, fuzzy)
+        rank_key = self.rank_key()
+        if k is None:
+            return sorted(scores.items(), key=rank_key, reverse=True)
+        return heapq.nlargest(k, scores.items(), key=rank_key)
+
+    def _max_weight(self, term):
+        """Upper bound of the weight a term gives any document (computed on first use)"""
+        bound = self.max_weights[term]
+        if bound < 0:
+            idf, norms, k1_plus_1 = self.idf[term], self.norms, self.k1 + 1
+            bound = max(
+                (idf * (tf * k1_plus_1) / (tf + norms[idx]) for idx, tf in zip(self.post_docs[term], self.post_tfs[term])),
+                default=0.0
+            )
+            self.max_weights[term] = bound
+        return bound
+
+    def _top_k_maxscore(self, query, k, mask=None, fuzzy=False):
+        """MaxScore-style top-k: exact ranking without scoring every matching document.
+
+        Terms are processed from the highest upper bound down. Once the bounds of the
+        remaining terms cannot lift a new document past the current k-th best partial
+        score, only documents already seen are updated (by binary search in the posting
+        lists), and those that cannot catch up are dropped. The survivors are then scored
+        exactly as score_postings() would, so rankings and scores are identical.
+        """
+        terms = self._query_terms(query, fuzzy)
+        multiplicity = {}
+        for term in terms:
+            multiplicity[term] = multiplicity.get(term, 0) + 1
+        bounds = {term: count * self._max_weight(term) for term, count in multiplicity.items()}
+        order = sorted(multiplicity, key=bounds.get, reverse=True)
+
+        def cannot_reach(upper, threshold):
+            return upper * (1 + PRUNE_EPSILON) < threshold * (1 - PRUNE_EPSILON)
+
+        norms = self.norms
+        k1_plus_1 = self.k1 + 1
+        partial = {}
+        pruning = False
+        for position, term in enumerate(order):
+            remaining = sum(bounds[rest] for rest in order[position + 1:])
+            idf = self.idf[term] * multiplicity[term]
+            docs, tfs = self.post_docs[term], self.post_tfs[term]
+            if not pruning:
+                for idx, tf in self._postings(term, mask):
+                    partial[idx] = partial.get(idx, 0.0) + idf * (tf * k1_plus_1) / (tf + norms[idx])
+            elif len(partial) * 8 < len(docs):
+                for idx in partial:
+                    found = bisect_left(docs, idx)
+                    if found < len(docs) and docs[found] == idx:
+                        tf = tfs[found]
+                        partial[idx] += idf * (tf * k1_plus_1) / (tf + norms[idx])
+            else:
+                for idx, tf in zip(docs, tfs):
+                    if idx in partial:
+                        partial[idx] += idf * (tf * k1_plus_1) / (tf + norms[idx])
+
+            if len(partial) >= k:
+                threshold = heapq.nlargest(k, partial.values())[-1]
+                if cannot_reach(remaining, threshold):
+                    # Unseen documents score at most `remaining`: stop admitting them
+                    pruning = True
+                    partial = {idx: score for idx, score in partial.items() if not cannot_reach(score + remaining, threshold)}
+
+        # Exact scores for the survivors, summed in query order like score_postings()
+        ranked = []
+        for idx in partial:
             score = 0
-            doc_len = self.doc_lengths[idx]
-            term_freqs = defaultdict(int)
-            for word in doc:
-                term_freqs[word] += 1
+            for term in terms:
+                docs = self.post_docs[term]
+                found = bisect_left(docs, idx)
+                if found < len(docs) and docs[found] == idx:
+                    tf = self.post_tfs[term][found]
+                    score = score + self.idf[term] * (tf * k1_plus_1) / (tf + norms[idx])
+            ranked.append((idx, score))
+        return heapq.nlargest(k, ranked, key=self.rank_key())
 
-            for token in query_tokens:
-                if token in self.idf:
-                    tf = term_freqs[token]
-                    idf = self.idf[token]
-                    numerator = tf * (self.k1 + 1)
-                    denominator = tf + self.k1 * (1 - self.b + self.b * doc_len / self.avgdl)
-                    score += idf * numerator / denominator
+    def top_k_many(self, queries, k=None, engine=DEFAULT_BATCH_ENGINE, mask=None, fuzzy=False):
+        """Return top_k() for each query; the "numpy" engine scores the whole batch at once.
 
-            scores.append((idx, score))
+        The vectorised engine sums term weights in a different order, so scores
+        agree with the other engines up to floating-point rounding.
+        """
+        if engine != "numpy":
+            return [self.top_k(query, k, engine, mask, fuzzy) for query in queries]
+        if self.N == 0 or not queries:
+            return [[] for _ in queries]
 
-        return sorted(scores, key=lambda x: x[1], reverse=True)
+        np, sparse = _vector_modules()
+        weights = self._weight_matrix()
+        rows, cols = [], []
+        for row, query in enumerate(queries):
+            for term in self._query_terms(query, fuzzy):
+                rows.append(row)
+                cols.append(term)
+        if not cols:
+            return [[] for _ in queries]
+        # Only the query terms' rows are scored, and a filter drops postings before the product;
+        # terms keep their order, so each document's weights are summed as before
+        terms = np.unique(cols)
+        weights = weights[terms]
+        if mask is not None:
+            allowed = np.unpackbits(np.frombuffer(mask, dtype=np.uint8), bitorder="little")[:self.size].astype(bool)
+            keep = allowed[weights.indices]
+            kept = np.concatenate(([0], np.cumsum(keep, dtype=np.int64)))
+            weights = sparse.csr_matrix((weights.data[keep], weights.indices[keep], kept[weights.indptr]),
+                                        shape=weights.shape)
+        # Duplicate (row, col) entries are summed, so repeated query terms count twice as in score()
+        query_matrix = sparse.csr_matrix(
+            (np.ones(len(rows)), (rows, np.searchsorted(terms, cols))), shape=(len(queries), len(terms))
+        )
+        scores = (query_matrix @ weights).tocsr()
 
+        results = []
+        for row in range(len(queries)):
+            start, end = scores.indptr[row], scores.indptr[row + 1]
+            docs = scores.indices[start:end]
+            values = scores.data[start:end]
+            positive = values > 0
+            docs, values = docs[positive], values[positive]
+            rows = docs if self.positions is None else np.frombuffer(self.positions, dtype=np.uint32)[docs]
+            order = np.lexsort((rows, -values))
+            if k is not None:
+                order = order[:k]
+            results.append([(int(docs[i]), float(values[i])) for i in order])
+        return results
+
+    def _weight_matrix(self):
+        """Build (once) the CSR matrix of per-term, per-document BM25 weights"""
+        if self._stale:
+            self._refresh()
+        if self._weights is None:
+            np, sparse = _vector_modules()
+            indptr = np.zeros(len(self.post_docs) + 1, dtype=np.int64)
+            indptr[1:] = np.cumsum(np.frombuffer(self.doc_freqs, dtype=np.uint32), dtype=np.int64)
+            indices = np.concatenate([np.frombuffer(docs, dtype=np.uint32) for docs in self.post_docs] or [np.zeros(0, np.uint32)])
+            tfs = np.concatenate([np.frombuffer(tfs, dtype=np.uint32) for tfs in self.post_tfs] or [np.zeros(0, np.uint32)]).astype(np.float64)
+            idf = np.repeat(np.frombuffer(self.idf, dtype=np.float64), np.diff(indptr))
+            norms = np.frombuffer(self.norms, dtype=np.float64)[indices]
+            data = idf * (tfs * (self.k1 + 1)) / (tfs + norms)
+            self._weights = sparse.csr_matrix((data, indices.astype(np.int64), indptr), shape=(len(self.post_docs), self.size))
+        return self._weights
+
+    def memory_usage(self):
+        """Approximate bytes held by each part of the index"""
+        vocab_bytes = sys.getsizeof(self.vocab) + sum(sys.getsizeof(term) for term in self.vocab)
+        postings_bytes = sum(sys.getsizeof(docs) + sys.getsizeof(tfs) for docs, tfs in zip(self.post_docs, self.post_tfs))
+        postings_bytes += sys.getsizeof(self.post_docs) + sys.getsizeof(self.post_tfs)
+        return {
+            "documents": self.N,
+            "terms": len(self.vocab),
+            "postings": sum(self.doc_freqs),
+            "vocab_bytes": vocab_bytes,
+            "postings_bytes": postings_bytes,
+            "term_stats_bytes": sys.getsizeof(self.doc_freqs) + sys.getsizeof(self.idf) + sys.getsizeof(self.max_weights),
+            "doc_stats_bytes": sys.getsizeof(self.doc_lengths) + sys.getsizeof(self.norms)
+        }
+
+
+# ============ INDEX CACHE ============
+def _file_hash(filepath):
+    """SHA-256 of a data file's content"""
+    with open(filepath, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def file_signature(filepath):
+    """Size, mtime and content hash identifying one version of a data file"""
+    stat = filepath.stat()
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": _file_hash(filepath)}
+
+
+def data_name(filepath):
+    """Path of a data file relative to DATA_DIR, e.g. stacks/react.csv"""
+    filepath = Path(filepath)
+    return filepath.relative_to(DATA_DIR).as_posix() if filepath.is_relative_to(DATA_DIR) else filepath.name
+
+
+def _cache_path(filepath):
+    """Compiled index artifact for a data file, e.g. stacks/react.csv -> stacks-react.idx"""
+    return CACHE_DIR / (data_name(filepath).rsplit(".", 1)[0].replace("/", "-") + ".idx")
+
+
+def signature_state(cached, filepath):
+    """"fresh" if size/mtime match, "touched" if only the content hash does, else None"""
+    stat = filepath.stat()
+    if cached["size"] != stat.st_size:
+        return None
+    if cached["mtime_ns"] == stat.st_mtime_ns:
+        return "fresh"
+    # Touched but possibly unchanged (checkout, copy): fall back to the content hash
+    return "touched" if cached["sha256"] == _file_hash(filepath) else None
+
+
+# Trust boundary: index artifacts are pickles, and unpickling can run arbitrary code. They are
+# only ever written by _write_cached_index() into CACHE_DIR, which must be writable by the
+# skill's user alone; never load artifacts from anywhere else.
+def _read_cached_index(filepath, search_cols, output_cols, filter_cols=()):
+    """Return (entry, state) for a cached index that is still valid for this file and config"""
+    try:
+        with open(_cache_path(filepath), 'rb') as f:
+            entry = pickle.load(f)
+    except Exception:
+        # Missing, truncated, corrupt or from an incompatible version: the caller rebuilds it
+        return None, None
+    if (
+        not isinstance(entry, dict)
+        or entry.get("version") != INDEX_CACHE_VERSION
+        or entry.get("search_cols") != list(search_cols)
+        or entry.get("output_cols") != list(output_cols)
+        or entry.get("filter_cols") != list(filter_cols)
+        or entry.get("analyzer") != ANALYZER.signature()
+    ):
+        return None, None
+    try:
+        state = signature_state(entry["signature"], filepath)
+    except (KeyError, TypeError):
+        return None, None
+    return (entry, state) if state else (None, None)
+
+
+def temp_path(target):
+    """Fresh sibling of target to write its next version into before os.replace().
+
+    The name is unique per call, not just per process, so threads writing the same
+    target never share (and publish each other's half-written) temporary files.
+    """
+    target = Path(target)
+    return target.with_name(f".{target.name}.{os.getpid()}.{secrets.token_hex(4)}.tmp")
+
+
+def _write_cached_index(filepath, entry):
+    """Atomically write a compiled index; the cache is best-effort"""
+    target = _cache_path(filepath)
+    tmp = temp_path(target)
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        with open(tmp, 'xb') as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, target)
+    except OSError:
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
+
+
+def _read_records(f, digest):
+    """Yield (start offset, row) for each CSV record of a binary file, hashing it as it is read"""
+    position = 0
+
+    def lines():
+        nonlocal position
+        for raw in f:
+            digest.update(raw)
+            position += len(raw)
+            yield raw.decode('utf-8')
+
+    # csv.reader pulls lines only as it needs them, so `position` is the end of each record
+    start = 0
+    for row in csv.reader(lines()):
+        yield start, row
+        start = position
+    yield position, None
+
+
+def filter_value(value):
+    """Normalise a categorical cell or filter value: case and surrounding spaces are ignored"""
+    return "" if value is None else str(value).strip().lower()
+
+
+def _row_bitmaps(rows_by_value, count):
+    """Turn {value: array of row numbers} into {value: int with bit i set for row i}"""
+    bitmaps = {}
+    for value, rows in rows_by_value.items():
+        bits = bytearray((count + 7) // 8)
+        for idx in rows:
+            bits[idx >> 3] |= 1 << (idx & 7)
+        bitmaps[value] = int.from_bytes(bits, 'little')
+    return bitmaps
+
+
+def _row_text(row, search_positions):
+    """Search text of a CSV row, as csv.DictReader gave it: missing columns are "", short rows are None"""
+    return " ".join("" if i is None else str(row[i] if i < len(row) else None) for i in search_positions)
+
+
+def _row_hash(row):
+    """64-bit content hash of a parsed CSV row, stable across processes"""
+    return int.from_bytes(hashlib.blake2b("\x1f".join(row).encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def _scan_rows(f, digest):
+    """Yield (start, end, row) for each non-empty CSV record after the header; returns the header first"""
+    records = _read_records(f, digest)
+    _, header = next(records)
+    yield header or []
+    pending = None
+    for start, row in records:
+        if pending is not None:
+            yield pending[0], start, pending[1]
+            pending = None
+        if row:
+            pending = (start, row)
+
+
+def _build_index(filepath, search_cols, output_cols, filter_cols=()):
+    """Fit BM25 over a CSV's search columns and record each row's byte range.
+
+    Output columns are not kept: the winning rows are parsed again from the
+    file by row_dict(), so losing rows are never materialised.
+    Each filter column gets one row bitmap per distinct value (see filter_mask()),
+    and each row a content hash so update_index() can tell which rows changed.
+    """
+    stat = filepath.stat()
+    digest = hashlib.sha256()
+    bm25 = BM25()
+    offsets, ends, row_hashes = array('Q'), array('Q'), array('Q')
+    texts = []
+    with profile_stage("csv_load"), open(filepath, 'rb') as f:
+        rows = _scan_rows(f, digest)
+        header = next(rows)
+        position = {col: i for i, col in enumerate(header)}
+        columns = [col for col in output_cols if col in position]
+        search_positions = [position.get(col) for col in search_cols]
+        filter_positions = [(col, position[col]) for col in filter_cols if col in position]
+        filter_rows = {col: defaultdict(lambda: array('I')) for col, _ in filter_positions}
+
+        for start, end, row in rows:
+            offsets.append(start)
+            ends.append(end)
+            row_hashes.append(_row_hash(row))
+            for col, i in filter_positions:
+                filter_rows[col][filter_value(row[i] if i < len(row) else None)].append(len(texts))
+            texts.append(_row_text(row, search_positions))
+    with profile_stage("tokenize"):
+        corpus = [bm25.tokenize(text) for text in texts]
+        del texts
+    with profile_stage("bm25_fit"):
+        bm25.fit_tokens(corpus)
+
+    return {
+        "version": INDEX_CACHE_VERSION,
+        "signature": {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest.hexdigest()},
+        "search_cols": list(search_cols),
+        "output_cols": list(output_cols),
+        "filter_cols": list(filter_cols),
+        "analyzer": bm25.analyzer.signature(),
+        "bm25": bm25,
+        "path": str(filepath),
+        "header": header,
+        "columns": columns,
+        "output_positions": [position[col] for col in columns],
+        "search_positions": search_positions,
+        "filter_positions": filter_positions,
+        "offsets": offsets,
+        "ends": ends,
+        "row_hashes": row_hashes,
+        "bitmaps": {col: _row_bitmaps(rows, bm25.size) for col, rows in filter_rows.items()}
+    }
+
+
+class DataChangedError(Exception):
+    """A CSV was rewritten in place after its index was loaded, so row byte ranges no longer hold"""
+
+
+# Open indexed CSVs: path -> (size, mtime_ns, file). Rows are read with seek + read, not
+# a memory map: a CSV truncated under a map would kill the process with SIGBUS
+_ROW_FILES = {}
+
+
+def _row_file(entry):
+    """The CSV an index entry was built from, opened once; raises DataChangedError if it changed since"""
+    signature = entry["signature"]
+    version = (signature["size"], signature["mtime_ns"])
+    held = _ROW_FILES.get(entry["path"])
+    if held is None or held[:2] != version:
+        if held is not None:
+            held[2].close()
+        held = _ROW_FILES[entry["path"]] = (*version, open(entry["path"], 'rb'))
+    stat = os.fstat(held[2].fileno())
+    if (stat.st_size, stat.st_mtime_ns) != version:
+        raise DataChangedError(f"{entry['path']} changed while its index was in use")
+    return held[2]
+
+
+def _reload_on_change(search):
+    """Run a search once more if a CSV was rewritten under it: the second run reloads the index"""
+    @wraps(search)
+    def wrapper(*args, **kwargs):
+        try:
+            return search(*args, **kwargs)
+        except DataChangedError:
+            return search(*args, **kwargs)
+    return wrapper
+
+
+def row_dict(entry, idx):
+    """Parse one indexed row from its CSV as {output column: value}"""
+    start, end = entry["offsets"][idx], entry["ends"][idx]
+    f = _row_file(entry)
+    f.seek(start)
+    data = f.read(end - start)
+    if len(data) != end - start:
+        raise DataChangedError(f"{entry['path']} changed while its index was in use")
+    text = data.decode('utf-8')
+    row = next(csv.reader(io.StringIO(text, newline='')), [])
+    return {
+        col: row[i] if i < len(row) else None
+        for col, i in zip(entry["columns"], entry["output_positions"])
+    }
+
+
+# Indexes already loaded by this process, keyed by (file, search cols, output cols, filter cols)
+_RESIDENT_INDEXES = {}
+# Serialises queries against resident indexes with incremental updates to them
+_INDEX_LOCK = threading.RLock()
+
+
+def filter_mask(entry, filters):
+    """Row bitmap (bytes, bit i set for row i) of an index's rows matching every filter.
+
+    filters maps a filter column to one value or a list of values; values of one
+    column are ORed, columns are ANDed, and matching ignores case. Returns None
+    when there is nothing to filter on.
+    """
+    if not filters:
+        return None
+    combined = None
+    for col, values in filters.items():
+        bitmaps = entry["bitmaps"].get(col)
+        if bitmaps is None:
+            raise ValueError(f"Cannot filter on {col!r}. Filterable columns: {', '.join(entry['filter_cols']) or 'none'}")
+        column_bits = 0
+        for value in ([values] if isinstance(values, str) else values):
+            column_bits |= bitmaps.get(filter_value(value), 0)
+        combined = column_bits if combined is None else combined & column_bits
+    return combined.to_bytes((entry["bm25"].size + 7) // 8, 'little')
+
+
+def _filters_key(filters):
+    """Hashable, order-independent form of a filters dict for cache keys"""
+    if not filters:
+        return ()
+    return tuple(sorted(
+        (col, tuple(sorted({filter_value(v) for v in ([values] if isinstance(values, str) else values)})))
+        for col, values in filters.items()
+    ))
 
-# ============ SEARCH FUNCTIONS ============
-def _load_csv(filepath):
-    """Load CSV and return list of dicts"""
-    with open(filepath, 'r', encoding='utf-8') as f:
-        return list(csv.DictReader(f))
 
+def _check_filters(filters, filter_cols):
+    """Error message for filters on columns without bitmaps, else None"""
+    unknown = [col for col in (filters or {}) if col not in filter_cols]
+    if unknown:
+        return f"Cannot filter on {', '.join(unknown)}. Filterable columns: {', '.join(filter_cols) or 'none'}"
+    return None
 
-def _search_csv(filepath, search_cols, output_cols, query, max_results):
+
+def load_index(filepath, search_cols, output_cols, filter_cols=()):
+    """Load the compiled index for a CSV, rebuilding it only when the file changed"""
+    key = (str(filepath), tuple(search_cols), tuple(output_cols), tuple(filter_cols))
+    entry = _RESIDENT_INDEXES.get(key)
+    if entry is not None:
+        state = signature_state(entry["signature"], filepath)
+        if state != "fresh":
+            # Already resident: apply only the rows that changed
+            entry, _ = _refresh_resident(key, entry, filepath, state)
+        return entry
+
+    with profile_stage("index_load"):
+        entry, state = _read_cached_index(filepath, search_cols, output_cols, filter_cols)
+    if entry is None:
+        with profile_stage("index_build"):
+            entry = _build_index(filepath, search_cols, output_cols, filter_cols)
+            _write_cached_index(filepath, entry)
+    return _make_resident(key, filepath, entry, state)
+
+
+def _make_resident(key, filepath, entry, state="fresh"):
+    """Keep a loaded index for the rest of this process"""
+    if state == "touched":
+        # Same content, new mtime: refresh the signature so the next load takes the fast path
+        entry["signature"] = file_signature(filepath)
+        _write_cached_index(filepath, entry)
+    # The artifact may have been built at another checkout location
+    entry["path"] = str(filepath)
+    _RESIDENT_INDEXES[key] = entry
+    return entry
+
+
+def index_specs():
+    """(name, filepath, search_cols, output_cols, filter_cols) for every domain and stack data file"""
+    specs = [
+        (domain, DATA_DIR / config["file"], config["search_cols"], config["output_cols"], config.get("filter_cols", []))
+        for domain, config in CSV_CONFIG.items()
+    ]
+    specs += [
+        (f"stack:{stack}", DATA_DIR / config["file"], _STACK_COLS["search_cols"], _STACK_COLS["output_cols"], _STACK_COLS["filter_cols"])
+        for stack, config in STACK_CONFIG.items()
+    ]
+    return specs
+
+
+def preload_indexes():
+    """Load every domain and stack index into this process; returns the names loaded"""
+    loaded = []
+    for name, filepath, *columns in index_specs():
+        if filepath.exists():
+            load_index(filepath, *columns)
+            loaded.append(name)
+    return loaded
+
+
+def _init_warm_worker(analyzer, cache_dir):
+    """Give a spawned warm-up worker the parent's analyzer and cache directory"""
+    global CACHE_DIR
+    CACHE_DIR = cache_dir
+    set_analyzer(analyzer)
+
+
+def _warm_one(filepath, columns):
+    """Worker: load or fit one index (caching it on disk) and return it with its timing"""
+    started = time.perf_counter()
+    entry = load_index(filepath, *columns)
+    return entry, (time.perf_counter() - started) * 1000
+
+
+def warm_all(workers=None):
+    """Load every domain and stack index, fitting the missing ones in parallel.
+
+    Indexes already resident or with a valid cached artifact are loaded here;
+    the rest are fitted by a spawned process pool, largest file first, and come
+    back as pickled entries (array-backed, so cheap to transfer). Cold start is
+    then bounded by the largest file instead of the sum of all of them. Without
+    an explicit workers count, less than WARM_POOL_MIN_BYTES of CSV is fitted serially.
+
+    Returns {"total_ms", "workers", "indexes": {name: {"source", "ms", "rows"}}}.
+    """
+    started = time.perf_counter()
+    timings = {}
+    pending = []
+    for name, filepath, *columns in index_specs():
+        if not filepath.exists():
+            continue
+        key = (str(filepath), *(tuple(cols) for cols in columns))
+        loaded = time.perf_counter()
+        if key in _RESIDENT_INDEXES:
+            entry = load_index(filepath, *columns)
+            source = "resident"
+        else:
+            entry, state = _read_cached_index(filepath, *columns)
+            if entry is None:
+                pending.append((name, filepath, columns))
+                continue
+            _make_resident(key, filepath, entry, state)
+            source = "cache"
+        timings[name] = {"source": source, "ms": (time.perf_counter() - loaded) * 1000, "rows": entry["bm25"].N}
+
+    if workers is None:
+        pending_bytes = sum(filepath.stat().st_size for _, filepath, _ in pending)
+        workers = (os.cpu_count() or 1) if pending_bytes >= WARM_POOL_MIN_BYTES else 1
+    workers = min(workers, len(pending))
+    if workers > 1:
+        pending.sort(key=lambda item: item[1].stat().st_size, reverse=True)
+        with profile_stage("warm_pool"), ProcessPoolExecutor(
+            max_workers=workers, mp_context=get_context("spawn"),
+            initializer=_init_warm_worker, initargs=(ANALYZER, CACHE_DIR)
+        ) as pool:
+            futures = {pool.submit(_warm_one, filepath, columns): (name, filepath, columns) for name, filepath, columns in pending}
+            for future in as_completed(futures):
+                name, filepath, columns = futures[future]
+                entry, elapsed = future.result()
+                _make_resident((str(filepath), *(tuple(cols) for cols in columns)), filepath, entry)
+                timings[name] = {"source": "built", "ms": elapsed, "rows": entry["bm25"].N}
+    else:
+        for name, filepath, columns in pending:
+            entry, elapsed = _warm_one(filepath, columns)
+            timings[name] = {"source": "built", "ms": elapsed, "rows": entry["bm25"].N}
+
+    return {
+        "total_ms": (time.perf_counter() - started) * 1000,
+        "workers": max(workers, 1) if pending else 0,
+        "indexes": {name: timings[name] for name, *_ in index_specs() if name in timings}
+    }
+
+
+def memory_report():
+    """Approximate memory held by every resident index, per data file and in total"""
+    report = {}
+    for (file, *_), entry in _RESIDENT_INDEXES.items():
+        usage = entry["bm25"].memory_usage()
+        usage["row_offsets_bytes"] = sys.getsizeof(entry["offsets"]) + sys.getsizeof(entry["ends"])
+        usage["row_hashes_bytes"] = sys.getsizeof(entry["row_hashes"])
+        usage["filter_bitmaps_bytes"] = sum(
+            sys.getsizeof(bits) for bitmaps in entry["bitmaps"].values() for bits in bitmaps.values()
+        )
+        usage["total_bytes"] = sum(value for key, value in usage.items() if key.endswith("_bytes"))
+        report[data_name(file)] = usage
+    return {"indexes": report, "total_bytes": sum(usage["total_bytes"] for usage in report.values())}
+
+
+def clear_index_cache():
+    """Remove every compiled index artifact and drop indexes held in memory"""
+    _RESIDENT_INDEXES.clear()
+    _UNSAVED_INDEXES.clear()
+    for path in CACHE_DIR.glob("*.idx"):
+        path.unlink()
+
+
+# ============ INCREMENTAL UPDATES ============
+def _set_row_bits(entry, changes):
+    """Move changed docs to the filter bitmaps of their new rows' values.
+
+    changes maps doc id -> its new row (None for a deleted doc). Each value's bitmap
+    takes one AND-NOT of every changed doc and one OR of its new members, however
+    many rows changed.
+    """
+    if not changes or not entry["filter_positions"]:
+        return
+    count = entry["bm25"].size
+    cleared = _row_bitmaps({None: list(changes)}, count)[None]
+    for col, i in entry["filter_positions"]:
+        rows_by_value = defaultdict(list)
+        for idx, row in changes.items():
+            if row is not None:
+                rows_by_value[filter_value(row[i] if i < len(row) else None)].append(idx)
+        members = _row_bitmaps(rows_by_value, count)
+        bitmaps = entry["bitmaps"][col]
+        for value in set(bitmaps) | set(members):
+            bits = bitmaps.get(value, 0) & ~cleared | members.get(value, 0)
+            if bits:
+                bitmaps[value] = bits
+            else:
+                bitmaps.pop(value, None)
+
+
+def update_index(entry, filepath):
+    """Apply a CSV's edits to its loaded index, re-indexing only the rows that changed.
+
+    Rows are matched to documents by content hash: unchanged rows keep their doc id
+    (only their byte range moves), edited rows take over the ids of removed rows,
+    extra rows are appended and leftover ids are deleted. idf and avgdl follow
+    from the updated counts, and ties rank by each row's new position in the file,
+    so results equal a full rebuild's. Each changed row costs the posting lists of
+    its own terms. A fresh index is built instead when the header changed or
+    deleted rows would exceed COMPACT_RATIO of the ids.
+
+    Returns (entry, stats) where stats counts added/updated/deleted/unchanged rows.
+    """
+    started = time.perf_counter()
+    filepath = Path(filepath)
+    stat = filepath.stat()
+    digest = hashlib.sha256()
+    bm25 = entry["bm25"]
+    row_hashes = entry["row_hashes"]
+    # Live doc ids by row hash, lowest id last so pop() hands out ids in file order
+    by_hash = defaultdict(list)
+    for idx in range(bm25.size - 1, -1, -1):
+        if idx not in bm25.deleted:
+            by_hash[row_hashes[idx]].append(idx)
+
+    offsets, ends = array('Q', entry["offsets"]), array('Q', entry["ends"])
+    added = []
+    placed = []  # (doc id, row position in the file)
+    with open(filepath, 'rb') as f:
+        rows = _scan_rows(f, digest)
+        header = next(rows)
+        if header == entry["header"]:
+            for position, (start, end, row) in enumerate(rows):
+                ids = by_hash.get(_row_hash(row))
+                if ids:
+                    idx = ids.pop()
+                    offsets[idx], ends[idx] = start, end
+                    placed.append((idx, position))
+                else:
+                    added.append((start, end, row, position))
+    unchanged = len(placed)
+    removed = sorted(idx for ids in by_hash.values() for idx in ids)
+
+    tombstones = len(bm25.deleted) + max(len(removed) - len(added), 0)
+    if header != entry["header"] or tombstones > COMPACT_RATIO * max(bm25.size + len(added) - len(removed), 1):
+        entry = _build_index(filepath, entry["search_cols"], entry["output_cols"], entry["filter_cols"])
+        entry["path"] = str(filepath)
+        return entry, {"rebuilt": True, "rows": entry["bm25"].N, "ms": round((time.perf_counter() - started) * 1000, 3)}
+
+    search_positions = entry["search_positions"]
+    changes = {}  # doc id -> new row (None when deleted), for the filter bitmaps
+    for slot, (start, end, row, position) in enumerate(added):
+        tokens = bm25.tokenize(_row_text(row, search_positions))
+        if slot < len(removed):
+            idx = removed[slot]
+            bm25.update_document(idx, tokens)
+            offsets[idx], ends[idx], row_hashes[idx] = start, end, _row_hash(row)
+        else:
+            idx = bm25.add_document(tokens)
+            offsets.append(start)
+            ends.append(end)
+            row_hashes.append(_row_hash(row))
+        changes[idx] = row
+        placed.append((idx, position))
+    for idx in removed[len(added):]:
+        bm25.delete_document(idx)
+        offsets[idx] = ends[idx] = 0
+        changes[idx] = None
+    _set_row_bits(entry, changes)
+
+    # Ties rank by row position; tombstones never rank, so they keep 0
+    if all(idx == position for idx, position in placed):
+        bm25.positions = None
+    else:
+        positions = array('I', [0]) * bm25.size
+        for idx, position in placed:
+            positions[idx] = position
+        bm25.positions = positions
+
+    entry["offsets"], entry["ends"] = offsets, ends
+    entry["signature"] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest.hexdigest()}
+    return entry, {
+        "rebuilt": False,
+        "added": max(len(added) - len(removed), 0),
+        "updated": min(len(added), len(removed)),
+        "deleted": max(len(removed) - len(added), 0),
+        "unchanged": unchanged,
+        "ms": round((time.perf_counter() - started) * 1000, 3)
+    }
+
+
+# Resident indexes updated by an IndexWatcher but not yet re-cached on disk: key -> filepath
+_UNSAVED_INDEXES = {}
+
+
+def _refresh_resident(key, entry, filepath, state, save=True):
+    """Bring a resident index up to date with its file; returns (entry, stats).
+
+    With save the index is re-cached at once; otherwise it is only marked unsaved
+    (see save_indexes()), so a burst of edits costs one write instead of one per edit.
+    """
+    with _INDEX_LOCK:
+        if _RESIDENT_INDEXES.get(key) is not entry:
+            return _RESIDENT_INDEXES[key], None  # another thread got here first
+        stats = None
+        if state == "touched":
+            entry["signature"] = file_signature(filepath)
+        else:
+            with profile_stage("index_update"):
+                entry, stats = update_index(entry, filepath)
+            _RESIDENT_INDEXES[key] = entry
+        if save:
+            _UNSAVED_INDEXES.pop(key, None)
+            _write_cached_index(filepath, entry)
+        else:
+            _UNSAVED_INDEXES[key] = filepath
+    return entry, stats
+
+
+def save_indexes():
+    """Re-cache every resident index updated since it was last written; returns how many were written"""
+    with _INDEX_LOCK:
+        unsaved = [(filepath, _RESIDENT_INDEXES.get(key)) for key, filepath in _UNSAVED_INDEXES.items()]
+        _UNSAVED_INDEXES.clear()
+        for filepath, entry in unsaved:
+            if entry is not None:
+                _write_cached_index(filepath, entry)
+    return len(unsaved)
+
+
+class IndexWatcher(threading.Thread):
+    """Daemon thread that polls the CSVs behind resident indexes and applies their edits.
+
+    Polling (size and mtime per file) keeps it dependency-free; on_update is called
+    with {data file: stats} after each round that changed something. Updated
+    indexes are re-cached on disk once a round finds no further changes, and on stop().
+    """
+
+    def __init__(self, interval=WATCH_INTERVAL, on_update=None):
+        super().__init__(name="index-watcher", daemon=True)
+        self.interval = interval
+        self.on_update = on_update
+        self.updates = 0
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            if not self.check():
+                save_indexes()
+
+    def stop(self):
+        self._stopped.set()
+        save_indexes()
+
+    def check(self):
+        """Apply pending file changes to every resident index; returns {data file: stats}"""
+        changes = {}
+        for key, entry in list(_RESIDENT_INDEXES.items()):
+            filepath = Path(key[0])
+            try:
+                state = signature_state(entry["signature"], filepath)
+                if state == "fresh":
+                    continue
+                entry, stats = _refresh_resident(key, entry, filepath, state, save=False)
+            except (OSError, ValueError, csv.Error):
+                continue  # removed or half-written: try again on the next poll
+            if stats:
+                changes[data_name(filepath)] = stats
+        if changes:
+            self.updates += len(changes)
+            # Re-merge now rather than on the next cross-domain query
+            if _UNIFIED_INDEX["index"] is not None:
+                try:
+                    with _INDEX_LOCK:
+                        unified_index()
+                except (OSError, ValueError, csv.Error):
+                    pass
+            if self.on_update:
+                self.on_update(changes)
+        return changes
+
+
+# ============ RESULT CACHE ============
+def _copy_json(value):
+    """Copy nested dicts/lists so callers cannot mutate cached results"""
+    if isinstance(value, dict):
+        return {key: _copy_json(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_copy_json(item) for item in value]
+    return value
+
+
+class ResultCache:
+    """Bounded LRU of search results, tagged with the data version they were computed from.
+
+    Keys use the query's normalised tokens, so "Dark  Mode!" and "dark mode" share
+    an entry. An entry whose data version no longer matches the current index
+    (the CSV changed) counts as a miss and is replaced.
+    """
+
+    def __init__(self, maxsize=RESULT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        """Return a copy of the cached results, or None on a miss"""
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is None or cached[0] != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return _copy_json(cached[1])
+
+    def put(self, key, version, results):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (version, _copy_json(results))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries), "maxsize": self.maxsize}
+
+
+_RESULT_CACHE = ResultCache()
+
+
+def result_cache_info():
+    """Hit/miss counters and size of the in-process result cache"""
+    return _RESULT_CACHE.info()
+
+
+def clear_result_cache():
+    """Drop every cached result and reset the counters"""
+    _RESULT_CACHE.clear()
+
+
+# ============ KEYWORD MATCHING ============
+class KeywordMatcher:
+    """Aho-Corasick automaton over labelled keyword groups: one pass over a text finds every keyword in it.
+
+    groups maps a label to its keywords, e.g. {"color": ["color", "palette"], ...}.
+    A keyword is found wherever `keyword in text` holds; matching is case-sensitive,
+    so lower-case both sides as the classifiers do.
+    """
+
+    def __init__(self, groups):
+        self.labels = list(groups)
+        self.keywords = [keyword for keywords in groups.values() for keyword in keywords]
+        self._group = [position for position, keywords in enumerate(groups.values()) for _ in keywords]
+
+        goto, output = [{}], [[]]
+        for i, keyword in enumerate(self.keywords):
+            node = 0
+            for char in keyword:
+                if char not in goto[node]:
+                    goto[node][char] = len(goto)
+                    goto.append({})
+                    output.append([])
+                node = goto[node][char]
+            output[node].append(i)
+
+        # Breadth-first, so a node's failure state (its longest proper suffix in the trie) is already complete.
+        # Failure transitions are folded into a full transition table: scanning follows one edge per character.
+        fail = [0] * len(goto)
+        delta = [goto[0]] + [None] * (len(goto) - 1)
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            output[node] += output[fail[node]]
+            for char, child in goto[node].items():
+                fail[child] = delta[fail[node]].get(char, 0)
+                queue.append(child)
+            delta[node] = {**delta[fail[node]], **goto[node]}
+        self._delta = delta
+        self._output = [tuple(found) for found in output]
+
+    def hits(self, text):
+        """Positions (in self.keywords) of every keyword occurring in text"""
+        delta, output = self._delta, self._output
+        found = set(output[0])
+        node = 0
+        for char in text:
+            node = delta[node].get(char, 0)
+            if output[node]:
+                found.update(output[node])
+        return found
+
+    def counts(self, text):
+        """{label: number of its keywords occurring in text} for every group, in group order"""
+        counts = dict.fromkeys(self.labels, 0)
+        for i in self.hits(text):
+            counts[self.labels[self._group[i]]] += 1
+        return counts
+
+    def first(self, text):
+        """Label of the first group with a keyword in text, or None"""
+        found = self.hits(text)
+        return self.labels[min(self._group[i] for i in found)] if found else None
+
+
+# ============ SEARCH FUNCTIONS ============
+@_reload_on_change
+def _search_csv(filepath, search_cols, output_cols, query, max_results, engine=DEFAULT_ENGINE, filter_cols=(), filters=None,
+                fuzzy=False):
     """Core search function using BM25"""
     if not filepath.exists():
         return []
 
-    data = _load_csv(filepath)
+    # Held so a watcher thread never applies file changes mid-query
+    with _INDEX_LOCK:
+        index = load_index(filepath, search_cols, output_cols, filter_cols)
+        bm25 = index["bm25"]
+        with profile_stage("result_cache"):
+            key = (index["path"], tuple(search_cols), bm25.tokenize_query(query), max_results, engine, _filters_key(filters), fuzzy)
+            version = index["signature"]["sha256"]
+            results = _RESULT_CACHE.get(key, version)
+        if results is None:
+            # Filtered-out rows are skipped while walking postings, not dropped after ranking
+            with profile_stage("filter"):
+                mask = filter_mask(index, filters)
+            # Get top results with score > 0
+            with profile_stage("bm25_score"):
+                ranked = bm25.top_k(query, max_results, engine, mask, fuzzy)
+            with profile_stage("result_projection"):
+                results = [row_dict(index, idx) for idx, _ in ranked]
+            _RESULT_CACHE.put(key, version, results)
+    return results
 
-    # Build documents from search columns
-    documents = [" ".join(str(row.get(col, "")) for col in search_cols) for row in data]
 
-    # BM25 search
-    bm25 = BM25()
-    bm25.fit(documents)
-    ranked = bm25.score(query)
+@_reload_on_change
+def _search_csv_many(filepath, search_cols, output_cols, queries, max_results, engine=DEFAULT_BATCH_ENGINE,
+                     filter_cols=(), filters=None, fuzzy=False):
+    """Batch variant of _search_csv: one index load, one scoring pass for all queries"""
+    if not filepath.exists():
+        return [[] for _ in queries]
 
-    # Get top results with score > 0
-    results = []
-    for idx, score in ranked[:max_results]:
-        if score > 0:
-            row = data[idx]
-            results.append({col: row.get(col, "") for col in output_cols if col in row})
+    with _INDEX_LOCK:
+        index = load_index(filepath, search_cols, output_cols, filter_cols)
+        bm25 = index["bm25"]
+        version = index["signature"]["sha256"]
+        filters_key = _filters_key(filters)
+        with profile_stage("result_cache"):
+            keys = [(index["path"], tuple(search_cols), bm25.tokenize_query(query), max_results, engine, filters_key, fuzzy)
+                    for query in queries]
+            results = [_RESULT_CACHE.get(key, version) for key in keys]
 
+        # Score only the queries that missed the cache, still as one batch
+        misses = [position for position, cached in enumerate(results) if cached is None]
+        with profile_stage("filter"):
+            mask = filter_mask(index, filters) if misses else None
+        with profile_stage("bm25_score"):
+            ranked_misses = bm25.top_k_many([queries[position] for position in misses], max_results, engine, mask, fuzzy)
+        with profile_stage("result_projection"):
+            for position, ranked in zip(misses, ranked_misses):
+                results[position] = [row_dict(index, idx) for idx, _ in ranked]
+                _RESULT_CACHE.put(keys[position], version, results[position])
     return results
 
 
+# Keywords voting for each domain in detect_domain(); ties go to the earlier domain
+DOMAIN_KEYWORDS = {
+    "color": ["color", "palette", "hex", "#", "rgb"],
+    "chart": ["chart", "graph", "visualization", "trend", "bar", "pie", "scatter", "heatmap", "funnel"],
+    "landing": ["landing", "page", "cta", "conversion", "hero", "testimonial", "pricing", "section"],
+    "product": ["saas", "ecommerce", "e-commerce", "fintech", "healthcare", "gaming", "portfolio", "crypto", "dashboard"],
+    "style": ["style", "design", "ui", "minimalism", "glassmorphism", "neumorphism", "brutalism", "dark mode", "flat", "aurora", "prompt", "css", "implementation", "variable", "checklist", "tailwind"],
+    "ux": ["ux", "usability", "accessibility", "wcag", "touch", "scroll", "animation", "keyboard", "navigation", "mobile"],
+    "typography": ["font", "typography", "heading", "serif", "sans"],
+    "icons": ["icon", "icons", "lucide", "heroicons", "symbol", "glyph", "pictogram", "svg icon"],
+    "react": ["react", "next.js", "nextjs", "suspense", "memo", "usecallback", "useeffect", "rerender", "bundle", "waterfall", "barrel", "dynamic import", "rsc", "server component"],
+    "web": ["aria", "focus", "outline", "semantic", "virtualize", "autocomplete", "form", "input type", "preconnect"]
+}
+_DOMAIN_MATCHER = KeywordMatcher(DOMAIN_KEYWORDS)
+
+
 def detect_domain(query):
     """Auto-detect the most relevant domain from query"""
-    query_lower = query.lower()
-
-    domain_keywords = {
-        "color": ["color", "palette", "hex", "#", "rgb"],
-        "chart": ["chart", "graph", "visualization", "trend", "bar", "pie", "scatter", "heatmap", "funnel"],
-        "landing": ["landing", "page", "cta", "conversion", "hero", "testimonial", "pricing", "section"],
-        "product": ["saas", "ecommerce", "e-commerce", "fintech", "healthcare", "gaming", "portfolio", "crypto", "dashboard"],
-        "style": ["style", "design", "ui", "minimalism", "glassmorphism", "neumorphism", "brutalism", "dark mode", "flat", "aurora", "prompt", "css", "implementation", "variable", "checklist", "tailwind"],
-        "ux": ["ux", "usability", "accessibility", "wcag", "touch", "scroll", "animation", "keyboard", "navigation", "mobile"],
-        "typography": ["font", "typography", "heading", "serif", "sans"],
-        "icons": ["icon", "icons", "lucide", "heroicons", "symbol", "glyph", "pictogram", "svg icon"],
-        "react": ["react", "next.js", "nextjs", "suspense", "memo", "usecallback", "useeffect", "rerender", "bundle", "waterfall", "barrel", "dynamic import", "rsc", "server component"],
-        "web": ["aria", "focus", "outline", "semantic", "virtualize", "autocomplete", "form", "input type", "preconnect"]
-    }
-
-    scores = {domain: sum(1 for kw in keywords if kw in query_lower) for domain, keywords in domain_keywords.items()}
+    scores = _DOMAIN_MATCHER.counts(query.lower())
     best = max(scores, key=scores.get)
     return best if scores[best] > 0 else "style"
 
 
-def search(query, domain=None, max_results=MAX_RESULTS):
-    """Main search function with auto-domain detection"""
+def _check_backend(backend, fuzzy):
+    """Error message for an unknown backend or an option it does not support, else None"""
+    if backend not in BACKENDS:
+        return f"Unknown backend: {backend}. Available: {', '.join(BACKENDS)}"
+    if backend == "sqlite" and fuzzy:
+        return "Fuzzy matching needs the bm25 backend"
+    return None
+
+
+def _search_compiled(name, query, max_results, filters):
+    """Results of one data file from the compiled SQLite database; raises ValueError if unusable"""
+    from fts import search_compiled
+    return search_compiled(name, query, max_results, filters)
+
+
+def search(query, domain=None, max_results=MAX_RESULTS, engine=DEFAULT_ENGINE, filters=None, fuzzy=False, backend=None):
+    """Main search function with auto-domain detection ("all" searches every domain and stack).
+
+    filters restricts results to rows whose categorical columns match, e.g.
+    {"Severity": "High", "Platform": ["Web", "All"]} (see filter_mask()).
+    fuzzy matches misspelled query words to their nearest indexed terms (see BM25.expand()).
+    backend "sqlite" answers from the compiled FTS5 database instead (see fts.py).
+    """
+    backend = backend or DEFAULT_BACKEND
+    error = _check_backend(backend, fuzzy)
+    if error:
+        return {"error": error, "domain": domain}
     if domain is None:
         domain = detect_domain(query)
+    elif domain == "all":
+        if filters:
+            return {"error": "Filters need a single domain, not 'all'", "domain": domain}
+        if backend != "bm25":
+            return {"error": "The 'all' domain needs the bm25 backend", "domain": domain}
+        with profile_stage("search:all"):
+            return search_all(query, max_results, fuzzy)
 
     config = CSV_CONFIG.get(domain, CSV_CONFIG["style"])
     filepath = DATA_DIR / config["file"]
 
     if not filepath.exists():
         return {"error": f"File not found: {filepath}", "domain": domain}
+    error = _check_filters(filters, config.get("filter_cols", []))
+    if error:
+        return {"error": error, "domain": domain}
 
-    results = _search_csv(filepath, config["search_cols"], config["output_cols"], query, max_results)
+    with profile_stage(f"search:{domain}"):
+        if backend == "sqlite":
+            try:
+                results = _search_compiled(domain if domain in CSV_CONFIG else "style", query, max_results, filters)
+            except ValueError as e:
+                return {"error": str(e), "domain": domain}
+        else:
+            results = _search_csv(filepath, config["search_cols"], config["output_cols"], query, max_results, engine,
+                                  config.get("filter_cols", []), filters, fuzzy)
 
-    return {
+    response = {
         "domain": domain,
         "query": query,
         "file": config["file"],
         "count": len(results),
         "results": results
     }
+    if filters:
+        response["filters"] = filters
+    if backend != "bm25":
+        response["backend"] = backend
+    return response
 
 
-def search_stack(query, stack, max_results=MAX_RESULTS):
-    """Search stack-specific guidelines"""
+def search_stack(query, stack, max_results=MAX_RESULTS, engine=DEFAULT_ENGINE, filters=None, fuzzy=False, backend=None):
+    """Search stack-specific guidelines, optionally filtered by Category / Severity"""
+    backend = backend or DEFAULT_BACKEND
+    error = _check_backend(backend, fuzzy)
+    if error:
+        return {"error": error, "stack": stack}
     if stack not in STACK_CONFIG:
         return {"error": f"Unknown stack: {stack}. Available: {', '.join(AVAILABLE_STACKS)}"}
 
@@ -240,10 +1843,21 @@ def search_stack(query, stack, max_results=MAX_RESULTS):
 
     if not filepath.exists():
         return {"error": f"Stack file not found: {filepath}", "stack": stack}
+    error = _check_filters(filters, _STACK_COLS["filter_cols"])
+    if error:
+        return {"error": error, "stack": stack}
 
-    results = _search_csv(filepath, _STACK_COLS["search_cols"], _STACK_COLS["output_cols"], query, max_results)
+    with profile_stage(f"stack:{stack}"):
+        if backend == "sqlite":
+            try:
+                results = _search_compiled(f"stack:{stack}", query, max_results, filters)
+            except ValueError as e:
+                return {"error": str(e), "stack": stack}
+        else:
+            results = _search_csv(filepath, _STACK_COLS["search_cols"], _STACK_COLS["output_cols"], query, max_results, engine,
+                                  _STACK_COLS["filter_cols"], filters, fuzzy)
 
-    return {
+    response = {
         "domain": "stack",
         "stack": stack,
         "query": query,
@@ -251,3 +1865,365 @@ def search_stack(query, stack, max_results=MAX_RESULTS):
         "count": len(results),
         "results": results
     }
+    if filters:
+        response["filters"] = filters
+    if backend != "bm25":
+        response["backend"] = backend
+    return response
+
+
+def search_many(queries, domain=None, max_results=MAX_RESULTS, engine=DEFAULT_BATCH_ENGINE, filters=None, fuzzy=False,
+                backend=None):
+    """Search a batch of queries, returning one search() result per query.
+
+    Queries are grouped by domain (auto-detected per query when domain is None)
+    so each CSV is loaded once and scored for its whole group in one pass.
+    filters, fuzzy and backend apply to every query, as in search(); the sqlite
+    backend answers each query on its own.
+    """
+    queries = list(queries)
+    if (backend or DEFAULT_BACKEND) != "bm25":
+        return [search(query, domain, max_results, engine, filters, fuzzy, backend) for query in queries]
+    if domain == "all":
+        if filters:
+            return [{"error": "Filters need a single domain, not 'all'", "domain": domain} for _ in queries]
+        return [search_all(query, max_results, fuzzy) for query in queries]
+
+    domains = [domain if domain is not None else detect_domain(query) for query in queries]
+    responses = [None] * len(queries)
+
+    groups = defaultdict(list)
+    for position, query_domain in enumerate(domains):
+        groups[query_domain].append(position)
+
+    for query_domain, positions in groups.items():
+        config = CSV_CONFIG.get(query_domain, CSV_CONFIG["style"])
+        filepath = DATA_DIR / config["file"]
+        if not filepath.exists():
+            for position in positions:
+                responses[position] = {"error": f"File not found: {filepath}", "domain": query_domain}
+            continue
+        error = _check_filters(filters, config.get("filter_cols", []))
+        if error:
+            for position in positions:
+                responses[position] = {"error": error, "domain": query_domain}
+            continue
+
+        batch = [queries[position] for position in positions]
+        with profile_stage(f"search:{query_domain}"):
+            batch_results = _search_csv_many(filepath, config["search_cols"], config["output_cols"], batch, max_results, engine,
+                                             config.get("filter_cols", []), filters, fuzzy)
+        for position, results in zip(positions, batch_results):
+            responses[position] = {
+                "domain": query_domain,
+                "query": queries[position],
+                "file": config["file"],
+                "count": len(results),
+                "results": results
+            }
+            if filters:
+                responses[position]["filters"] = filters
+
+    return responses
+
+
+def search_stack_many(queries, stack, max_results=MAX_RESULTS, engine=DEFAULT_BATCH_ENGINE, filters=None, fuzzy=False,
+                      backend=None):
+    """Search a batch of queries against one stack's guidelines"""
+    queries = list(queries)
+    if (backend or DEFAULT_BACKEND) != "bm25":
+        return [search_stack(query, stack, max_results, engine, filters, fuzzy, backend) for query in queries]
+    if stack not in STACK_CONFIG:
+        return [{"error": f"Unknown stack: {stack}. Available: {', '.join(AVAILABLE_STACKS)}"} for _ in queries]
+
+    filepath = DATA_DIR / STACK_CONFIG[stack]["file"]
+
+    if not filepath.exists():
+        return [{"error": f"Stack file not found: {filepath}", "stack": stack} for _ in queries]
+    error = _check_filters(filters, _STACK_COLS["filter_cols"])
+    if error:
+        return [{"error": error, "stack": stack} for _ in queries]
+
+    with profile_stage(f"stack:{stack}"):
+        batch_results = _search_csv_many(filepath, _STACK_COLS["search_cols"], _STACK_COLS["output_cols"], queries, max_results, engine,
+                                         _STACK_COLS["filter_cols"], filters, fuzzy)
+
+    responses = [
+        {
+            "domain": "stack",
+            "stack": stack,
+            "query": query,
+            "file": STACK_CONFIG[stack]["file"],
+            "count": len(results),
+            "results": results
+        }
+        for query, results in zip(queries, batch_results)
+    ]
+    if filters:
+        for response in responses:
+            response["filters"] = filters
+    return responses
+
+
+# ============ SEARCH SESSION ============
+class SearchSession:
+    """Indexes and results shared by a run of related searches, e.g. a design system and its page overrides.
+
+    Each data file is checked and loaded once per session, and the latest maxsize
+    results are kept by the query's tokens, so repeating a search costs a dict
+    lookup and a long-lived session (a batch worker) stays bounded. Result rows are
+    shared between callers and must not be mutated. Edited CSVs are picked up by
+    the next session (or after clear()).
+    """
+
+    def __init__(self, engine=DEFAULT_ENGINE, maxsize=SESSION_RESULT_SIZE):
+        self.engine = engine
+        self.maxsize = maxsize
+        self.loads = 0
+        self.hits = 0
+        self.misses = 0
+        self._indexes = {}  # domain -> index entry
+        self._results = OrderedDict()  # (domain, query tokens, max_results) -> result rows, least recent first
+        self._values = {}  # memo() values, e.g. parsed reasoning rules
+
+    def index(self, domain):
+        """Index entry of a domain, loaded (and checked against its CSV) on first use"""
+        entry = self._indexes.get(domain)
+        if entry is None:
+            config = CSV_CONFIG[domain]
+            with _INDEX_LOCK:
+                entry = load_index(DATA_DIR / config["file"], config["search_cols"], config["output_cols"],
+                                   config.get("filter_cols", []))
+            self._indexes[domain] = entry
+            self.loads += 1
+        return entry
+
+    def search(self, query, domain=None, max_results=MAX_RESULTS):
+        """Same response as search() for a single domain, scored once per session"""
+        if domain is None:
+            domain = detect_domain(query)
+        return self._search(query, domain, max_results, lambda analyzer: analyzer.analyze_query(query))
+
+    def search_bundle(self, query, limits, boosts=None):
+        """Responses of several domains to one query, as search() gives them (a fused query plan).
+
+        limits maps domain -> max_results. boosts maps a domain to text appended to its
+        sub-query (e.g. a reasoning rule's style priorities). The query and each boost are
+        analysed once per analyzer signature among the domains' indexes, and every index
+        is scored from those tokens.
+        """
+        analysed = {}  # (analyzer signature, text) -> tokens
+
+        def analyse(analyzer, text):
+            # Loaded indexes each carry their own Analyzer (and lru_cache); equal signatures give equal tokens
+            key = (analyzer.signature(), text)
+            if key not in analysed:
+                analysed[key] = analyzer.analyze_query(text)
+            return analysed[key]
+
+        bundle = {}
+        for domain, max_results in limits.items():
+            boost = (boosts or {}).get(domain)
+            if boost is None:
+                bundle[domain] = self._search(query, domain, max_results, lambda analyzer: analyse(analyzer, query))
+            else:
+                # Tokens never span the joining space: the boosted query's are the query's, then the boost's
+                bundle[domain] = self._search(f"{query} {boost}", domain, max_results,
+                                              lambda analyzer: analyse(analyzer, query) + analyse(analyzer, boost))
+        return bundle
+
+    def _search(self, query, domain, max_results, analyse):
+        """Response for query in one domain; analyse(analyzer) gives the query's tokens"""
+        name = domain if domain in CSV_CONFIG else "style"
+        config = CSV_CONFIG[name]
+        filepath = DATA_DIR / config["file"]
+        if name not in self._indexes and not filepath.exists():
+            return {"error": f"File not found: {filepath}", "domain": domain}
+
+        entry = self.index(name)
+        # Each index is queried with its own analyzer's tokens, which also key its results
+        tokens = analyse(entry["bm25"].analyzer)
+        key = (name, tokens, max_results)
+        results = self._results.get(key)
+        if results is not None:
+            self._results.move_to_end(key)
+            self.hits += 1
+        else:
+            self.misses += 1
+            with profile_stage(f"search:{domain}"):
+                try:
+                    results = self._rank(entry, tokens, max_results)
+                except DataChangedError:
+                    # Rewritten in place since this session loaded it: reload and score again
+                    del self._indexes[name]
+                    results = self._rank(self.index(name), tokens, max_results)
+            self._results[key] = results
+            while len(self._results) > self.maxsize:
+                self._results.popitem(last=False)
+        return {
+            "domain": domain,
+            "query": query,
+            "file": config["file"],
+            "count": len(results),
+            "results": results
+        }
+
+    def _rank(self, entry, tokens, max_results):
+        # Held so a watcher thread never applies file changes mid-query
+        with _INDEX_LOCK:
+            with profile_stage("bm25_score"):
+                ranked = entry["bm25"].top_k(tokens, max_results, self.engine)
+            with profile_stage("result_projection"):
+                return [row_dict(entry, idx) for idx, _ in ranked]
+
+    def memo(self, key, build):
+        """build() computed once per session, for data derived from other files"""
+        if key not in self._values:
+            self._values[key] = build()
+        return self._values[key]
+
+    def clear(self):
+        """Forget loaded indexes, results and memo() values so the next use re-reads the CSVs"""
+        self._indexes.clear()
+        self._results.clear()
+        self._values.clear()
+
+    def info(self):
+        return {"loads": self.loads, "hits": self.hits, "misses": self.misses, "results": len(self._results),
+                "domains": sorted(self._indexes)}
+
+
+# ============ CROSS-DOMAIN SEARCH ============
+class UnifiedIndex:
+    """One inverted index over every domain and stack, scored once per query.
+
+    The sources' posting lists are concatenated under one vocabulary, but each
+    posting stores the BM25 weight its own source gives it (that source's N,
+    avgdl and document frequencies), so every source ranks exactly as it does
+    when searched on its own.
+    """
+
+    def __init__(self, sources):
+        """sources: [(name, file, index entry)] as returned by load_index()"""
+        self.sources = [(name, file, entry) for name, file, entry in sources]
+        self.analyzer = ANALYZER
+        self.starts = array('I')        # source position -> its first doc id
+        self.doc_sources = array('I')   # doc id -> source position
+        self.vocab = {}                 # term -> term id
+        self.post_docs = []             # term id -> array('I') of doc ids
+        self.post_weights = []          # term id -> array('d') of per-source BM25 weights
+        offset = 0
+        for position, (_, _, entry) in enumerate(sources):
+            part = entry["bm25"]
+            if part._stale:
+                part._refresh()
+            norms, k1_plus_1 = part.norms, part.k1 + 1
+            for word, term in part.vocab.items():
+                docs = part.post_docs[term]
+                if not docs:
+                    continue
+                target = self.vocab.get(word)
+                if target is None:
+                    target = self.vocab[word] = len(self.post_docs)
+                    self.post_docs.append(array('I'))
+                    self.post_weights.append(array('d'))
+                idf = part.idf[term]
+                self.post_docs[target].extend(idx + offset for idx in docs)
+                # Same expression as BM25.score_postings(), so sums match it to the last bit
+                self.post_weights[target].extend(
+                    idf * (tf * k1_plus_1) / (tf + norms[idx]) for idx, tf in zip(docs, part.post_tfs[term])
+                )
+            self.starts.append(offset)
+            self.doc_sources.extend([position] * part.size)
+            offset += part.size
+
+    def _scores(self, query, fuzzy=False):
+        """{source position: {row: score}} of the documents matching query"""
+        per_source = defaultdict(dict)
+        if fuzzy:
+            # Expansions depend on each source's own vocabulary, so each source scores itself
+            for position, (_, _, entry) in enumerate(self.sources):
+                scores = entry["bm25"].score_postings(query, fuzzy=True)
+                if scores:
+                    per_source[position] = scores
+            return per_source
+
+        scores = {}
+        vocab = self.vocab
+        for token in self.analyzer.analyze_query(query):
+            term = vocab.get(token)
+            if term is None:
+                continue
+            for idx, weight in zip(self.post_docs[term], self.post_weights[term]):
+                scores[idx] = scores.get(idx, 0) + weight
+        starts, doc_sources = self.starts, self.doc_sources
+        for idx, score in scores.items():
+            position = doc_sources[idx]
+            per_source[position][idx - starts[position]] = score
+        return per_source
+
+    def search(self, query, max_results=MAX_RESULTS, fuzzy=False):
+        """Top hits per source, with scores normalised to the best hit across all sources"""
+        with profile_stage("bm25_score"):
+            per_source = self._scores(query, fuzzy)
+            if not per_source:
+                return []
+            best = max(max(scores.values()) for scores in per_source.values())
+            tops = [
+                (position, heapq.nlargest(max_results, per_source[position].items(),
+                                          key=self.sources[position][2]["bm25"].rank_key()))
+                for position in sorted(per_source)
+            ]
+
+        hits = []
+        with profile_stage("result_projection"):
+            for position, top in tops:
+                name, file, entry = self.sources[position]
+                hits.append({
+                    "domain": name,
+                    "file": file,
+                    "count": len(top),
+                    "scores": [round(score / best, 4) for _, score in top],
+                    "results": [row_dict(entry, row) for row, _ in top]
+                })
+        # Domains ordered by their best hit; source order breaks ties
+        hits.sort(key=lambda hit: hit["scores"][0], reverse=True)
+        return hits
+
+
+_UNIFIED_INDEX = {"key": None, "index": None}
+
+
+def unified_index():
+    """Build (or reuse) the cross-domain index; rebuilt when any data file changes"""
+    sources = []
+    for name, filepath, *columns in index_specs():
+        if filepath.exists():
+            entry = load_index(filepath, *columns)
+            sources.append((name, data_name(filepath), entry))
+
+    key = tuple((name, entry["signature"]["sha256"]) for name, _, entry in sources)
+    if _UNIFIED_INDEX["key"] != key:
+        with profile_stage("index_merge"):
+            _UNIFIED_INDEX["index"] = UnifiedIndex(sources)
+        _UNIFIED_INDEX["key"] = key
+    return _UNIFIED_INDEX["index"]
+
+
+@_reload_on_change
+def search_all(query, max_results=MAX_RESULTS, fuzzy=False):
+    """Search every domain and stack in one scoring pass"""
+    with _INDEX_LOCK:
+        index = unified_index()
+        with profile_stage("result_cache"):
+            key = ("all", index.analyzer.analyze_query(query), max_results, fuzzy)
+            hits = _RESULT_CACHE.get(key, _UNIFIED_INDEX["key"])
+        if hits is None:
+            hits = index.search(query, max_results, fuzzy)
+            _RESULT_CACHE.put(key, _UNIFIED_INDEX["key"], hits)
+    return {
+        "domain": "all",
+        "query": query,
+        "count": sum(hit["count"] for hit in hits),
+        "domains": hits
+    }
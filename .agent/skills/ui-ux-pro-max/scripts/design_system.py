@@ -11,18 +11,35 @@ Usage:
     # With persistence (Master + Overrides pattern)
     result = generate_design_system("SaaS dashboard", "My Project", persist=True)
     result = generate_design_system("SaaS dashboard", "My Project", persist=True, page="dashboard")
+
+    # Many briefs at once, across worker processes (see generate_batch)
+    for record in generate_batch(read_jobs("jobs.jsonl"), workers=4, persist=True):
+        print(record["project_name"], record["ms"])
 """
 
 import csv
+import hashlib
 import json
 import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
+from multiprocessing import get_context
 from pathlib import Path
-from core import search, DATA_DIR
+
+import core
+from core import KeywordMatcher, SearchSession, profile_stage, DATA_DIR
 
 
 # ============ CONFIGURATION ============
 REASONING_FILE = "ui-reasoning.csv"
+OUTPUT_CACHE_DIR_NAME = "design-systems"  # under core.CACHE_DIR
+OUTPUT_CACHE_MAX_BYTES = 32 * 1024 * 1024  # least recently used outputs are evicted beyond this
+OUTPUT_CACHE_VERSION = 1
+# Timestamp lines of persisted files; ignored when deciding whether a file changed
+GENERATED_LINE = re.compile(r"^(?:> )?\*\*Generated:\*\*.*$", re.MULTILINE)
 
 SEARCH_CONFIG = {
     "product": {"max_results": 1},
@@ -33,81 +50,46 @@ SEARCH_CONFIG = {
 }
 
 
-# ============ DESIGN SYSTEM GENERATOR ============
-class DesignSystemGenerator:
-    """Generates design system recommendations from aggregated searches."""
-
-    def __init__(self):
-        self.reasoning_data = self._load_reasoning()
-
-    def _load_reasoning(self) -> list:
-        """Load reasoning rules from CSV."""
-        filepath = DATA_DIR / REASONING_FILE
-        if not filepath.exists():
-            return []
-        with open(filepath, 'r', encoding='utf-8') as f:
-            return list(csv.DictReader(f))
-
-    def _multi_domain_search(self, query: str, style_priority: list = None) -> dict:
-        """Execute searches across multiple domains."""
-        results = {}
-        for domain, config in SEARCH_CONFIG.items():
-            if domain == "style" and style_priority:
-                # For style, also search with priority keywords
-                priority_query = " ".join(style_priority[:2]) if style_priority else query
-                combined_query = f"{query} {priority_query}"
-                results[domain] = search(combined_query, domain, config["max_results"])
-            else:
-                results[domain] = search(query, domain, config["max_results"])
-        return results
+DEFAULT_REASONING = {
+    "pattern": "Hero + Features + CTA",
+    "style_priority": ["Minimalism", "Flat Design"],
+    "color_mood": "Professional",
+    "typography_mood": "Clean",
+    "key_effects": "Subtle hover transitions",
+    "anti_patterns": "",
+    "decision_rules": {},
+    "severity": "MEDIUM"
+}
 
-    def _find_reasoning_rule(self, category: str) -> dict:
-        """Find matching reasoning rule for a category."""
-        category_lower = category.lower()
 
-        # Try exact match first
-        for rule in self.reasoning_data:
-            if rule.get("UI_Category", "").lower() == category_lower:
-                return rule
+# ============ REASONING INDEX ============
+class ReasoningIndex:
+    """Reasoning rules compiled for lookup by product category.
 
-        # Try partial match
-        for rule in self.reasoning_data:
-            ui_cat = rule.get("UI_Category", "").lower()
-            if ui_cat in category_lower or category_lower in ui_cat:
-                return rule
+    UI_Category is lowered and split into keywords once, Decision_Rules is parsed
+    once, and every category resolved (exact, then substring, then keyword match,
+    first rule in file order winning) is remembered, so repeat lookups are a dict get.
+    """
 
-        # Try keyword match
-        for rule in self.reasoning_data:
+    def __init__(self, rules: list):
+        self.rules = rules
+        self._exact = {}
+        self._match_fields = []
+        self._reasoning = []
+        self._resolved = {}
+        for position, rule in enumerate(rules):
             ui_cat = rule.get("UI_Category", "").lower()
-            keywords = ui_cat.replace("/", " ").replace("-", " ").split()
-            if any(kw in category_lower for kw in keywords):
-                return rule
+            self._exact.setdefault(ui_cat, position)
+            self._match_fields.append((ui_cat, ui_cat.replace("/", " ").replace("-", " ").split()))
+            self._reasoning.append(self._compile(rule))
 
-        return {}
-
-    def _apply_reasoning(self, category: str, search_results: dict) -> dict:
-        """Apply reasoning rules to search results."""
-        rule = self._find_reasoning_rule(category)
-
-        if not rule:
-            return {
-                "pattern": "Hero + Features + CTA",
-                "style_priority": ["Minimalism", "Flat Design"],
-                "color_mood": "Professional",
-                "typography_mood": "Clean",
-                "key_effects": "Subtle hover transitions",
-                "anti_patterns": "",
-                "decision_rules": {},
-                "severity": "MEDIUM"
-            }
-
-        # Parse decision rules JSON
+    @staticmethod
+    def _compile(rule: dict) -> dict:
         decision_rules = {}
         try:
             decision_rules = json.loads(rule.get("Decision_Rules", "{}"))
-        except json.JSONDecodeError:
+        except (json.JSONDecodeError, TypeError):
             pass
-
         return {
             "pattern": rule.get("Recommended_Pattern", ""),
             "style_priority": [s.strip() for s in rule.get("Style_Priority", "").split("+")],
@@ -119,6 +101,82 @@ class DesignSystemGenerator:
             "severity": rule.get("Severity", "MEDIUM")
         }
 
+    def _position(self, category: str):
+        """Position of the rule matching a category, or None"""
+        category_lower = category.lower()
+        if category_lower in self._resolved:
+            return self._resolved[category_lower]
+
+        position = self._exact.get(category_lower)
+        if position is None:
+            position = next((i for i, (ui_cat, _) in enumerate(self._match_fields)
+                             if ui_cat in category_lower or category_lower in ui_cat), None)
+        if position is None:
+            position = next((i for i, (_, keywords) in enumerate(self._match_fields)
+                             if any(kw in category_lower for kw in keywords)), None)
+        self._resolved[category_lower] = position
+        return position
+
+    def find(self, category: str) -> dict:
+        """Raw CSV row of the rule matching a category, {} when none does"""
+        position = self._position(category)
+        return self.rules[position] if position is not None else {}
+
+    def reasoning(self, category: str) -> dict:
+        """Compiled reasoning of the rule matching a category (a fresh copy), DEFAULT_REASONING when none does"""
+        position = self._position(category)
+        reasoning = self._reasoning[position] if position is not None else DEFAULT_REASONING
+        return dict(reasoning, style_priority=list(reasoning["style_priority"]),
+                    decision_rules=dict(reasoning["decision_rules"]))
+
+
+# Compiled rules by (path, size, mtime): reused across generators until the CSV changes
+_REASONING_INDEXES = {}
+
+
+def load_reasoning_index() -> ReasoningIndex:
+    """Compiled reasoning rules of ui-reasoning.csv, rebuilt only when the file changes"""
+    filepath = DATA_DIR / REASONING_FILE
+    if not filepath.exists():
+        return ReasoningIndex([])
+    stat = filepath.stat()
+    key = (str(filepath), stat.st_size, stat.st_mtime_ns)
+    index = _REASONING_INDEXES.get(key)
+    if index is None:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            index = ReasoningIndex(list(csv.DictReader(f)))
+        _REASONING_INDEXES.clear()
+        _REASONING_INDEXES[key] = index
+    return index
+
+
+# ============ DESIGN SYSTEM GENERATOR ============
+class DesignSystemGenerator:
+    """Generates design system recommendations from aggregated searches."""
+
+    def __init__(self, session: SearchSession = None):
+        # Shared with page overrides (and other generations) so each CSV is loaded once
+        self.session = session or SearchSession()
+        self.reasoning_index = self.session.memo("reasoning", load_reasoning_index)
+        self.reasoning_data = self.reasoning_index.rules
+        # Row content -> lowered match fields: bounded by the distinct rows of the style data
+        self._match_fields = self.session.memo("match_fields", dict)
+
+    def _multi_domain_search(self, query: str, style_priority: list = None) -> dict:
+        """Execute searches across multiple domains as one query plan (the query is analysed once per analyzer)."""
+        limits = {domain: config["max_results"] for domain, config in SEARCH_CONFIG.items()}
+        # For style, also search with priority keywords
+        boosts = {"style": " ".join(style_priority[:2])} if style_priority else None
+        return self.session.search_bundle(query, limits, boosts)
+
+    def _find_reasoning_rule(self, category: str) -> dict:
+        """Find matching reasoning rule for a category."""
+        return self.reasoning_index.find(category)
+
+    def _apply_reasoning(self, category: str, search_results: dict) -> dict:
+        """Apply reasoning rules to search results."""
+        return self.reasoning_index.reasoning(category)
+
     def _select_best_match(self, results: list, priority_keywords: list) -> dict:
         """Select best matching result based on priority keywords."""
         if not results:
@@ -127,26 +185,25 @@ class DesignSystemGenerator:
         if not priority_keywords:
             return results[0]
 
+        priorities = [kw.lower().strip() for kw in priority_keywords]
+        fields = [self._lowered_fields(result) for result in results]
+
         # First: try exact style name match
-        for priority in priority_keywords:
-            priority_lower = priority.lower().strip()
-            for result in results:
-                style_name = result.get("Style Category", "").lower()
+        for priority_lower in priorities:
+            for result, (style_name, _, _) in zip(results, fields):
                 if priority_lower in style_name or style_name in priority_lower:
                     return result
 
         # Second: score by keyword match in all fields
         scored = []
-        for result in results:
-            result_str = str(result).lower()
+        for result, (style_name, keywords, result_str) in zip(results, fields):
             score = 0
-            for kw in priority_keywords:
-                kw_lower = kw.lower().strip()
+            for kw_lower in priorities:
                 # Higher score for style name match
-                if kw_lower in result.get("Style Category", "").lower():
+                if kw_lower in style_name:
                     score += 10
                 # Lower score for keyword field match
-                elif kw_lower in result.get("Keywords", "").lower():
+                elif kw_lower in keywords:
                     score += 3
                 # Even lower for other field matches
                 elif kw_lower in result_str:
@@ -156,6 +213,15 @@ class DesignSystemGenerator:
         scored.sort(key=lambda x: x[0], reverse=True)
         return scored[0][1] if scored and scored[0][0] > 0 else results[0]
 
+    def _lowered_fields(self, result: dict) -> tuple:
+        """Lower-cased style name, keywords and whole row of a result, computed once per distinct row"""
+        key = tuple(result.items())
+        fields = self._match_fields.get(key)
+        if fields is None:
+            fields = self._match_fields[key] = (result.get("Style Category", "").lower(),
+                                                result.get("Keywords", "").lower(), str(result).lower())
+        return fields
+
     def _extract_results(self, search_result: dict) -> list:
         """Extract results list from search result dict."""
         return search_result.get("results", [])
@@ -163,18 +229,21 @@ class DesignSystemGenerator:
     def generate(self, query: str, project_name: str = None) -> dict:
         """Generate complete design system recommendation."""
         # Step 1: First search product to get category
-        product_result = search(query, "product", 1)
+        with profile_stage("product_search"):
+            product_result = self.session.search(query, "product", 1)
         product_results = product_result.get("results", [])
         category = "General"
         if product_results:
             category = product_results[0].get("Product Type", "General")
 
         # Step 2: Get reasoning rules for this category
-        reasoning = self._apply_reasoning(category, {})
+        with profile_stage("reasoning_lookup"):
+            reasoning = self._apply_reasoning(category, {})
         style_priority = reasoning.get("style_priority", [])
 
         # Step 3: Multi-domain search with style priority hints
-        search_results = self._multi_domain_search(query, style_priority)
+        with profile_stage("multi_domain_search"):
+            search_results = self._multi_domain_search(query, style_priority)
         search_results["product"] = product_result  # Reuse product search
 
         # Step 4: Select best matches from each domain using priority
@@ -183,7 +252,8 @@ class DesignSystemGenerator:
         typography_results = self._extract_results(search_results.get("typography", {}))
         landing_results = self._extract_results(search_results.get("landing", {}))
 
-        best_style = self._select_best_match(style_results, reasoning.get("style_priority", []))
+        with profile_stage("best_match"):
+            best_style = self._select_best_match(style_results, reasoning.get("style_priority", []))
         best_color = color_results[0] if color_results else {}
         best_typography = typography_results[0] if typography_results else {}
         best_landing = landing_results[0] if landing_results else {}
@@ -458,37 +528,163 @@ def format_markdown(design_system: dict) -> str:
     return "\n".join(lines)
 
 
+def render(design_system: dict, output_format: str = "ascii") -> str:
+    """Format a design system as "ascii" (default), "markdown" or "json" """
+    if output_format == "markdown":
+        return format_markdown(design_system)
+    if output_format == "json":
+        return json.dumps(design_system, indent=2, ensure_ascii=False)
+    return format_ascii_box(design_system)
+
+
+# ============ OUTPUT CACHE ============
+def _output_cache_dir() -> Path:
+    return core.CACHE_DIR / OUTPUT_CACHE_DIR_NAME
+
+
+def data_fingerprint() -> str:
+    """Version of the files a design system is derived from: data CSVs and generator code"""
+    digest = hashlib.sha256()
+    digest.update(repr(OUTPUT_CACHE_VERSION).encode("utf-8"))
+    sources = [filepath for _, filepath, *_ in core.index_specs()] + [DATA_DIR / REASONING_FILE]
+    for filepath in sources + [Path(__file__), Path(core.__file__)]:
+        try:
+            stat = filepath.stat()
+        except FileNotFoundError:
+            continue
+        digest.update(f"{filepath}\x1f{stat.st_size}\x1f{stat.st_mtime_ns}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def output_cache_key(query: str, project_name: str = None, output_format: str = "ascii") -> str:
+    """Content address of a rendered design system.
+
+    Searches only see the query's words, so case and spacing are normalised, but
+    the default project name (the query upper-cased) is kept as rendered. The
+    analyzer settings (e.g. --stem) change the matches, so they are part of the key.
+    """
+    options = {
+        "query": " ".join(query.lower().split()),
+        "project_name": project_name or query.upper(),
+        "format": output_format,
+        "analyzer": list(core.ANALYZER.signature()),
+        "data": data_fingerprint()
+    }
+    return hashlib.sha256(json.dumps(options, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _read_cached_output(key: str):
+    """Cached {"design_system", "output"} for a key, or None; a hit marks the entry recently used"""
+    path = _output_cache_dir() / f"{key}.json"
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        os.utime(path)
+    except (OSError, ValueError):
+        return None
+    return cached
+
+
+def _write_cached_output(key: str, design_system: dict, output: str):
+    """Store a rendered design system (atomically), then evict the least recently used beyond the size bound"""
+    directory = _output_cache_dir()
+    path = directory / f"{key}.json"
+    tmp = core.temp_path(path)
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+        with open(tmp, 'x', encoding='utf-8') as f:
+            json.dump({"design_system": design_system, "output": output}, f, ensure_ascii=False)
+        os.replace(tmp, path)
+        _evict_outputs(directory, OUTPUT_CACHE_MAX_BYTES)
+    except OSError:
+        # caching is best effort, e.g. on a read-only checkout
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
+
+
+def _evict_outputs(directory: Path, max_bytes: int):
+    entries = []
+    for path in directory.glob("*.json"):
+        try:
+            stat = path.stat()
+        except FileNotFoundError:  # evicted by another process
+            continue
+        entries.append((stat.st_mtime_ns, stat.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def clear_output_cache():
+    """Delete every cached design system"""
+    for path in _output_cache_dir().glob("*.json"):
+        path.unlink()
+
+
 # ============ MAIN ENTRY POINT ============
 def generate_design_system(query: str, project_name: str = None, output_format: str = "ascii", 
-                           persist: bool = False, page: str = None, output_dir: str = None) -> str:
+                           persist: bool = False, page: str = None, output_dir: str = None,
+                           session: SearchSession = None, cache: bool = False, pages: list = None) -> str:
     """
     Main entry point for design system generation.
 
     Args:
         query: Search query (e.g., "SaaS dashboard", "e-commerce luxury")
         project_name: Optional project name for output header
-        output_format: "ascii" (default) or "markdown"
+        output_format: "ascii" (default), "markdown" or "json"
         persist: If True, save design system to design-system/ folder
         page: Optional page name for page-specific override file
         output_dir: Optional output directory (defaults to current working directory)
+        session: Optional SearchSession to reuse loaded indexes and results across calls
+        cache: If True, read and write the on-disk output cache (.cache/design-systems/).
+            Off by default; the CLI turns it on. A hit skips the searches, so session is not used
+        pages: Optional list of further page names to create override files for, in one pass
 
     Returns:
         Formatted design system string
     """
-    generator = DesignSystemGenerator()
-    design_system = generator.generate(query, project_name)
+    key = None
+    cached = None
+    if cache:
+        with profile_stage("output_cache"):
+            key = output_cache_key(query, project_name, output_format)
+            cached = _read_cached_output(key)
+
+    if cached is not None:
+        design_system = cached["design_system"]
+    else:
+        with profile_stage("load_reasoning"):
+            generator = DesignSystemGenerator(session)
+            session = generator.session
+        with profile_stage("generate"):
+            design_system = generator.generate(query, project_name)
     
     # Persist to files if requested
     if persist:
-        persist_design_system(design_system, page, output_dir, query)
+        with profile_stage("persist"):
+            persist_design_system(design_system, page, output_dir, query, session, pages)
 
-    if output_format == "markdown":
-        return format_markdown(design_system)
-    return format_ascii_box(design_system)
+    if cached is not None:
+        return cached["output"]
+    with profile_stage("render"):
+        output = render(design_system, output_format)
+    if key is not None:
+        with profile_stage("output_cache"):
+            _write_cached_output(key, design_system, output)
+    return output
 
 
 # ============ PERSISTENCE FUNCTIONS ============
-def persist_design_system(design_system: dict, page: str = None, output_dir: str = None, page_query: str = None) -> dict:
+def persist_design_system(design_system: dict, page: str = None, output_dir: str = None, page_query: str = None,
+                          session: SearchSession = None, pages: list = None) -> dict:
     """
     Persist design system to design-system/<project>/ folder using Master + Overrides pattern.
     
@@ -497,20 +693,36 @@ def persist_design_system(design_system: dict, page: str = None, output_dir: str
         page: Optional page name for page-specific override file
         output_dir: Optional output directory (defaults to current working directory)
         page_query: Optional query string for intelligent page override generation
+        session: Optional SearchSession of the generation, reused for page override searches
+        pages: Optional list of further page names to create override files for
     
+    Files are written to a temporary file and renamed into place, so a crash never
+    leaves a truncated file, and files whose content (ignoring the Generated
+    timestamp) is unchanged are not rewritten. Project and page names become slugify()
+    file names; a path that would still resolve outside design-system/ raises ValueError.
+
     Returns:
-        dict with created file paths and status
+        dict with status, created_files (every file of the design system), and the
+        manifest: written (new or changed) and skipped (unchanged) files
     """
     base_dir = Path(output_dir) if output_dir else Path.cwd()
     
     # Use project name for project-specific folder
-    project_name = design_system.get("project_name", "default")
-    project_slug = project_name.lower().replace(' ', '-')
+    project_slug = slugify(design_system.get("project_name") or "default")
     
     design_system_dir = base_dir / "design-system" / project_slug
     pages_dir = design_system_dir / "pages"
+    page_files = {}
+    for page_name in ([page] if page else []) + list(pages or []):
+        page_files.setdefault(pages_dir / f"{slugify(page_name, 'page')}.md", page_name)
+    # Names are slugs already; this also catches a symlinked directory pointing elsewhere
+    root = (base_dir / "design-system").resolve()
+    for path in [design_system_dir, *page_files]:
+        if not path.resolve().is_relative_to(root):
+            raise ValueError(f"Refusing to write outside {root}: {path}")
     
     created_files = []
+    manifest = {"written": [], "skipped": []}
     
     # Create directories
     design_system_dir.mkdir(parents=True, exist_ok=True)
@@ -520,25 +732,56 @@ def persist_design_system(design_system: dict, page: str = None, output_dir: str
     
     # Generate and write MASTER.md
     master_content = format_master_md(design_system)
-    with open(master_file, 'w', encoding='utf-8') as f:
-        f.write(master_content)
+    manifest[_write_if_changed(master_file, master_content)].append(str(master_file))
     created_files.append(str(master_file))
     
-    # If page is specified, create page override file with intelligent content
-    if page:
-        page_file = pages_dir / f"{page.lower().replace(' ', '-')}.md"
-        page_content = format_page_override_md(design_system, page, page_query)
-        with open(page_file, 'w', encoding='utf-8') as f:
-            f.write(page_content)
+    # If pages are specified, create page override files with intelligent content (one session for all)
+    session = session or SearchSession()
+    for page_file, page_name in page_files.items():
+        page_content = format_page_override_md(design_system, page_name, page_query, session)
+        manifest[_write_if_changed(page_file, page_content)].append(str(page_file))
         created_files.append(str(page_file))
     
     return {
         "status": "success",
         "design_system_dir": str(design_system_dir),
-        "created_files": created_files
+        "created_files": created_files,
+        **manifest
     }
 
 
+def slugify(name: str, default: str = "default") -> str:
+    """File name of a project or page: accents folded, runs of other characters turned into one hyphen"""
+    slug = re.sub(r"[^a-z0-9]+", "-", core.fold_accents(str(name)).lower()).strip("-")
+    return slug or default
+
+
+def _content_hash(content: str) -> str:
+    return hashlib.sha256(GENERATED_LINE.sub("", content).encode("utf-8")).hexdigest()
+
+
+def _write_if_changed(path: Path, content: str) -> str:
+    """Atomically replace path with content unless only its timestamp differs; returns "written" or "skipped" """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            if _content_hash(f.read()) == _content_hash(content):
+                return "skipped"
+    except (FileNotFoundError, UnicodeDecodeError):
+        pass
+    tmp = core.temp_path(path)
+    try:
+        with open(tmp, 'x', encoding='utf-8') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if tmp.exists():
+            tmp.unlink()
+        raise
+    return "written"
+
+
 def format_master_md(design_system: dict) -> str:
     """Format design system as MASTER.md with hierarchical override logic."""
     project = design_system.get("project_name", "PROJECT")
@@ -802,14 +1045,15 @@ def format_master_md(design_system: dict) -> str:
     return "\n".join(lines)
 
 
-def format_page_override_md(design_system: dict, page_name: str, page_query: str = None) -> str:
+def format_page_override_md(design_system: dict, page_name: str, page_query: str = None,
+                            session: SearchSession = None) -> str:
     """Format a page-specific override file with intelligent AI-generated content."""
     project = design_system.get("project_name", "PROJECT")
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     page_title = page_name.replace("-", " ").replace("_", " ").title()
     
     # Detect page type and generate intelligent overrides
-    page_overrides = _generate_intelligent_overrides(page_name, page_query, design_system)
+    page_overrides = _generate_intelligent_overrides(page_name, page_query, design_system, session)
     
     lines = []
     
@@ -911,23 +1155,24 @@ def format_page_override_md(design_system: dict, page_name: str, page_query: str
     return "\n".join(lines)
 
 
-def _generate_intelligent_overrides(page_name: str, page_query: str, design_system: dict) -> dict:
+def _generate_intelligent_overrides(page_name: str, page_query: str, design_system: dict,
+                                    session: SearchSession = None) -> dict:
     """
     Generate intelligent overrides based on page type using layered search.
     
     Uses the existing search infrastructure to find relevant style, UX, and layout
     data instead of hardcoded page types.
     """
-    from core import search
+    session = session or SearchSession()
     
     page_lower = page_name.lower()
     query_lower = (page_query or "").lower()
     combined_context = f"{page_lower} {query_lower}"
     
     # Search across multiple domains for page-specific guidance
-    style_search = search(combined_context, "style", max_results=1)
-    ux_search = search(combined_context, "ux", max_results=3)
-    landing_search = search(combined_context, "landing", max_results=1)
+    style_search = session.search(combined_context, "style", max_results=1)
+    ux_search = session.search(combined_context, "ux", max_results=3)
+    landing_search = session.search(combined_context, "landing", max_results=1)
     
     # Extract results from search response
     style_results = style_search.get("results", [])
@@ -1017,27 +1262,28 @@ def _generate_intelligent_overrides(page_name: str, page_query: str, design_syst
     }
 
 
+# Page types checked in order: the first with a keyword in the page name or query wins
+PAGE_TYPE_KEYWORDS = {
+    "Dashboard / Data View": ["dashboard", "admin", "analytics", "data", "metrics", "stats", "monitor", "overview"],
+    "Checkout / Payment": ["checkout", "payment", "cart", "purchase", "order", "billing"],
+    "Settings / Profile": ["settings", "profile", "account", "preferences", "config"],
+    "Landing / Marketing": ["landing", "marketing", "homepage", "hero", "home", "promo"],
+    "Authentication": ["login", "signin", "signup", "register", "auth", "password"],
+    "Pricing / Plans": ["pricing", "plans", "subscription", "tiers", "packages"],
+    "Blog / Article": ["blog", "article", "post", "news", "content", "story"],
+    "Product Detail": ["product", "item", "detail", "pdp", "shop", "store"],
+    "Search Results": ["search", "results", "browse", "filter", "catalog", "list"],
+    "Empty State": ["empty", "404", "error", "not found", "zero"],
+}
+_PAGE_TYPE_MATCHER = KeywordMatcher(PAGE_TYPE_KEYWORDS)
+
+
 def _detect_page_type(context: str, style_results: list) -> str:
     """Detect page type from context and search results."""
-    context_lower = context.lower()
-    
     # Check for common page type patterns
-    page_patterns = [
-        (["dashboard", "admin", "analytics", "data", "metrics", "stats", "monitor", "overview"], "Dashboard / Data View"),
-        (["checkout", "payment", "cart", "purchase", "order", "billing"], "Checkout / Payment"),
-        (["settings", "profile", "account", "preferences", "config"], "Settings / Profile"),
-        (["landing", "marketing", "homepage", "hero", "home", "promo"], "Landing / Marketing"),
-        (["login", "signin", "signup", "register", "auth", "password"], "Authentication"),
-        (["pricing", "plans", "subscription", "tiers", "packages"], "Pricing / Plans"),
-        (["blog", "article", "post", "news", "content", "story"], "Blog / Article"),
-        (["product", "item", "detail", "pdp", "shop", "store"], "Product Detail"),
-        (["search", "results", "browse", "filter", "catalog", "list"], "Search Results"),
-        (["empty", "404", "error", "not found", "zero"], "Empty State"),
-    ]
-    
-    for keywords, page_type in page_patterns:
-        if any(kw in context_lower for kw in keywords):
-            return page_type
+    page_type = _PAGE_TYPE_MATCHER.first(context.lower())
+    if page_type:
+        return page_type
     
     # Fallback: try to infer from style results
     if style_results:
@@ -1052,6 +1298,130 @@ def _detect_page_type(context: str, style_results: list) -> str:
     return "General"
 
 
+# ============ BATCH GENERATION ============
+# Every domain a design system or its page overrides search
+BATCH_DOMAINS = list(SEARCH_CONFIG) + ["ux"]
+# A job takes about a millisecond in a warm process; below this many, spawning workers costs more than it saves
+BATCH_POOL_MIN_JOBS = 500
+
+# Worker processes keep one session (and so one set of loaded indexes) for all their jobs
+_BATCH_SESSION = None
+
+
+def read_jobs(path: str) -> list:
+    """Read batch jobs, one JSON object per line ({"query", "project_name", "pages"}), from a file or stdin ("-")"""
+    if path == "-":
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+    jobs = []
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            job = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"{path}:{number}: invalid JSON ({e})") from None
+        if not isinstance(job, dict) or not str(job.get("query") or "").strip():
+            raise ValueError(f"{path}:{number}: a job needs a \"query\"")
+        pages = job.get("pages") or []
+        if isinstance(pages, str):
+            pages = [p.strip() for p in pages.split(",") if p.strip()]
+        jobs.append({"query": job["query"], "project_name": job.get("project_name"), "pages": list(pages)})
+    return jobs
+
+
+def _init_batch_worker(analyzer, cache_dir):
+    """Worker: the parent's analyzer and cache directory, and the pre-fitted indexes loaded once"""
+    global _BATCH_SESSION
+    core._init_warm_worker(analyzer, cache_dir)
+    _BATCH_SESSION = SearchSession()
+    for domain in BATCH_DOMAINS:
+        _BATCH_SESSION.index(domain)
+
+
+def run_job(job: dict, index: int = 0, output_format: str = "ascii", persist: bool = False,
+            output_dir: str = None, session: SearchSession = None) -> dict:
+    """Generate (and optionally persist) one batch job; any failure is reported in the record's "error" """
+    started = time.perf_counter()
+    record = {"index": index, "query": None, "project_name": None, "pid": os.getpid()}
+    session = session or _BATCH_SESSION or SearchSession()
+    try:
+        record["query"], record["project_name"] = job["query"], job.get("project_name")
+        design_system = DesignSystemGenerator(session).generate(job["query"], job.get("project_name"))
+        if persist:
+            result = persist_design_system(design_system, None, output_dir, job["query"], session, job.get("pages"))
+            record["files"] = result["created_files"]
+        record["output"] = render(design_system, output_format)
+        record["design_system"] = design_system
+    except Exception as e:
+        # One bad job must not end the batch: the rest still run
+        record["error"] = f"{type(e).__name__}: {e}"
+    record["ms"] = round((time.perf_counter() - started) * 1000, 3)
+    return record
+
+
+def generate_batch(jobs: list, workers: int = None, output_format: str = "ascii", persist: bool = False,
+                   output_dir: str = None):
+    """
+    Generate design systems for many jobs, yielding one record per job as soon as it finishes.
+
+    Indexes are fitted (or loaded) once here and cached on disk, so spawned workers
+    only read the cached artifacts, then serve all their jobs from one SearchSession.
+    Records carry the job's "index" in jobs, since workers finish out of order.
+    Without an explicit workers count, batches under BATCH_POOL_MIN_JOBS run in this
+    process and larger ones use one worker per CPU; with one worker, jobs run here.
+    """
+    jobs = list(jobs)
+    session = SearchSession()
+    with profile_stage("batch_warm"):
+        for domain in BATCH_DOMAINS:
+            session.index(domain)
+
+    if workers is None:
+        workers = (os.cpu_count() or 1) if len(jobs) >= BATCH_POOL_MIN_JOBS else 1
+    workers = min(workers, len(jobs))
+    if workers <= 1:
+        for position, job in enumerate(jobs):
+            yield run_job(job, position, output_format, persist, output_dir, session)
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=get_context("spawn"),
+        initializer=_init_batch_worker, initargs=(core.ANALYZER, core.CACHE_DIR)
+    ) as pool:
+        futures = {pool.submit(run_job, job, position, output_format, persist, output_dir): position
+                   for position, job in enumerate(jobs)}
+        for future in as_completed(futures):
+            try:
+                record = future.result()
+            except Exception as e:
+                # The job never reported back (e.g. its record could not be pickled)
+                position = futures[future]
+                job = jobs[position] if isinstance(jobs[position], dict) else {}
+                record = {"index": position, "query": job.get("query"), "project_name": job.get("project_name"),
+                          "pid": None, "error": f"{type(e).__name__}: {e}", "ms": 0.0}
+            yield record
+
+
+def batch_summary(records: list, total_ms: float) -> dict:
+    """Throughput and per-job latency of a finished batch, from its records"""
+    latencies = sorted(record["ms"] for record in records)
+
+    def rank(p):
+        return latencies[min(len(latencies) - 1, max(0, int(round(p / 100.0 * len(latencies))) - 1))] if latencies else 0.0
+
+    return {
+        "jobs": len(records),
+        "errors": sum(1 for record in records if "error" in record),
+        "workers": len({record["pid"] for record in records} - {None}),
+        "total_ms": round(total_ms, 3),
+        "jobs_per_s": round(len(records) / (total_ms / 1000), 2) if total_ms > 0 else None,
+        "latency_ms": {"p50": rank(50), "p95": rank(95), "max": latencies[-1] if latencies else 0.0}
+    }
+
+
 # ============ CLI SUPPORT ============
 if __name__ == "__main__":
     import argparse
@@ -1059,9 +1429,10 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Generate Design System")
     parser.add_argument("query", help="Search query (e.g., 'SaaS dashboard')")
     parser.add_argument("--project-name", "-p", type=str, default=None, help="Project name")
-    parser.add_argument("--format", "-f", choices=["ascii", "markdown"], default="ascii", help="Output format")
+    parser.add_argument("--format", "-f", choices=["ascii", "markdown", "json"], default="ascii", help="Output format")
+    parser.add_argument("--no-cache", action="store_true", help="Regenerate instead of using the output cache")
 
     args = parser.parse_args()
 
-    result = generate_design_system(args.query, args.project_name, args.format)
+    result = generate_design_system(args.query, args.project_name, args.format, cache=not args.no_cache)
     print(result)
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+UI/UX Pro Max SQLite backend - every domain and stack CSV compiled into one FTS5 database
+
+Usage:
+    python search.py --compile-data                     # writes .cache/data.db (or $UI_PRO_MAX_DATABASE)
+    python search.py "<query>" --domain ux --backend sqlite
+
+Each data file becomes an FTS5 table (search columns indexed, the rest stored) ranked
+with SQLite's bm25(). SQLite fixes k1=1.2 and weighs columns separately, so scores
+and close calls can differ from the in-memory engine.
+
+The database is opened read-only and memory-mapped, one connection per thread, so
+startup costs a file open and any number of agent processes can read it at once.
+compile_data() writes a new file and renames it into place; readers reopen it on
+their next query. Rows are streamed from the CSVs, so corpora far larger than
+memory compile and query the same way.
+"""
+
+import csv
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import core
+from core import Analyzer, index_specs, data_name, file_signature, filter_value, signature_state, temp_path
+
+
+# ============ CONFIGURATION ============
+DATABASE_ENV = "UI_PRO_MAX_DATABASE"
+DATABASE_NAME = "data.db"
+SCHEMA_VERSION = 2
+MMAP_SIZE = 256 * 1024 * 1024  # bytes of the database file mapped into each reader
+TOKENIZER = "unicode61 remove_diacritics 2"  # lower-cases and folds accents like the default Analyzer
+INSERT_BATCH = 5000  # rows per executemany while compiling
+
+# Queries use the index-time analysis of the data (no stemming: FTS5 stores unstemmed tokens)
+_QUERY_ANALYZER = Analyzer()
+
+
+def database_path():
+    """Compiled database location: $UI_PRO_MAX_DATABASE, else data.db in the index cache directory"""
+    return Path(os.environ.get(DATABASE_ENV) or core.CACHE_DIR / DATABASE_NAME)
+
+
+# ============ COMPILE ============
+def _compile_source(conn, table, filepath, search_cols, output_cols, filter_cols):
+    """Create and fill the FTS5 table of one CSV; returns (stored columns, row count)"""
+    with open(filepath, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        position = {col: i for i, col in enumerate(header)}
+        columns = [col for col in dict.fromkeys([*output_cols, *search_cols, *filter_cols]) if col in position]
+        # Filter columns also get a folded copy k{j}: SQLite's lower() only folds ASCII,
+        # so folding here with filter_value() keeps matches identical to core.filter_mask()
+        folded = [col for col in filter_cols if col in position]
+        definitions = ", ".join([*(f"c{i}" + ("" if col in search_cols else " UNINDEXED") for i, col in enumerate(columns)),
+                                 *(f"k{j} UNINDEXED" for j in range(len(folded)))])
+        conn.execute(f"CREATE VIRTUAL TABLE {table} USING fts5({definitions}, tokenize='{TOKENIZER}')")
+
+        positions = [position[col] for col in columns]
+        folded_positions = [position[col] for col in folded]
+        insert = f"INSERT INTO {table} VALUES ({', '.join('?' * (len(columns) + len(folded)))})"
+        count, batch = 0, []
+        for row in reader:
+            if not row:
+                continue
+            batch.append([*(row[i] if i < len(row) else None for i in positions),
+                          *(filter_value(row[i] if i < len(row) else None) for i in folded_positions)])
+            if len(batch) >= INSERT_BATCH:
+                conn.executemany(insert, batch)
+                count += len(batch)
+                batch = []
+        conn.executemany(insert, batch)
+        count += len(batch)
+    conn.execute(f"INSERT INTO {table}({table}) VALUES ('optimize')")
+    return columns, count
+
+
+def compile_data(path=None, specs=None):
+    """Compile every domain and stack CSV into one FTS5 database, atomically replacing the old one.
+
+    specs defaults to core.index_specs(): (name, filepath, search_cols, output_cols, filter_cols).
+    Returns {"path", "bytes", "total_ms", "sources": {name: {"rows", "ms"}}}.
+    """
+    started = time.perf_counter()
+    target = Path(path or database_path())
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = temp_path(target)
+
+    sources = {}
+    conn = sqlite3.connect(tmp)
+    try:
+        # A throwaway file until the rename: no journal, no fsync
+        conn.execute("PRAGMA journal_mode=OFF")
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+        conn.execute("INSERT INTO meta VALUES ('schema_version', ?)", (str(SCHEMA_VERSION),))
+        conn.execute(
+            "CREATE TABLE sources (name TEXT PRIMARY KEY, tbl TEXT, file TEXT, size INTEGER, mtime_ns INTEGER,"
+            " sha256 TEXT, columns TEXT, output_cols TEXT, filter_cols TEXT, rows INTEGER)"
+        )
+        for position, (name, filepath, search_cols, output_cols, filter_cols) in enumerate(specs or index_specs()):
+            if not filepath.exists():
+                continue
+            compiled = time.perf_counter()
+            signature = file_signature(filepath)
+            table = f"t{position}"
+            columns, count = _compile_source(conn, table, filepath, search_cols, output_cols, filter_cols)
+            conn.execute(
+                "INSERT INTO sources VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (name, table, data_name(filepath), signature["size"], signature["mtime_ns"], signature["sha256"],
+                 json.dumps(columns), json.dumps([col for col in output_cols if col in columns]),
+                 json.dumps([col for col in filter_cols if col in columns]), count)
+            )
+            sources[name] = {"rows": count, "ms": (time.perf_counter() - compiled) * 1000}
+        conn.commit()
+    except BaseException:
+        conn.close()
+        tmp.unlink()
+        raise
+    conn.close()
+    os.replace(tmp, target)
+    return {
+        "path": str(target),
+        "bytes": target.stat().st_size,
+        "total_ms": (time.perf_counter() - started) * 1000,
+        "sources": sources
+    }
+
+
+# ============ QUERY ============
+# Per-thread (connection key, connection, {name: source}): sqlite3 connections are not shared across threads
+_LOCAL = threading.local()
+
+
+def _open(path):
+    """Read-only, memory-mapped connection to the compiled database, reopened when the file is replaced"""
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        raise ValueError(f"No compiled database at {path}. Run: python search.py --compile-data") from None
+    key = (str(path), stat.st_ino, stat.st_mtime_ns)
+    cached = getattr(_LOCAL, "db", None)
+    if cached is not None and cached[0] == key:
+        return cached[1], cached[2]
+    if cached is not None:
+        cached[1].close()
+
+    conn = sqlite3.connect(f"{path.resolve().as_uri()}?mode=ro", uri=True)
+    conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+    conn.execute("PRAGMA query_only=ON")
+    version = conn.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()
+    if version is None or int(version[0]) != SCHEMA_VERSION:
+        conn.close()
+        raise ValueError(f"Compiled database at {path} is from another version. Run: python search.py --compile-data")
+    sources = {}
+    for name, table, file, size, mtime_ns, sha256, columns, output_cols, filter_cols, _ in conn.execute("SELECT * FROM sources"):
+        sources[name] = {
+            "table": table,
+            "file": file,
+            "signature": {"size": size, "mtime_ns": mtime_ns, "sha256": sha256},
+            "columns": json.loads(columns),
+            "output_cols": json.loads(output_cols),
+            "filter_cols": json.loads(filter_cols)
+        }
+    _LOCAL.db = (key, conn, sources)
+    return conn, sources
+
+
+def search_compiled(name, query, max_results, filters=None, path=None):
+    """Top rows of one data file (domain name or "stack:<stack>") from the compiled database.
+
+    filters work as in core.filter_mask(). Raises ValueError when the database is
+    missing, out of date with its CSV, or lacks the data file.
+    """
+    conn, sources = _open(Path(path or database_path()))
+    source = sources.get(name)
+    if source is None:
+        raise ValueError(f"{name} is not in the compiled database. Run: python search.py --compile-data")
+    filepath = core.DATA_DIR / source["file"]
+    if filepath.exists() and signature_state(source["signature"], filepath) is None:
+        raise ValueError(f"{source['file']} changed since the database was compiled. Run: python search.py --compile-data")
+
+    tokens = list(dict.fromkeys(_QUERY_ANALYZER.analyze_query(query)))
+    if not tokens:
+        return []
+    table, columns = source["table"], source["columns"]
+    selected = [f"c{columns.index(col)}" for col in source["output_cols"]]
+    # Tokens are \w+ runs, so quoting makes each one a literal term
+    where, params = [f"{table} MATCH ?"], [" OR ".join(f'"{token}"' for token in tokens)]
+    for col, values in (filters or {}).items():
+        if col not in source["filter_cols"]:
+            raise ValueError(f"Cannot filter on {col!r}. Filterable columns: {', '.join(source['filter_cols']) or 'none'}")
+        values = sorted({filter_value(value) for value in ([values] if isinstance(values, str) else values)})
+        where.append(f"k{source['filter_cols'].index(col)} IN ({', '.join('?' * len(values))})")
+        params.extend(values)
+    sql = (f"SELECT {', '.join(selected)} FROM {table} WHERE {' AND '.join(where)}"
+           f" ORDER BY bm25({table}), rowid LIMIT ?")
+    rows = conn.execute(sql, [*params, max_results]).fetchall()
+    return [dict(zip(source["output_cols"], row)) for row in rows]
@@ -5,20 +5,80 @@ UI/UX Pro Max Search - BM25 search engine for UI/UX style guides
 Usage: python search.py "<query>" [--domain <domain>] [--stack <stack>] [--max-results 3]
        python search.py "<query>" --design-system [-p "Project Name"]
        python search.py "<query>" --design-system --persist [-p "Project Name"] [--page "dashboard"]
+       python search.py "<query>" --design-system --persist [-p "Project Name"] --pages dashboard,checkout,settings
+       python search.py --batch queries.txt [--domain <domain> | --stack <stack>] > results.jsonl
+       python search.py --design-system --batch jobs.jsonl [--workers 4] [--persist] > design-systems.jsonl
+       python search.py --serve [--listen 127.0.0.1:8765 | --listen unix:/tmp/ui-pro-max.sock]
+       python search.py --warm [--workers 4]
+       python search.py --compile-data
+       python search.py "<query>" --backend sqlite [--domain <domain> | --stack <stack>]
 
 Domains: style, prompt, color, chart, landing, product, ux, typography
+         all (every domain and stack in one pass, ranked hits per domain)
 Stacks: html-tailwind, react, nextjs
 
 Persistence (Master + Overrides pattern):
   --persist    Save design system to design-system/MASTER.md
   --page       Also create a page-specific override file in design-system/pages/
+  --pages      Comma-separated pages: every override is generated in one pass
+Files are replaced atomically, and files whose content is unchanged (apart from the
+Generated timestamp) are left untouched.
+
+Design systems are cached on disk (.cache/design-systems/), keyed by the query, project
+name, format and a fingerprint of the data files, so repeating a request is instant.
+  --no-cache   Regenerate (and do not store) the design system
+
+Filters (categorical columns, matched case-insensitively before ranking):
+  --filter     COL=VALUE, repeatable. Values for the same column are ORed, columns are ANDed:
+               --domain ux --filter Severity=High --filter Platform=Web --filter Platform=All
+
+Text analysis:
+  --stem       Light stemming for "en" or "es" at index and query time (also UI_PRO_MAX_STEMMER).
+               Accents are always folded, so "barbería" matches "barberia".
+  --fuzzy      Match misspelled words to the nearest indexed terms ("glasmorphism" -> glassmorphism):
+               1 edit for words of 4+ letters, 2 edits for 8+
+
+Batch mode:
+  --batch      Read one query per line from FILE ("-" for stdin) and write one JSON result per line
+               With --design-system, FILE holds one job per line: {"query", "project_name", "pages": [...]}.
+               Jobs run across --workers processes and each result is written as soon as it is ready
+               (with its "index" in FILE); --persist saves MASTER.md and the page overrides of every
+               project. Throughput and per-job latency go to stderr.
+
+Server mode (warm indexes for agent loops):
+  --serve      Keep every index resident and answer requests on --listen (see server.py)
+  --watch      Seconds between checks of the data CSVs while serving; edited rows are applied
+               to the resident indexes in place (default: 1, 0 disables)
+  --server     Send the request to a running server; falls back to in-process search if unreachable.
+               Can also be set with the UI_PRO_MAX_SERVER environment variable.
+
+Storage backends:
+  --compile-data  Compile every domain and stack CSV into one SQLite FTS5 database
+                  (.cache/data.db, or $UI_PRO_MAX_DATABASE). Re-run after editing the CSVs.
+  --backend       bm25 (in-memory indexes, default) or sqlite (the compiled database, opened
+                  read-only and memory-mapped; also UI_PRO_MAX_BACKEND). sqlite has no fuzzy
+                  matching and no "all" domain.
+
+Warm-up:
+  --warm       Load every index, fitting missing ones in parallel worker processes, and print
+               per-index timings (to stderr when combined with a query, --batch or --serve)
+  --workers    Worker processes for --warm (default: one per CPU once there is enough to fit)
+
+Profiling:
+  --profile         Print the time spent in each stage (index load, tokenize, fit, score,
+                    projection, design-system steps, formatting) to stderr. Always runs in-process.
+  --profile-output  Also write a cProfile dump of the whole call to FILE (read with pstats)
 """
 
 import argparse
+import os
 import sys
 import io
-from core import CSV_CONFIG, AVAILABLE_STACKS, MAX_RESULTS, search, search_stack
-from design_system import generate_design_system, persist_design_system
+from contextlib import ExitStack
+from core import (
+    CSV_CONFIG, AVAILABLE_STACKS, MAX_RESULTS, ENGINES, DEFAULT_ENGINE, DEFAULT_BATCH_ENGINE, STEMMERS, WATCH_INTERVAL, BACKENDS,
+    search, search_stack, search_many, search_stack_many, profile_stage, profiling
+)
 
 # Force UTF-8 for stdout/stderr to handle emojis on Windows (cp1252 default)
 if sys.stdout.encoding and sys.stdout.encoding.lower() != 'utf-8':
@@ -32,6 +92,9 @@ def format_output(result):
     if "error" in result:
         return f"Error: {result['error']}"
 
+    if "domains" in result:
+        return format_all_output(result)
+
     output = []
     if result.get("stack"):
         output.append(f"## UI Pro Max Stack Guidelines")
@@ -39,6 +102,9 @@ def format_output(result):
     else:
         output.append(f"## UI Pro Max Search Results")
         output.append(f"**Domain:** {result['domain']} | **Query:** {result['query']}")
+    if result.get("filters"):
+        filters = ", ".join(f"{col}={'|'.join([values] if isinstance(values, str) else values)}" for col, values in result["filters"].items())
+        output.append(f"**Filters:** {filters}")
     output.append(f"**Source:** {result['file']} | **Found:** {result['count']} results\n")
 
     for i, row in enumerate(result['results'], 1):
@@ -53,44 +119,238 @@ def format_output(result):
     return "\n".join(output)
 
 
+def format_all_output(result):
+    """Format cross-domain results: one section per domain, best domain first"""
+    output = []
+    output.append(f"## UI Pro Max Cross-Domain Results")
+    output.append(f"**Query:** {result['query']} | **Found:** {result['count']} results in {len(result['domains'])} domains\n")
+
+    for hit in result['domains']:
+        output.append(f"### {hit['domain']} ({hit['file']})")
+        for row, score in zip(hit['results'], hit['scores']):
+            output.append(f"#### Score {score:.2f}")
+            for key, value in row.items():
+                value_str = str(value)
+                if len(value_str) > 300:
+                    value_str = value_str[:300] + "..."
+                output.append(f"- **{key}:** {value_str}")
+        output.append("")
+
+    return "\n".join(output)
+
+
+def format_profile(report):
+    """Format a Profiler report as an indented stage table"""
+    output = [f"## Profile ({report['total_ms']:.2f} ms total)"]
+    output.append(f"{'stage':<48} {'calls':>6} {'total ms':>10} {'mean ms':>9}")
+    for stage in report["stages"]:
+        name = "  " * stage["depth"] + stage["stage"].rsplit("/", 1)[-1]
+        output.append(f"{name:<48} {stage['calls']:>6} {stage['total_ms']:>10.3f} {stage['mean_ms']:>9.3f}")
+    return "\n".join(output)
+
+
+def format_warm(report):
+    """Format a warm_all() report as a per-index timing table"""
+    output = [f"## Warm-up ({len(report['indexes'])} indexes in {report['total_ms']:.1f} ms, workers: {report['workers']})"]
+    output.append(f"{'index':<24} {'source':<9} {'rows':>6} {'ms':>9}")
+    for name, timing in report["indexes"].items():
+        output.append(f"{name:<24} {timing['source']:<9} {timing['rows']:>6} {timing['ms']:>9.2f}")
+    return "\n".join(output)
+
+
+def parse_filters(items):
+    """Turn repeated COL=VALUE arguments into {col: [values]}; raises ValueError on bad input"""
+    filters = {}
+    for item in items or []:
+        col, sep, value = item.partition("=")
+        if not sep or not col.strip() or not value.strip():
+            raise ValueError(f"Invalid filter: {item} (expected COL=VALUE)")
+        filters.setdefault(col.strip(), []).append(value.strip())
+    return filters or None
+
+
+def read_batch_queries(path):
+    """Read one query per line from a file or stdin ("-"), skipping blank lines"""
+    if path == "-":
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+    return [line.strip() for line in lines if line.strip()]
+
+
+def dispatch(endpoint, payload, server_address=None, local=False):
+    """Run a request on the search server when one is configured (and not local), otherwise in-process"""
+    if not local and (server_address or os.environ.get("UI_PRO_MAX_SERVER")):
+        from server import request_or_local
+        return request_or_local(endpoint, payload, server_address)
+    if endpoint == "/search":
+        return search(payload["query"], payload["domain"], payload["max_results"], payload["engine"], payload["filters"],
+                      payload["fuzzy"], payload["backend"])
+    if endpoint == "/stack":
+        return search_stack(payload["query"], payload["stack"], payload["max_results"], payload["engine"], payload["filters"],
+                            payload["fuzzy"], payload["backend"])
+    # Design-system generation is the only path that needs design_system.py
+    from design_system import generate_design_system
+    output = generate_design_system(
+        payload["query"],
+        payload["project_name"],
+        payload["format"],
+        persist=payload["persist"],
+        page=payload["page"],
+        output_dir=payload["output_dir"],
+        cache=payload["cache"],
+        pages=payload["pages"]
+    )
+    return {"output": output}
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="UI Pro Max Search")
-    parser.add_argument("query", help="Search query")
-    parser.add_argument("--domain", "-d", choices=list(CSV_CONFIG.keys()), help="Search domain")
+    parser.add_argument("query", nargs="?", help="Search query")
+    parser.add_argument("--domain", "-d", choices=list(CSV_CONFIG.keys()) + ["all"], help="Search domain ('all' searches every domain and stack)")
     parser.add_argument("--stack", "-s", choices=AVAILABLE_STACKS, help="Stack-specific search (html-tailwind, react, nextjs)")
     parser.add_argument("--max-results", "-n", type=int, default=MAX_RESULTS, help="Max results (default: 3)")
     parser.add_argument("--json", action="store_true", help="Output as JSON")
+    parser.add_argument("--engine", "-e", choices=ENGINES, default=None, help=f"BM25 query processor (default: {DEFAULT_ENGINE}, batch: {DEFAULT_BATCH_ENGINE})")
+    parser.add_argument("--filter", action="append", default=None, metavar="COL=VALUE", help="Only rank rows whose column equals VALUE (repeatable)")
+    parser.add_argument("--stem", choices=list(STEMMERS), default=None, help="Stem tokens for this language (runs in-process)")
+    parser.add_argument("--fuzzy", action="store_true", help="Tolerate typos: expand unknown words to the nearest indexed terms")
+    parser.add_argument("--backend", choices=BACKENDS, default=None, help="Storage backend (default: bm25, or $UI_PRO_MAX_BACKEND)")
+    parser.add_argument("--compile-data", action="store_true", help="Compile every CSV into the SQLite FTS5 database and exit")
+    # Batch search
+    parser.add_argument("--batch", type=str, default=None, metavar="FILE", help="Search one query per line from FILE ('-' for stdin), output JSONL")
     # Design system generation
     parser.add_argument("--design-system", "-ds", action="store_true", help="Generate complete design system recommendation")
     parser.add_argument("--project-name", "-p", type=str, default=None, help="Project name for design system output")
-    parser.add_argument("--format", "-f", choices=["ascii", "markdown"], default="ascii", help="Output format for design system")
+    parser.add_argument("--format", "-f", choices=["ascii", "markdown", "json"], default="ascii", help="Output format for design system")
+    parser.add_argument("--no-cache", action="store_true", help="Regenerate the design system instead of using the output cache")
     # Persistence (Master + Overrides pattern)
     parser.add_argument("--persist", action="store_true", help="Save design system to design-system/MASTER.md (creates hierarchical structure)")
     parser.add_argument("--page", type=str, default=None, help="Create page-specific override file in design-system/pages/")
+    parser.add_argument("--pages", type=str, default=None, help="Comma-separated page names: create all their override files in one pass")
     parser.add_argument("--output-dir", "-o", type=str, default=None, help="Output directory for persisted files (default: current directory)")
+    # Warm server mode
+    parser.add_argument("--serve", action="store_true", help="Run a search server that keeps every index resident")
+    parser.add_argument("--listen", type=str, default="127.0.0.1:8765", help="Server address: host:port (loopback only) or unix:/path")
+    parser.add_argument("--server", type=str, default=None, help="Address of a running search server (default: $UI_PRO_MAX_SERVER)")
+    parser.add_argument("--watch", type=float, default=WATCH_INTERVAL, metavar="SECONDS", help="With --serve, poll the data CSVs and apply edits in place (0 disables)")
+    parser.add_argument("--warm", action="store_true", help="Load (and fit in parallel) every index, printing timings")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes for --warm and --design-system --batch (default: one per CPU)")
+    parser.add_argument("--memory-report", action="store_true", help="Load every index and print its approximate memory use as JSON")
+    # Profiling
+    parser.add_argument("--profile", action="store_true", help="Print per-stage timings to stderr (runs in-process)")
+    parser.add_argument("--profile-output", type=str, default=None, metavar="FILE", help="With --profile, also write cProfile stats to FILE")
 
     args = parser.parse_args()
+    if args.query is None and not (args.batch or args.serve or args.memory_report or args.warm or args.compile_data):
+        parser.error("a query is required unless --batch, --serve, --warm, --compile-data or --memory-report is given")
+    try:
+        filters = parse_filters(args.filter)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.stem:
+        from core import Analyzer, set_analyzer
+        set_analyzer(Analyzer(stemmer=args.stem))
+    # A server has its own analyzer and its timings are not ours: stemming and profiling run here
+    local = args.profile or bool(args.stem)
+
+    profile = ExitStack()
+    profiler = profile.enter_context(profiling(args.profile_output)) if args.profile else None
 
+    # Warm-up alone is the whole command; before a search, batch or server it reports to stderr
+    warm_only = args.warm and args.query is None and not (args.batch or args.serve or args.memory_report or args.compile_data)
+    if args.warm:
+        import json
+        from core import warm_all
+        report = warm_all(args.workers)
+        warm_output = json.dumps(report, indent=2) if args.json else format_warm(report)
+        if not warm_only:
+            print(warm_output, file=sys.stderr)
+
+    if warm_only:
+        print(warm_output)
+    elif args.compile_data:
+        import json
+        from fts import compile_data
+        report = compile_data()
+        if args.json:
+            print(json.dumps(report, indent=2))
+        else:
+            rows = sum(source["rows"] for source in report["sources"].values())
+            print(f"Compiled {len(report['sources'])} data files ({rows} rows) into {report['path']} "
+                  f"({report['bytes'] / 1024:.0f} KB) in {report['total_ms']:.1f} ms")
+    elif args.memory_report:
+        import json
+        from core import preload_indexes, memory_report
+        preload_indexes()
+        print(json.dumps(memory_report(), indent=2))
+    # Server mode: blocks until interrupted
+    elif args.serve:
+        from server import serve
+        serve(args.listen, watch_interval=args.watch)
+    # Batch design systems: one JSON object per job, in completion order
+    elif args.batch and args.design_system:
+        import json
+        import time
+        from design_system import read_jobs, generate_batch, batch_summary
+        try:
+            jobs = read_jobs(args.batch)
+        except ValueError as e:
+            parser.error(str(e))
+        output_dir = os.path.abspath(args.output_dir or os.getcwd()) if args.persist else args.output_dir
+        started = time.perf_counter()
+        records = []
+        for record in generate_batch(jobs, args.workers, args.format, args.persist, output_dir):
+            print(json.dumps(record, ensure_ascii=False), flush=True)
+            records.append({"ms": record["ms"], "pid": record["pid"], **({"error": 1} if "error" in record else {})})
+        summary = batch_summary(records, (time.perf_counter() - started) * 1000)
+        if args.json:
+            print(json.dumps(summary), file=sys.stderr)
+        else:
+            latency = summary["latency_ms"]
+            print(f"{summary['jobs']} design systems in {summary['total_ms'] / 1000:.2f} s "
+                  f"({summary['jobs_per_s']} jobs/s, {summary['workers']} workers, {summary['errors']} errors); "
+                  f"per job p50 {latency['p50']:.1f} ms, p95 {latency['p95']:.1f} ms, max {latency['max']:.1f} ms",
+                  file=sys.stderr)
+    # Batch search: one JSON object per query, in input order
+    elif args.batch:
+        import json
+        queries = read_batch_queries(args.batch)
+        engine = args.engine or DEFAULT_BATCH_ENGINE
+        if args.stack:
+            results = search_stack_many(queries, args.stack, args.max_results, engine, filters, args.fuzzy, args.backend)
+        else:
+            results = search_many(queries, args.domain, args.max_results, engine, filters, args.fuzzy, args.backend)
+        with profile_stage("format"):
+            for result in results:
+                print(json.dumps(result, ensure_ascii=False))
     # Design system takes priority
-    if args.design_system:
-        result = generate_design_system(
-            args.query, 
-            args.project_name, 
-            args.format,
-            persist=args.persist,
-            page=args.page,
-            output_dir=args.output_dir
-        )
-        print(result)
+    elif args.design_system:
+        pages = [name.strip() for name in (args.pages or "").split(",") if name.strip()]
+        result = dispatch("/design-system", {
+            "query": args.query,
+            "project_name": args.project_name,
+            "format": args.format,
+            "persist": args.persist,
+            "page": args.page,
+            "pages": pages,
+            # Resolve here so a server writes into the caller's directory, not its own
+            "output_dir": os.path.abspath(args.output_dir or os.getcwd()) if args.persist else args.output_dir,
+            "cache": not args.no_cache
+        }, args.server, local=local)
+        print(result["output"])
         
         # Print persistence confirmation
         if args.persist:
-            project_slug = args.project_name.lower().replace(' ', '-') if args.project_name else "default"
+            from design_system import slugify
+            project_slug = slugify(args.project_name or "default")
             print("\n" + "=" * 60)
             print(f"✅ Design system persisted to design-system/{project_slug}/")
             print(f"   📄 design-system/{project_slug}/MASTER.md (Global Source of Truth)")
-            if args.page:
-                page_filename = args.page.lower().replace(' ', '-')
+            for page_name in dict.fromkeys(([args.page] if args.page else []) + pages):
+                page_filename = slugify(page_name, "page")
                 print(f"   📄 design-system/{project_slug}/pages/{page_filename}.md (Page Overrides)")
             print("")
             print(f"📖 Usage: When building a page, check design-system/{project_slug}/pages/[page].md first.")
@@ -98,17 +358,43 @@ if __name__ == "__main__":
             print("=" * 60)
     # Stack search
     elif args.stack:
-        result = search_stack(args.query, args.stack, args.max_results)
-        if args.json:
-            import json
-            print(json.dumps(result, indent=2, ensure_ascii=False))
-        else:
-            print(format_output(result))
+        result = dispatch("/stack", {
+            "query": args.query,
+            "stack": args.stack,
+            "max_results": args.max_results,
+            "engine": args.engine or DEFAULT_ENGINE,
+            "filters": filters,
+            "fuzzy": args.fuzzy,
+            "backend": args.backend
+        }, args.server, local=local)
+        with profile_stage("format"):
+            if args.json:
+                import json
+                print(json.dumps(result, indent=2, ensure_ascii=False))
+            else:
+                print(format_output(result))
     # Domain search
     else:
-        result = search(args.query, args.domain, args.max_results)
+        result = dispatch("/search", {
+            "query": args.query,
+            "domain": args.domain,
+            "max_results": args.max_results,
+            "engine": args.engine or DEFAULT_ENGINE,
+            "filters": filters,
+            "fuzzy": args.fuzzy,
+            "backend": args.backend
+        }, args.server, local=local)
+        with profile_stage("format"):
+            if args.json:
+                import json
+                print(json.dumps(result, indent=2, ensure_ascii=False))
+            else:
+                print(format_output(result))
+
+    profile.close()
+    if profiler is not None:
         if args.json:
             import json
-            print(json.dumps(result, indent=2, ensure_ascii=False))
+            print(json.dumps(profiler.report(), indent=2), file=sys.stderr)
         else:
-            print(format_output(result))
+            print(format_profile(profiler.report()), file=sys.stderr)
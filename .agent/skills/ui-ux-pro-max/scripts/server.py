@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+UI/UX Pro Max Search Server - keeps every BM25 index resident between queries
+
+Usage:
+    python search.py --serve [--listen 127.0.0.1:8765 | --listen unix:/tmp/ui-pro-max.sock] [--watch 1.0]
+    python search.py "<query>" --server 127.0.0.1:8765    # falls back to in-process search
+
+The server speaks JSON over HTTP, either on a loopback TCP port or on a Unix socket:
+    GET  /health           -> {"status": "ok", "indexes": [...], "result_cache": {hits, misses, ...}}
+    POST /search           {"query", "domain", "max_results", "engine", "filters", "fuzzy", "backend"}
+    POST /stack            {"query", "stack", "max_results", "engine", "filters", "fuzzy", "backend"}
+    POST /design-system    {"query", "project_name", "format", "persist", "page", "pages", "output_dir", "cache"}
+
+Requests must carry Content-Type: application/json, and over TCP a loopback Host
+header, so a web page open in a browser cannot call the API. Persisted design systems
+are written only inside output_dir/design-system/.
+
+A design system is read from and written to the on-disk output cache only when
+"cache" is true (search.py sends it unless --no-cache).
+
+While serving, an IndexWatcher polls the data CSVs every --watch seconds and applies
+edited, added or deleted rows to the resident indexes in place (0 disables it).
+"""
+
+import http.client
+import ipaddress
+import json
+import os
+import signal
+import socket
+import socketserver
+import stat
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from core import (
+    MAX_RESULTS, DEFAULT_ENGINE, WATCH_INTERVAL, IndexWatcher, result_cache_info, search, search_stack, warm_all
+)
+
+
+# ============ CONFIGURATION ============
+DEFAULT_ADDRESS = "127.0.0.1:8765"
+SERVER_ENV = "UI_PRO_MAX_SERVER"
+CLIENT_TIMEOUT = 2.0
+REQUIRED_FIELDS = {"/search": ["query"], "/stack": ["query", "stack"], "/design-system": ["query"]}
+ENDPOINTS = list(REQUIRED_FIELDS)
+
+
+def parse_address(address):
+    """Parse "host:port", "unix:/path" or "/path" into ("tcp", (host, port)) or ("unix", path)"""
+    if address.startswith("unix:"):
+        return "unix", address[len("unix:"):]
+    if address.startswith("/"):
+        return "unix", address
+    host, _, port = address.rpartition(":")
+    if not host or not port.isdigit():
+        raise ValueError(f"Invalid server address: {address} (expected host:port or unix:/path)")
+    return "tcp", (host.strip("[]"), int(port))
+
+
+def _host_name(header):
+    """Host part of a Host header: "127.0.0.1:8765" -> "127.0.0.1", "[::1]:8765" -> "::1" """
+    if header.startswith("["):
+        return header[1:].partition("]")[0]
+    return header.rpartition(":")[0] if ":" in header else header
+
+
+def _is_loopback(host):
+    """Only loopback hosts may serve: the API can write design-system files"""
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+# ============ REQUEST HANDLING ============
+def handle_request(endpoint, payload):
+    """Dispatch one API call to the in-process search functions; raises ValueError for a malformed request"""
+    if endpoint not in REQUIRED_FIELDS:
+        raise ValueError(f"Unknown endpoint: {endpoint}")
+    if not isinstance(payload, dict):
+        raise ValueError("Request body must be a JSON object")
+    missing = [field for field in REQUIRED_FIELDS[endpoint] if field not in payload]
+    if missing:
+        raise ValueError(f"Missing field: {', '.join(missing)}")
+
+    if endpoint == "/search":
+        return search(
+            payload["query"],
+            payload.get("domain"),
+            payload.get("max_results", MAX_RESULTS),
+            payload.get("engine", DEFAULT_ENGINE),
+            payload.get("filters"),
+            payload.get("fuzzy", False),
+            payload.get("backend")
+        )
+    if endpoint == "/stack":
+        return search_stack(
+            payload["query"],
+            payload["stack"],
+            payload.get("max_results", MAX_RESULTS),
+            payload.get("engine", DEFAULT_ENGINE),
+            payload.get("filters"),
+            payload.get("fuzzy", False),
+            payload.get("backend")
+        )
+    if endpoint == "/design-system":
+        from design_system import generate_design_system
+        output = generate_design_system(
+            payload["query"],
+            payload.get("project_name"),
+            payload.get("format", "ascii"),
+            persist=payload.get("persist", False),
+            page=payload.get("page"),
+            output_dir=payload.get("output_dir"),
+            cache=payload.get("cache", False),
+            pages=payload.get("pages")
+        )
+        return {"output": output}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """JSON request handler shared by the TCP and Unix socket servers"""
+
+    server_version = "UIProMaxSearch/1.0"
+
+    def _send_json(self, status, body):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _refusal(self, body=False):
+        """(status, error) for a request a web page could have sent, else None.
+
+        A browser page can POST plain text to localhost or, through DNS rebinding, reach
+        the port under its own host name; only a JSON request naming a loopback host
+        (any host over a Unix socket, which browsers cannot reach) is served.
+        """
+        if self.server.check_host and not _is_loopback(_host_name(self.headers.get("Host", ""))):
+            return 403, f"Host not allowed: {self.headers.get('Host', '')}"
+        if self.headers.get("Origin"):
+            return 403, "Cross-origin requests are not allowed"
+        if body and self.headers.get_content_type() != "application/json":
+            return 415, "Content-Type must be application/json"
+        return None
+
+    def do_GET(self):
+        refusal = self._refusal()
+        if refusal:
+            self._send_json(refusal[0], {"error": refusal[1]})
+        elif self.path == "/health":
+            watcher = self.server.watcher
+            self._send_json(200, {
+                "status": "ok",
+                "indexes": self.server.indexes,
+                "result_cache": result_cache_info(),
+                "watcher": {"interval": watcher.interval, "updates": watcher.updates} if watcher else None
+            })
+        else:
+            self._send_json(404, {"error": f"Unknown endpoint: {self.path}"})
+
+    def do_POST(self):
+        if self.path not in ENDPOINTS:
+            self._send_json(404, {"error": f"Unknown endpoint: {self.path}"})
+            return
+        refusal = self._refusal(body=True)
+        if refusal:
+            self._send_json(refusal[0], {"error": refusal[1]})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            response = handle_request(self.path, payload)
+        except (ValueError, TypeError) as e:
+            self._send_json(400, {"error": str(e)})
+        except Exception as e:
+            # A bug in one request must not drop the connection without an answer
+            self._send_json(500, {"error": f"{type(e).__name__}: {e}"})
+        else:
+            self._send_json(200, response)
+
+    def address_string(self):
+        # Unix socket peers have no (host, port) pair
+        return self.client_address[0] if isinstance(self.client_address, tuple) and self.client_address else "unix"
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """HTTP server bound to a Unix domain socket"""
+
+    daemon_threads = True
+
+
+# ============ SERVER ============
+def _report_updates(changes):
+    for name, stats in changes.items():
+        if stats["rebuilt"]:
+            print(f"Rebuilt {name} ({stats['rows']} rows, {stats['ms']:.1f} ms)", file=sys.stderr)
+        else:
+            print(f"Updated {name}: +{stats['added']} ~{stats['updated']} -{stats['deleted']} rows "
+                  f"({stats['ms']:.1f} ms)", file=sys.stderr)
+
+
+def _remove_socket(path):
+    """Delete a Unix socket left at path by an earlier server; refuses to delete anything else"""
+    try:
+        mode = os.lstat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise ValueError(f"Refusing to replace {path}: it is not a Unix socket")
+    os.unlink(path)
+
+
+def create_server(address=DEFAULT_ADDRESS, quiet=True, watch_interval=WATCH_INTERVAL):
+    """Warm every index (see warm_all) and bind (without starting) the search server and its file watcher"""
+    kind, target = parse_address(address)
+    if kind == "unix":
+        _remove_socket(target)
+        httpd = _UnixHTTPServer(target, _Handler)
+    else:
+        if not _is_loopback(target[0]):
+            raise ValueError(f"Refusing to serve on non-loopback host: {target[0]}")
+        httpd = ThreadingHTTPServer(target, _Handler)
+    httpd.quiet = quiet
+    httpd.check_host = kind == "tcp"
+    httpd.indexes = list(warm_all()["indexes"])
+    httpd.watcher = IndexWatcher(watch_interval, _report_updates) if watch_interval > 0 else None
+    return httpd
+
+
+def _stop(signum, frame):
+    raise KeyboardInterrupt
+
+
+def serve(address=DEFAULT_ADDRESS, quiet=True, watch_interval=WATCH_INTERVAL):
+    """Run the search server until interrupted (Ctrl+C or SIGTERM)"""
+    httpd = create_server(address, quiet, watch_interval)
+    signal.signal(signal.SIGTERM, _stop)
+    print(f"UI Pro Max search server listening on {address} ({len(httpd.indexes)} indexes resident)", file=sys.stderr)
+    if httpd.watcher:
+        httpd.watcher.start()
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if httpd.watcher:
+            httpd.watcher.stop()
+        httpd.server_close()
+        kind, target = parse_address(address)
+        if kind == "unix":
+            try:
+                _remove_socket(target)
+            except ValueError:
+                pass  # replaced by something else since: leave it
+
+
+# ============ CLIENT ============
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    """http.client connection over a Unix domain socket"""
+
+    def __init__(self, path, timeout=CLIENT_TIMEOUT):
+        super().__init__("localhost", timeout=timeout)
+        self.unix_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.unix_path)
+
+
+def request(endpoint, payload, address, timeout=CLIENT_TIMEOUT):
+    """Send one API call to a running server; raises ConnectionError if it is unreachable"""
+    kind, target = parse_address(address)
+    if kind == "unix":
+        conn = _UnixHTTPConnection(target, timeout)
+    else:
+        conn = http.client.HTTPConnection(*target, timeout=timeout)
+    try:
+        body = json.dumps(payload).encode("utf-8")
+        conn.request("POST", endpoint, body, {"Content-Type": "application/json"})
+        response = conn.getresponse()
+        result = json.loads(response.read())
+    except (OSError, http.client.HTTPException, ValueError) as e:
+        raise ConnectionError(f"Search server at {address} unavailable: {e}") from e
+    finally:
+        conn.close()
+    if response.status != 200:
+        raise ConnectionError(f"Search server at {address} returned {response.status}: {result.get('error', '')}")
+    return result
+
+
+def request_or_local(endpoint, payload, address=None):
+    """Use the server at address (or $UI_PRO_MAX_SERVER) when reachable, else run in-process"""
+    address = address or os.environ.get(SERVER_ENV)
+    if address:
+        try:
+            return request(endpoint, payload, address)
+        except (ConnectionError, ValueError):
+            pass
+    return handle_request(endpoint, payload)
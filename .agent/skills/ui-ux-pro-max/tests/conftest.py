@@ -0,0 +1,33 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent / "scripts"
+sys.path.insert(0, str(SCRIPTS_DIR))
+
+import core  # noqa: E402
+
+
+@pytest.fixture(autouse=True, scope="session")
+def scratch_cache(tmp_path_factory):
+    """Compiled indexes and cached outputs go to a scratch directory, not the skill's .cache"""
+    original = core.CACHE_DIR
+    core.CACHE_DIR = tmp_path_factory.mktemp("cache")
+    yield core.CACHE_DIR
+    core.CACHE_DIR = original
+
+
+def labelled_queries():
+    """Queries of the benchmark's relevance cases, plus a few that span several domains"""
+    with open(SCRIPTS_DIR / "relevance.jsonl", encoding="utf-8") as f:
+        queries = [json.loads(line)["query"] for line in f if line.strip()]
+    return queries + [
+        "hero cta conversion",
+        "saas dashboard",
+        "fintech dashboard dark mode glassmorphism",
+        "react server component waterfall",
+        "accessible form input focus outline",
+        "beauty spa booking mobile app",
+    ]
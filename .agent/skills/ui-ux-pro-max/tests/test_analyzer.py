@@ -0,0 +1,19 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import core
+
+SCRIPTS = Path(core.__file__).parent
+
+
+def test_unknown_stemmer_setting_is_ignored_with_a_warning():
+    env = dict(os.environ, UI_PRO_MAX_STEMMER="klingon")
+    run = subprocess.run([sys.executable, "search.py", "--help"], cwd=SCRIPTS, env=env, capture_output=True, text=True)
+    assert run.returncode == 0
+    assert "Ignoring UI_PRO_MAX_STEMMER=klingon" in run.stderr
+
+    run = subprocess.run([sys.executable, "-c", "import core; print(core.ANALYZER.stemmer)"], cwd=SCRIPTS, env=env,
+                         capture_output=True, text=True)
+    assert run.stdout.strip() == "None"
@@ -0,0 +1,37 @@
+import design_system
+from design_system import DesignSystemGenerator, batch_summary, generate_batch
+
+JOBS = [
+    {"query": "saas analytics dashboard", "project_name": "Metrics"},
+    {"project_name": "No query"},
+    {"query": "explode"},
+    {"query": "beauty spa booking", "project_name": "Spa"},
+]
+
+
+def test_batch_continues_after_failing_jobs(monkeypatch):
+    generate = DesignSystemGenerator.generate
+
+    def failing(self, query, project_name=None):
+        if query == "explode":
+            raise RuntimeError("boom")
+        return generate(self, query, project_name)
+
+    monkeypatch.setattr(DesignSystemGenerator, "generate", failing)
+    records = sorted(generate_batch(JOBS, workers=1), key=lambda record: record["index"])
+
+    assert [record["index"] for record in records] == [0, 1, 2, 3]
+    assert "error" not in records[0] and "error" not in records[3]
+    assert records[1]["error"].startswith("KeyError")
+    assert records[2]["error"] == "RuntimeError: boom"
+    assert records[3]["design_system"]["project_name"] == "Spa"
+    assert batch_summary(records, 1.0)["errors"] == 2
+
+
+def test_worker_pool_reports_failures_per_job():
+    records = sorted(generate_batch(JOBS[:2] + JOBS[3:], workers=2), key=lambda record: record["index"])
+
+    assert [record["index"] for record in records] == [0, 1, 2]
+    assert records[1]["error"].startswith("KeyError")
+    assert all("error" not in record for record in (records[0], records[2]))
+    assert records[0]["output"] == design_system.render(records[0]["design_system"], "ascii")
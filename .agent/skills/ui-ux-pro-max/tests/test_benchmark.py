@@ -0,0 +1,11 @@
+import benchmark
+
+LABELS = [{"query": "glassmorphism", "relevant": {"Glassmorphism": 3}}]
+
+
+def test_failing_relevance_variant_is_reported():
+    variants = {"inverted": {"engine": "inverted"}, "broken": {"engine": "no-such-engine"}}
+    metrics, errors = benchmark._measure_relevance("style", LABELS, variants, rounds=1)
+    assert metrics["quality.inverted.ndcg"] == 1.0
+    assert not any(".broken." in metric for metric in metrics)
+    assert errors["broken"].startswith("ValueError: Unknown engine")
@@ -0,0 +1,40 @@
+import csv
+
+import pytest
+
+import core
+import fts
+
+SEARCH_COLS = ["Name", "Keywords"]
+OUTPUT_COLS = ["Name", "Category"]
+FILTER_COLS = ["Category"]
+CATEGORIES = ["ÉCRAN", "Écran", " écran ", "ÖKOLOGIE", "Ökologie", "Plain", "plain", "ĐIỆN", "điện", ""]
+
+
+@pytest.fixture()
+def compiled(tmp_path):
+    source = tmp_path / "accents.csv"
+    with open(source, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Name", "Keywords", "Category"])
+        for i, category in enumerate(CATEGORIES * 3):
+            writer.writerow([f"Row {i}", "widget layout", category])
+    path = tmp_path / "data.db"
+    fts.compile_data(path, [("accents", source, SEARCH_COLS, OUTPUT_COLS, FILTER_COLS)])
+    return source, path
+
+
+@pytest.mark.parametrize("filters", [
+    {"Category": "écran"},
+    {"Category": "ÉCRAN"},
+    {"Category": "ökologie"},
+    {"Category": "ĐIỆN"},
+    {"Category": ["Plain", " Écran"]},
+    {"Category": ""},
+])
+def test_compiled_filters_match_filter_mask(compiled, filters):
+    source, path = compiled
+    expected = core._search_csv(source, SEARCH_COLS, OUTPUT_COLS, "widget", 100, filter_cols=FILTER_COLS, filters=filters)
+    actual = fts.search_compiled("accents", "widget", 100, filters=filters, path=path)
+    assert expected
+    assert sorted(row["Name"] for row in actual) == sorted(row["Name"] for row in expected)
@@ -0,0 +1,75 @@
+import random
+
+import pytest
+
+import core
+
+
+def _distance(a, b):
+    """Unbounded optimal string alignment distance: insert, delete, substitute, swap adjacent"""
+    d = [[i + j if i * j == 0 else 0 for j in range(len(b) + 1)] for i in range(len(a) + 1)]
+    for i in range(1, len(a) + 1):
+        for j in range(1, len(b) + 1):
+            d[i][j] = min(d[i - 1][j] + 1, d[i][j - 1] + 1, d[i - 1][j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                d[i][j] = min(d[i][j], d[i - 2][j - 2] + 1)
+    return d[-1][-1]
+
+
+def _brute_force_expand(bm25, token):
+    """Scan the whole vocabulary: nearest terms within the edit bound, most frequent first"""
+    bound = next((edits for length, edits in core.FUZZY_EDITS if len(token) >= length), 0)
+    if not bound:
+        return ()
+    # A length difference alone costs that many edits
+    distances = {word: _distance(token, word) for word, term in bm25.vocab.items()
+                 if bm25.doc_freqs[term] and abs(len(word) - len(token)) <= bound}
+    best = min(distances.values(), default=bound + 1)
+    if best > bound:
+        return ()
+    nearest = sorted((word for word, distance in distances.items() if distance == best),
+                     key=lambda word: (-bm25.doc_freqs[bm25.vocab[word]], word))
+    return tuple(bm25.vocab[word] for word in nearest[:core.FUZZY_MAX_EXPANSIONS])
+
+
+def _typo(rng, word):
+    i = rng.randrange(len(word))
+    char = rng.choice("abcdefghijklmnopqrstuvwxyz")
+    edits = [word[:i] + word[i + 1:], word[:i] + char + word[i + 1:], word[:i] + char + word[i:]]
+    if i + 1 < len(word):
+        edits.append(word[:i] + word[i + 1] + word[i] + word[i + 2:])
+    return rng.choice(edits)
+
+
+@pytest.mark.parametrize("domain", ["style", "ux", "product", "color"])
+def test_expand_equals_brute_force(domain):
+    config = core.CSV_CONFIG[domain]
+    bm25 = core.load_index(core.DATA_DIR / config["file"], config["search_cols"], config["output_cols"],
+                           config.get("filter_cols", []))["bm25"]
+    rng = random.Random(domain)
+    words = sorted(bm25.vocab)
+    for _ in range(80):
+        token = rng.choice(words)
+        for _ in range(rng.randint(1, 2)):
+            token = _typo(rng, token)
+        if token in bm25.vocab:
+            continue
+        assert bm25.expand(token) == _brute_force_expand(bm25, token), token
+
+
+def test_short_tokens_check_only_indexed_candidates(monkeypatch):
+    rng = random.Random(7)
+    syllables = [a + b for a in "bcdfghklmnprstvwz" for b in "aeiou"]
+    words = sorted({"".join(rng.choice(syllables) for _ in range(rng.randint(2, 5))) for _ in range(20000)})
+    bm25 = core.BM25()
+    bm25.fit([" ".join(words[i:i + 50]) for i in range(0, len(words), 50)])
+    calls = []
+    edit_distance = core._edit_distance
+    monkeypatch.setattr(core, "_edit_distance", lambda *args: calls.append(args) or edit_distance(*args))
+    for word in [w for w in words if len(w) in (4, 8)][:40]:
+        token = word[1] + word[0] + word[2:]
+        if token in bm25.vocab:
+            continue
+        calls.clear()
+        bm25.expand(token)
+        assert len(calls) < len(words) / 20, token
@@ -0,0 +1,33 @@
+import pickle
+import shutil
+
+import pytest
+
+import core
+
+CORRUPT = [
+    b"",
+    b"not a pickle",
+    b"\x80\x09unsupported protocol",
+    pickle.dumps({"version": core.INDEX_CACHE_VERSION}),
+    pickle.dumps(["an", "index", "list"]),
+]
+
+
+@pytest.mark.parametrize("content", CORRUPT)
+def test_unreadable_artifacts_are_rebuilt(tmp_path, content):
+    config = core.CSV_CONFIG["color"]
+    path = tmp_path / config["file"]
+    shutil.copy(core.DATA_DIR / config["file"], path)
+    columns = (config["search_cols"], config["output_cols"], config.get("filter_cols", []))
+    expected = core.search("fintech banking", "color")["results"]
+
+    core._cache_path(path).parent.mkdir(parents=True, exist_ok=True)
+    core._cache_path(path).write_bytes(content)
+    entry = core.load_index(path, *columns)
+    try:
+        assert [core.row_dict(entry, idx) for idx, _ in entry["bm25"].top_k("fintech banking", 3)] == expected
+        cached, state = core._read_cached_index(path, *columns)
+        assert cached is not None and state == "fresh"
+    finally:
+        core._RESIDENT_INDEXES.pop((str(path), *(tuple(cols) for cols in columns)), None)
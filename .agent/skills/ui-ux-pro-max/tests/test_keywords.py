@@ -0,0 +1,46 @@
+import random
+
+import pytest
+
+import core
+from core import DOMAIN_KEYWORDS, KeywordMatcher
+from design_system import PAGE_TYPE_KEYWORDS, _PAGE_TYPE_MATCHER
+
+
+def _counts(groups, text):
+    """The substring loop the matcher replaced"""
+    return {label: sum(1 for keyword in keywords if keyword in text) for label, keywords in groups.items()}
+
+
+def _first(groups, text):
+    return next((label for label, keywords in groups.items() if any(keyword in text for keyword in keywords)), None)
+
+
+def _texts(groups, seed, count=2000):
+    """Random texts of keyword fragments, whole keywords and noise, so partial and overlapping matches occur"""
+    rng = random.Random(seed)
+    keywords = [keyword for values in groups.values() for keyword in values]
+    pieces = keywords + [keyword[:rng.randint(1, len(keyword))] for keyword in keywords] + [" ", "-", "#", "x", "e"]
+    return [("" if rng.random() < 0.5 else " ").join(rng.choice(pieces) for _ in range(rng.randint(0, 8)))
+            for _ in range(count)]
+
+
+@pytest.mark.parametrize("groups", [
+    DOMAIN_KEYWORDS,
+    PAGE_TYPE_KEYWORDS,
+    {"a": ["he", "she", "hers"], "b": ["his", "e", "he"], "c": ["ushers"]},
+])
+def test_matcher_equals_substring_loop(groups):
+    matcher = KeywordMatcher(groups)
+    for text in _texts(groups, seed=len(groups)):
+        assert matcher.counts(text) == _counts(groups, text), text
+        assert matcher.first(text) == _first(groups, text), text
+
+
+def test_classifiers_equal_substring_loop():
+    for text in _texts(DOMAIN_KEYWORDS, seed=1):
+        scores = _counts(DOMAIN_KEYWORDS, text)
+        best = max(scores, key=scores.get)
+        assert core.detect_domain(text) == (best if scores[best] > 0 else "style"), text
+    for text in _texts(PAGE_TYPE_KEYWORDS, seed=2):
+        assert _PAGE_TYPE_MATCHER.first(text) == _first(PAGE_TYPE_KEYWORDS, text), text
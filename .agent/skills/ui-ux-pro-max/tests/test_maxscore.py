@@ -0,0 +1,44 @@
+import random
+
+import pytest
+
+import core
+from core import BM25
+
+VOCABULARY = 2000
+
+
+def _zipf_corpus(rng, size):
+    weights = [1 / (i + 1) for i in range(VOCABULARY)]
+    draw = lambda count: " ".join(f"t{i:04d}" for i in rng.choices(range(VOCABULARY), weights, k=count))
+    return [draw(rng.randint(1, 30)) for _ in range(size)], lambda: draw(rng.randint(1, 6))
+
+
+def _random_mask(rng, size):
+    return bytes(rng.getrandbits(8) for _ in range((size + 7) // 8))
+
+
+@pytest.mark.parametrize("size", [50, 500, 5000])
+def test_maxscore_equals_exhaustive_top_k(size):
+    rng = random.Random(size)
+    documents, query = _zipf_corpus(rng, size)
+    bm25 = BM25()
+    bm25.fit(documents)
+    for _ in range(40):
+        q = query()
+        mask = _random_mask(rng, bm25.size) if rng.random() < 0.3 else None
+        for k in (1, 3, 10):
+            assert bm25.top_k(q, k, "maxscore", mask) == bm25.top_k(q, k, "exhaustive", mask), (q, k)
+
+
+@pytest.mark.parametrize("domain", ["style", "ux", "product", "typography"])
+def test_maxscore_equals_exhaustive_on_bundled_data(domain):
+    config = core.CSV_CONFIG[domain]
+    bm25 = core.load_index(core.DATA_DIR / config["file"], config["search_cols"], config["output_cols"],
+                           config.get("filter_cols", []))["bm25"]
+    rng = random.Random(domain)
+    words = sorted(bm25.vocab)
+    for _ in range(100):
+        q = " ".join(rng.choice(words) for _ in range(rng.randint(1, 5)))
+        for k in (1, 3, 10):
+            assert bm25.top_k(q, k, "maxscore") == bm25.top_k(q, k, "exhaustive"), (q, k)
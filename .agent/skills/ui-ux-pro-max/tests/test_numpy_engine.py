@@ -0,0 +1,33 @@
+import random
+
+import pytest
+
+import core
+
+pytestmark = pytest.mark.skipif(not core.VECTOR_ENGINE_AVAILABLE, reason="numpy/scipy not installed")
+
+
+def _ids_and_scores(ranked):
+    return [idx for idx, _ in ranked], [round(score, 9) for _, score in ranked]
+
+
+@pytest.mark.parametrize("domain", ["style", "ux", "product"])
+def test_filtered_batches_equal_exhaustive(domain):
+    config = core.CSV_CONFIG[domain]
+    entry = core.load_index(core.DATA_DIR / config["file"], config["search_cols"], config["output_cols"],
+                            config.get("filter_cols", []))
+    bm25 = entry["bm25"]
+    rng = random.Random(domain)
+    words = sorted(bm25.vocab)
+    queries = [" ".join(rng.choice(words) for _ in range(rng.randint(1, 4))) for _ in range(60)] + ["", "zzzz"]
+    for selectivity in (0.05, 0.5, None):
+        mask = None
+        if selectivity is not None:
+            bits = bytearray((bm25.size + 7) // 8)
+            for idx in range(bm25.size):
+                if rng.random() < selectivity:
+                    bits[idx >> 3] |= 1 << (idx & 7)
+            mask = bytes(bits)
+        batch = bm25.top_k_many(queries, 5, "numpy", mask)
+        for query, ranked in zip(queries, batch):
+            assert _ids_and_scores(ranked) == _ids_and_scores(bm25.top_k(query, 5, "exhaustive", mask)), query
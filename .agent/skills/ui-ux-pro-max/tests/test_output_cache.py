@@ -0,0 +1,46 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import core
+import design_system
+from design_system import clear_output_cache, generate_design_system, output_cache_key
+
+
+def _cached_entries():
+    return list(design_system._output_cache_dir().glob("*.json"))
+
+
+def test_cache_is_off_by_default():
+    clear_output_cache()
+    generate_design_system("saas analytics dashboard", "Metrics")
+    assert _cached_entries() == []
+
+    first = generate_design_system("saas analytics dashboard", "Metrics", cache=True)
+    assert len(_cached_entries()) == 1
+    assert generate_design_system("saas analytics dashboard", "Metrics", cache=True) == first
+    clear_output_cache()
+
+
+def test_key_depends_on_analyzer_settings():
+    plain = output_cache_key("booking apps", "P")
+    original = core.ANALYZER
+    try:
+        core.set_analyzer(core.Analyzer(stemmer="en"))
+        assert output_cache_key("booking apps", "P") != plain
+    finally:
+        core.set_analyzer(original)
+    assert output_cache_key("booking apps", "P") == plain
+
+
+def test_threads_writing_one_file_never_share_a_temporary_file(tmp_path):
+    path = tmp_path / "MASTER.md"
+    contents = [f"# Version {i}\n" + str(i) * 200_000 for i in range(8)]
+
+    def write(i):
+        for _ in range(10):
+            path.unlink(missing_ok=True)
+            design_system._write_if_changed(path, contents[i])
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(write, range(8)))
+    assert path.read_text(encoding="utf-8") in contents
+    assert [p.name for p in tmp_path.iterdir()] == ["MASTER.md"]
@@ -0,0 +1,30 @@
+import pytest
+
+import core
+from conftest import labelled_queries
+
+
+def _slices(query, fuzzy=False):
+    return {hit["domain"]: hit["results"] for hit in core.search_all(query, fuzzy=fuzzy)["domains"]}
+
+
+def _single(name, query, fuzzy=False):
+    if name.startswith("stack:"):
+        return core.search_stack(query, name[len("stack:"):], fuzzy=fuzzy)["results"]
+    return core.search(query, name, fuzzy=fuzzy)["results"]
+
+
+@pytest.mark.parametrize("query", labelled_queries())
+def test_each_slice_equals_single_domain_search(query):
+    slices = _slices(query)
+    for name, filepath, *_ in core.index_specs():
+        if filepath.exists():
+            assert slices.get(name, []) == _single(name, query), name
+
+
+@pytest.mark.parametrize("query", ["glasmorphism dashbord", "accesibility keybord navigaton"])
+def test_fuzzy_slices_equal_single_domain_search(query):
+    slices = _slices(query, fuzzy=True)
+    for name, filepath, *_ in core.index_specs():
+        if filepath.exists():
+            assert slices.get(name, []) == _single(name, query, fuzzy=True), name
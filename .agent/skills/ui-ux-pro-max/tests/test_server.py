@@ -0,0 +1,100 @@
+import http.client
+import json
+import threading
+
+import pytest
+
+import server
+
+
+@pytest.fixture
+def running_server(tmp_path):
+    address = f"unix:{tmp_path / 'search.sock'}"
+    httpd = server.create_server(address, watch_interval=0)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield address
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_refuses_to_replace_a_regular_file(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_text("keep me")
+    with pytest.raises(ValueError, match="not a Unix socket"):
+        server.create_server(f"unix:{path}", watch_interval=0)
+    assert path.read_text() == "keep me"
+
+
+def test_missing_fields_are_bad_requests(running_server):
+    with pytest.raises(ConnectionError, match="returned 400: Missing field: stack"):
+        server.request("/stack", {"query": "list"}, running_server)
+
+
+def test_errors_inside_search_are_server_errors(running_server, monkeypatch):
+    def broken(*args):
+        raise KeyError("Style Category")
+
+    monkeypatch.setattr(server, "search", broken)
+    with pytest.raises(ConnectionError, match="returned 500: KeyError"):
+        server.request("/search", {"query": "glassmorphism"}, running_server)
+
+
+def test_search_round_trip(running_server):
+    response = server.request("/search", {"query": "glassmorphism", "domain": "style"}, running_server)
+    assert response["results"] == server.search("glassmorphism", "style")["results"]
+
+
+@pytest.fixture
+def tcp_server():
+    httpd = server.create_server("127.0.0.1:0", watch_interval=0)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd.server_address
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _post(address, headers, body=b'{"query": "glassmorphism"}'):
+    conn = http.client.HTTPConnection(*address, timeout=5)
+    try:
+        conn.putrequest("POST", "/search", skip_host=True)
+        for name, value in headers.items():
+            conn.putheader(name, value)
+        conn.putheader("Content-Length", str(len(body)))
+        conn.endheaders(body)
+        response = conn.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        conn.close()
+
+
+def test_requests_a_browser_could_send_are_refused(tcp_server):
+    loopback = f"127.0.0.1:{tcp_server[1]}"
+    assert _post(tcp_server, {"Host": loopback, "Content-Type": "text/plain"})[0] == 415
+    assert _post(tcp_server, {"Host": f"evil.example:{tcp_server[1]}", "Content-Type": "application/json"})[0] == 403
+    assert _post(tcp_server, {"Host": loopback, "Content-Type": "application/json",
+                              "Origin": "https://evil.example"})[0] == 403
+    status, body = _post(tcp_server, {"Host": loopback, "Content-Type": "application/json; charset=utf-8"})
+    assert status == 200 and body["results"]
+
+
+def test_persisted_names_stay_inside_the_output_directory(running_server, tmp_path):
+    output_dir = tmp_path / "out"
+    server.request("/design-system", {"query": "fintech dashboard", "project_name": "../../escaped",
+                                      "page": "../../../Checkout Page", "persist": True,
+                                      "output_dir": str(output_dir)}, running_server, timeout=30)
+    written = sorted(path.relative_to(tmp_path).as_posix() for path in tmp_path.rglob("*.md"))
+    assert written == ["out/design-system/escaped/MASTER.md", "out/design-system/escaped/pages/checkout-page.md"]
+
+
+def test_symlinked_project_directory_is_refused(tmp_path):
+    from design_system import persist_design_system
+
+    elsewhere = tmp_path / "elsewhere"
+    elsewhere.mkdir()
+    (tmp_path / "design-system").mkdir()
+    (tmp_path / "design-system" / "shop").symlink_to(elsewhere)
+    with pytest.raises(ValueError, match="Refusing to write outside"):
+        persist_design_system({"project_name": "Shop"}, output_dir=str(tmp_path))
+    assert not any(elsewhere.iterdir())
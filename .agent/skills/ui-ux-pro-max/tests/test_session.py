@@ -0,0 +1,65 @@
+import copy
+
+import core
+from core import SearchSession
+from design_system import DesignSystemGenerator
+
+
+def test_session_results_match_search_and_stay_bounded():
+    session = SearchSession(maxsize=2)
+    queries = ["glassmorphism dark", "minimal clean", "brutalism bold"]
+    for query in queries:
+        assert session.search(query, "style")["results"] == core.search(query, "style")["results"]
+    assert session.info()["results"] == 2
+
+    session.search(queries[-1], "style")
+    assert session.hits == 1
+    session.search(queries[0], "style")  # evicted: scored again
+    assert session.misses == 4 and session.info()["results"] == 2
+
+
+def test_match_fields_are_shared_by_equal_rows():
+    generator = DesignSystemGenerator(SearchSession())
+    row = core.search("glassmorphism", "style")["results"][0]
+    assert generator._lowered_fields(row) is generator._lowered_fields(dict(row))
+    assert generator._lowered_fields(row)[0] == row["Style Category"].lower()
+
+
+class RecordingAnalyzer(core.Analyzer):
+    seen = None
+
+    def _analyze_query(self, query):
+        self.seen.append((self.stemmer, query))
+        return super()._analyze_query(query)
+
+
+def _recording_session(seen, stemmers):
+    """Session whose indexes analyse queries with RecordingAnalyzers (stemmer per domain)"""
+    session = SearchSession()
+    for domain, stemmer in stemmers.items():
+        entry = session.index(domain)
+        bm25 = copy.copy(entry["bm25"])
+        bm25.analyzer = RecordingAnalyzer(stemmer=stemmer)
+        bm25.analyzer.seen = seen
+        session._indexes[domain] = dict(entry, bm25=bm25)
+    return session
+
+
+def test_bundle_analyses_once_per_analyzer_and_matches_search():
+    seen = []
+    session = _recording_session(seen, {"product": None, "style": None, "color": None})
+    limits = {"product": 1, "style": 3, "color": 2}
+    bundle = session.search_bundle("fintech dashboard", limits, {"style": "minimal clean"})
+    assert seen == [(None, "fintech dashboard"), (None, "minimal clean")]
+    for domain, max_results in limits.items():
+        query = "fintech dashboard minimal clean" if domain == "style" else "fintech dashboard"
+        assert bundle[domain]["results"] == core.search(query, domain, max_results)["results"]
+
+
+def test_bundle_uses_each_index_analyzer():
+    seen = []
+    session = _recording_session(seen, {"product": None, "style": "en"})
+    bundle = session.search_bundle("fintech dashboards", {"product": 1, "style": 3}, {"style": "minimal colors"})
+    assert seen == [(None, "fintech dashboards"), ("en", "fintech dashboards"), ("en", "minimal colors")]
+    alone = _recording_session([], {"style": "en"})
+    assert bundle["style"] == alone.search("fintech dashboards minimal colors", "style", 3)
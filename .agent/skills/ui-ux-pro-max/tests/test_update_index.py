@@ -0,0 +1,120 @@
+import csv
+import os
+import random
+import shutil
+
+import pytest
+
+import core
+
+ENGINES = ["inverted", "exhaustive", "maxscore", "numpy" if core.VECTOR_ENGINE_AVAILABLE else "inverted"]
+
+
+def _read(path):
+    with open(path, encoding="utf-8", newline="") as f:
+        return list(csv.reader(f))
+
+
+def _write(path, rows, version):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        csv.writer(f).writerows(rows)
+    os.utime(path, ns=(version, version))
+
+
+def _edit(rng, body):
+    """One random edit: change, delete, insert, duplicate or move rows"""
+    kind = rng.choice(["change", "delete", "insert", "duplicate", "move"])
+    position = rng.randrange(len(body))
+    if kind == "change":
+        row = list(body[position])
+        column = rng.randrange(len(row))
+        row[column] = f"{row[column]} {rng.choice(body)[column]}".strip()
+        body[position] = row
+    elif kind == "delete" and len(body) > 10:
+        del body[position]
+    elif kind == "insert":
+        row = list(rng.choice(body))
+        row[0] = f"{row[0]} variant {rng.randrange(1000)}"
+        body.insert(position, row)
+    elif kind == "duplicate":
+        body.insert(rng.randrange(len(body) + 1), list(body[position]))
+    else:
+        body.insert(rng.randrange(len(body)), body.pop(position))
+
+
+def _ranked(entry, query, engine):
+    return [(core.row_dict(entry, idx), score) for idx, score in entry["bm25"].top_k(query, 10, engine)]
+
+
+def _term_stats(bm25):
+    bm25._query_terms("")  # applies pending changes to idf and norms
+    return {word: (bm25.doc_freqs[term], bm25.idf[term]) for word, term in bm25.vocab.items() if bm25.doc_freqs[term]}
+
+
+def _filtered_rows(entry, filters):
+    mask = core.filter_mask(entry, filters)
+    return sorted(str(core.row_dict(entry, idx)) for idx in range(entry["bm25"].size) if mask[idx >> 3] >> (idx & 7) & 1)
+
+
+@pytest.mark.parametrize("domain", ["ux", "style"])
+def test_update_index_equals_full_rebuild(tmp_path, domain):
+    config = core.CSV_CONFIG[domain]
+    columns = (config["search_cols"], config["output_cols"], config.get("filter_cols", []))
+    path = tmp_path / config["file"]
+    shutil.copy(core.DATA_DIR / config["file"], path)
+    header, *body = _read(path)
+    entry = core._build_index(path, *columns)
+    rng = random.Random(domain)
+    words = sorted(entry["bm25"].vocab)
+    incremental = 0
+
+    for version in range(1, 16):
+        for _ in range(rng.randint(1, 4)):
+            _edit(rng, body)
+        _write(path, [header] + body, 10**18 + version)
+        entry, stats = core.update_index(entry, path)
+        fresh = core._build_index(path, *columns)
+
+        bm25, expected = entry["bm25"], fresh["bm25"]
+        assert (bm25.N, bm25.total_length) == (expected.N, expected.total_length)
+        assert _term_stats(bm25) == _term_stats(expected)
+        for _ in range(20):
+            query = " ".join(rng.sample(words, rng.randint(1, 3)))
+            for engine in ENGINES:
+                assert _ranked(entry, query, engine) == _ranked(fresh, query, engine), (version, query, engine, stats)
+        for col, values in fresh["bitmaps"].items():
+            for value in values:
+                assert _filtered_rows(entry, {col: value}) == _filtered_rows(fresh, {col: value}), (version, col, value)
+        incremental += not stats["rebuilt"]
+    assert incremental
+
+
+def _rewrite_in_place(path, rows, version):
+    """Truncate and refill the same inode, as an editor saving without a rename does"""
+    with open(path, "r+", encoding="utf-8", newline="") as f:
+        f.truncate(0)
+        csv.writer(f).writerows(rows)
+    os.utime(path, ns=(version, version))
+
+
+def test_rows_of_a_csv_truncated_in_place_are_reloaded(tmp_path, monkeypatch):
+    config = core.CSV_CONFIG["style"]
+    columns = (config["search_cols"], config["output_cols"], config.get("filter_cols", []))
+    path = tmp_path / config["file"]
+    shutil.copy(core.DATA_DIR / config["file"], path)
+    monkeypatch.setattr(core, "DATA_DIR", tmp_path)
+    header, *body = _read(path)
+    session = core.SearchSession()
+    session.search("glassmorphism", "style")
+    core._search_csv(path, *columns[:2], "glassmorphism", 3, filter_cols=columns[2])
+    entry = core.load_index(path, *columns)
+
+    _rewrite_in_place(path, [header] + body[:len(body) // 4], 1_700_000_000_000_000_000)
+    with pytest.raises(core.DataChangedError):
+        core.row_dict(entry, entry["bm25"].size - 1)
+
+    expected = core._build_index(path, *columns)
+    for query in ["minimal clean", "dark mode neon", "glassmorphism"]:
+        fresh = [core.row_dict(expected, idx) for idx, _ in expected["bm25"].top_k(query, 3)]
+        assert core._search_csv(path, *columns[:2], query, 3, filter_cols=columns[2]) == fresh
+        assert session.search(query, "style", 3)["results"] == fresh